@@ -5,9 +5,15 @@ __metaclass__ = type
 
 from ansible.errors import AnsibleActionFail
 from ansible.plugins.action import ActionBase
+from ansible.module_utils.connection import Connection
 from ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint import (
     prepare_rule_params_for_execute_module,
     check_if_to_publish_for_action,
+    defer_publish,
+    get_access_rules_changes,
+    apply_access_rules_changes,
+    add_retry_counters,
+    send_request,
 )
 
 
@@ -36,56 +42,108 @@ class ActionModule(ActionBase):
                     raise AnsibleActionFail(
                         "Unsupported parameter " + field + " for rule"
                     )
-        # check_fields_for_rule_action_module(module_args)
-        rules_list = self._task.args["rules"]
-        position = 1
-        below_rule_name = None
+        if module_args.get("bulk"):
+            # the module validated the args, so take the rules from its invocation, with their types converted
+            params = result.get("invocation", {}).get("module_args", {})
+            result = self.run_bulk(result, params.get("rules", rules_list))
+        else:
+            # check_fields_for_rule_action_module(module_args)
+            rules_list = self._task.args["rules"]
+            position = 1
+            below_rule_name = None
 
-        for rule in rules_list:
-            (
-                rule,
-                position,
-                below_rule_name,
-            ) = prepare_rule_params_for_execute_module(
-                rule=rule,
-                module_args=module_args,
-                position=position,
-                below_rule_name=below_rule_name,
-            )
+            for rule in rules_list:
+                (
+                    rule,
+                    position,
+                    below_rule_name,
+                ) = prepare_rule_params_for_execute_module(
+                    rule=rule,
+                    module_args=module_args,
+                    position=position,
+                    below_rule_name=below_rule_name,
+                )
 
-            result["rule: " + rule["name"]] = self._execute_module(
-                module_name="check_point.mgmt.cp_mgmt_access_rule",
-                module_args=rule,
-                task_vars=task_vars,
-                tmp=tmp,
-                wrap_async=False,
-            )
-            if (
-                "changed" in result["rule: " + rule["name"]].keys()
-                and result["rule: " + rule["name"]]["changed"] is True
-            ):
-                result["changed"] = True
-            if (
-                "failed" in result["rule: " + rule["name"]].keys()
-                and result["rule: " + rule["name"]]["failed"] is True
-            ):
-                temp = result["rule: " + rule["name"]].copy()
-                result = {}
-                result["rule: " + rule["name"]] = temp
-                result["failed"] = True
-                result["discard:"] = self._execute_module(
-                    module_name="check_point.mgmt.cp_mgmt_discard",
-                    module_args={},
+                result["rule: " + rule["name"]] = self._execute_module(
+                    module_name="check_point.mgmt.cp_mgmt_access_rule",
+                    module_args=rule,
                     task_vars=task_vars,
                     tmp=tmp,
+                    wrap_async=False,
                 )
-                break
-        if check_if_to_publish_for_action(result, module_args):
+                if (
+                    "changed" in result["rule: " + rule["name"]].keys()
+                    and result["rule: " + rule["name"]]["changed"] is True
+                ):
+                    result["changed"] = True
+                if (
+                    "failed" in result["rule: " + rule["name"]].keys()
+                    and result["rule: " + rule["name"]]["failed"] is True
+                ):
+                    temp = result["rule: " + rule["name"]].copy()
+                    result = {}
+                    result["rule: " + rule["name"]] = temp
+                    result["failed"] = True
+                    result["discard:"] = self._execute_module(
+                        module_name="check_point.mgmt.cp_mgmt_discard",
+                        module_args={},
+                        task_vars=task_vars,
+                        tmp=tmp,
+                    )
+                    break
+        if check_if_to_publish_for_action(
+            result, module_args
+        ) and not defer_publish(Connection(self._connection.socket_path)):
+            publish_args = {}
+            if "wait_for_task_timeout" in module_args.keys():
+                publish_args["wait_for_task_timeout"] = module_args[
+                    "wait_for_task_timeout"
+                ]
             result["publish:"] = self._execute_module(
                 module_name="check_point.mgmt.cp_mgmt_publish",
-                module_args={},
+                module_args=publish_args,
                 task_vars=task_vars,
                 tmp=tmp,
             )
 
         return result
+
+    # diff the whole layer at once and send only the needed changes, instead of running a module per rule. the requests
+    # are retried by the connection like those of the rule modules, and the retries are reported in checkpoint_retries
+    # the same way
+    def run_bulk(self, result, rules):
+        module_args = self._task.args
+        layer = module_args["layer"]
+        version = (
+            "v" + module_args["version"] + "/"
+            if module_args.get("version")
+            else ""
+        )
+        timeout = module_args.get("wait_for_task_timeout", 30)
+        connection = Connection(self._connection.socket_path)
+
+        try:
+            changes = get_access_rules_changes(
+                connection, version, layer, rules
+            )
+            if not self._task.check_mode:
+                apply_access_rules_changes(
+                    connection, version, layer, changes, timeout
+                )
+        except Exception as e:
+            result = {"failed": True, "msg": str(e)}
+            if not self._task.check_mode:
+                result["discard:"] = send_request(
+                    connection, version, "discard"
+                )[1]
+            return add_retry_counters(connection, result)
+
+        changed_rules = set(change["name"] for change in changes)
+        for rule in rules:
+            result["rule: " + rule["name"]] = {
+                "changed": rule["name"] in changed_rules
+            }
+        if changes:
+            result["changed"] = True
+            result["checkpoint_session_uid"] = connection.get_session_uid()
+        return add_retry_counters(connection, result)
@@ -244,7 +244,12 @@ class ActionModule(ActionBase):
         if self._result.get("failed"):
             return self._result
         conn = Connection(self._connection.socket_path)
-        conn_request = CheckPointRequest(connection=conn, task_vars=task_vars)
+        conn_request = CheckPointRequest(
+            connection=conn,
+            task_vars=task_vars,
+            wait_for_task=self._task.args.get("wait_for_task"),
+            wait_for_task_timeout=self._task.args.get("wait_for_task_timeout"),
+        )
         if self._task.args["state"] == "gathered":
             if self._task.args.get("config"):
                 self._result["gathered"] = self.search_for_resource_name(
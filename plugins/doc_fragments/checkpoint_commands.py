@@ -23,6 +23,20 @@ options:
       - How many minutes to wait until throwing a timeout error.
     type: int
     default: 30
+  wait_for_task_initial_interval:
+    description:
+      - How many seconds to wait before the second status check of the task.
+      - The wait between status checks then grows exponentially, up to I(wait_for_task_max_interval). When the task
+        reports its progress, the next check is done when the task is expected to end, if that is sooner.
+    type: float
+    default: 0.5
+    version_added: "6.9.0"
+  wait_for_task_max_interval:
+    description:
+      - The maximum amount of seconds to wait between two status checks of the task.
+    type: float
+    default: 10
+    version_added: "6.9.0"
   version:
     description:
       - Version of checkpoint. If not given one, the latest version taken.
@@ -30,6 +44,23 @@ options:
   auto_publish_session:
     description:
       - Publish the current session if changes have been performed after task completes.
+      - With the C(deferred_publish) connection option, the publish is deferred and done together with the publish of
+        other tasks.
     type: bool
     default: False
+  fields:
+    description:
+      - Return only these fields of the response. A field is keys separated by dots, for example C(objects.name), and
+        lists on the way are trimmed item by item.
+    type: list
+    elements: str
+    version_added: "6.9.0"
+  drop_keys:
+    description:
+      - Keys that are removed from the response, at any depth, before it is returned.
+      - Set to an empty list to return the response as the server sent it.
+    type: list
+    elements: str
+    default: ["meta-info", "icon"]
+    version_added: "6.9.0"
 """
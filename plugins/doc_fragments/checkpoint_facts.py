@@ -17,4 +17,38 @@ options:
     description:
       - Version of checkpoint. If not given one, the latest version taken.
     type: str
+  fetch_all:
+    description:
+      - When showing many objects, fetch all the pages of the objects instead of a single page, and return them as a
+        single response.
+      - The pages are I(limit) objects each, 500 by default, and are fetched starting at I(offset). After the first
+        page, the next pages are fetched together, as many as the C(max_concurrent_requests) connection option allows.
+    type: bool
+    default: False
+    version_added: "6.9.0"
+  output_file:
+    description:
+      - When showing many objects, write the objects to this file as JSON lines, one object per line, instead of
+        returning them. Only the amount of written objects and the total are returned.
+      - The objects are written page by page, so large results are not kept in memory. Items of a rulebase are
+        written as the pages return them, so a section that is cut between two pages is written twice, with the
+        rules of each page.
+      - The file is written on the host the module runs on, which is the controller with the httpapi connection.
+    type: path
+    version_added: "6.9.0"
+  fields:
+    description:
+      - Return only these fields of the response. A field is keys separated by dots, for example C(objects.name), and
+        lists on the way are trimmed item by item.
+    type: list
+    elements: str
+    version_added: "6.9.0"
+  drop_keys:
+    description:
+      - Keys that are removed from the response, at any depth, before it is returned.
+      - Set to an empty list to return the response as the server sent it.
+    type: list
+    elements: str
+    default: ["meta-info", "icon"]
+    version_added: "6.9.0"
 """
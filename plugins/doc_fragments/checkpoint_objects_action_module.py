@@ -17,6 +17,8 @@ options:
     description:
       - Publish the current session if changes have been performed
         after task completes.
+      - With the C(deferred_publish) connection option, the publish is
+        deferred and done together with the publish of other tasks.
     type: bool
     default: False
   wait_for_task_timeout:
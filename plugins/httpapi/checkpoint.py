@@ -13,6 +13,8 @@ short_description: HttpApi Plugin for Checkpoint devices
 description:
   - This HttpApi plugin provides methods to connect to Checkpoint
     devices over a HTTP(S)-based api.
+  - When the orjson Python library is installed on the controller, it is used to encode the requests and decode the
+    responses, which takes much less CPU time with large requests and responses.
 version_added: "2.8.0"
 options:
   domain:
@@ -39,24 +41,604 @@ options:
       - target gateway
     vars:
       - name: ansible_checkpoint_target
+  session_cache:
+    type: bool
+    description:
+      - Keep the Management API session open when the connection is closed, and reuse it in later runs
+        against the same server, domain and credentials instead of logging in again.
+      - A cached session is reused only after a successful C(keepalive) call, otherwise a regular login is done.
+      - Changes that were not published or discarded stay in the cached session and are seen by the next run.
+    default: false
+    vars:
+      - name: ansible_checkpoint_session_cache
+    version_added: "6.9.0"
+  session_keepalive_interval:
+    type: int
+    description:
+      - When greater than 0, a background C(keepalive) is sent every time the connection has been idle for this
+        amount of seconds, so the session and its locks do not expire between tasks.
+      - Useful when the persistent connection is kept open for longer than the session timeout.
+    default: 0
+    vars:
+      - name: ansible_checkpoint_session_keepalive_interval
+    version_added: "6.9.0"
+  session_cache_path:
+    type: path
+    description:
+      - Directory in which the cached sessions are stored.
+      - Each cached session is stored in its own file, readable only by the current user.
+    default: ~/.ansible/cp_sessions
+    vars:
+      - name: ansible_checkpoint_session_cache_path
+    version_added: "6.9.0"
+  rulebase_index:
+    type: bool
+    description:
+      - Keep an index of the rules and sections of each rulebase that rule modules check positions in, built once
+        per connection and updated by the rules added, moved and deleted through it.
+      - Position checks of rule modules are then done on the index instead of fetching the rulebase for every rule.
+      - The index does not see changes done by other sessions while the connection is open.
+    default: false
+    vars:
+      - name: ansible_checkpoint_rulebase_index
+    version_added: "6.9.0"
+  max_concurrent_requests:
+    type: int
+    description:
+      - Maximum number of requests sent at the same time when a module splits its work into independent requests,
+        like reading the pages of a large rulebase.
+      - Set to 1 to send the requests one after the other.
+    default: 4
+    vars:
+      - name: ansible_checkpoint_max_concurrent_requests
+    version_added: "6.9.0"
+  rulebase_page_limit:
+    type: int
+    description:
+      - Number of rules read in each page of a rulebase, up to the API maximum of 500.
+      - When 0, the limit is chosen by the size of the rulebase, so it is read in as few rounds of concurrent
+        requests as possible.
+    default: 0
+    vars:
+      - name: ansible_checkpoint_rulebase_page_limit
+    version_added: "6.9.0"
+  object_cache:
+    type: bool
+    description:
+      - Cache the responses of C(equals) requests and of C(show) requests of single objects while the connection is
+        open, so tasks that check the same objects again don't send the same requests again.
+      - The cached responses of a type of objects are dropped when an object of that type is added, changed or
+        deleted through the connection, and so are the cached responses that refer to the changed objects, and of the
+        rules and sections of changed layers and sections. Any other change, like publish and discard, drops the whole
+        cache.
+      - Sessions are never cached, as every change, publish, discard and C(switch-session) changes them.
+      - Changes done by other sessions while the connection is open are not seen.
+    default: false
+    vars:
+      - name: ansible_checkpoint_object_cache
+    version_added: "6.9.0"
+  prefetch_object_types:
+    type: list
+    elements: str
+    description:
+      - Types of objects, like C(host) or C(network), whose objects are all read with paged C(show) requests on the first
+        C(equals) request of the type, and kept in memory while the connection is open.
+      - C(equals) requests of these types are then answered from memory, so tasks that loop over many objects send only
+        the requests that change objects. Params that can't be compared in memory are still compared by the server.
+      - Objects changed through the connection are compared by the server from then on. Changes done by other sessions
+        while the connection is open are not seen.
+    default: []
+    vars:
+      - name: ansible_checkpoint_prefetch_object_types
+    version_added: "6.9.0"
+  deferred_publish:
+    type: bool
+    description:
+      - Tasks with C(auto_publish_session) don't publish the session themselves, but only mark it as having changes to
+        publish, so the changes of many tasks are published together.
+      - The session is published once I(deferred_publish_threshold) tasks deferred their publish, or by a
+        C(cp_mgmt_flush_publish) task, which should run at the end of the play or in a handler. Publishing or discarding
+        the session in any other way clears the deferred publish as well.
+    default: false
+    vars:
+      - name: ansible_checkpoint_deferred_publish
+    version_added: "6.9.0"
+  deferred_publish_threshold:
+    type: int
+    description:
+      - When greater than 0, the session is published by every task whose publish would be the deferred publish
+        number I(deferred_publish_threshold), so a long play publishes in chunks of this amount of tasks.
+      - When 0, the session is published only by C(cp_mgmt_flush_publish).
+    default: 0
+    vars:
+      - name: ansible_checkpoint_deferred_publish_threshold
+    version_added: "6.9.0"
+  auto_publish_threshold:
+    type: int
+    description:
+      - When greater than 0, the session is published as soon as this amount of objects and rules were added, edited
+        or deleted in it, so huge changes are published in bounded chunks instead of in one huge session.
+      - The changes are counted for each session, and objects batch commands count every object in the batch. The
+        count of a session starts again when it is published or discarded.
+      - The changes of commands that run as a task, like the objects batch commands, are counted once C(show-task)
+        returns that their task succeeded, and the session is not published while such a task is still running.
+        Commands that don't change objects, like C(set-session) and C(add-api-key), are not counted.
+      - The request that crosses the threshold returns after the publish ended. A publish that fails is reported as a
+        warning, and is tried again by the next change.
+    default: 0
+    vars:
+      - name: ansible_checkpoint_auto_publish_threshold
+    version_added: "6.9.0"
+  response_compression:
+    type: bool
+    description:
+      - Ask the server to compress its responses with gzip or deflate, and decompress them before they are parsed.
+      - Large responses, like rulebases, objects and logs, are much smaller over the network, at the cost of some CPU
+        time on both sides. Useful over slow links, like to Smart-1 Cloud.
+      - Responses that the server did not compress are read as usual.
+    default: false
+    vars:
+      - name: ansible_checkpoint_response_compression
+    version_added: "6.9.0"
+  incremental_decoding:
+    type: bool
+    description:
+      - Decode the C(objects), C(rulebase) and C(logs) lists of responses one element at a time, converting only a
+        bounded part of the response to text at once, instead of converting the whole response to text before it is
+        decoded.
+      - Lowers the peak memory of the connection with huge responses, like large rulebases and logs, at the cost of
+        slower decoding.
+    default: false
+    vars:
+      - name: ansible_checkpoint_incremental_decoding
+    version_added: "6.9.0"
+  request_retry_timeout:
+    type: int
+    description:
+      - When greater than 0, requests that fail with a transient error are sent again, with a jittered exponential
+        backoff, for up to this amount of seconds since they were first sent.
+      - Transient errors are HTTP errors 429 and 503, and errors of locked objects and of too many requests.
+      - Requests that failed with HTTP errors 409, 502 and 504, or because of a connection failure, are sent again only
+        when they don't change anything, like C(show) commands, as the server may have done the others before they
+        failed.
+      - The retries done while a module ran are returned in its result as C(checkpoint_retries), with the amount of
+        requests that were retried, the amount of retries, and the amount of retries of each error.
+    default: 0
+    vars:
+      - name: ansible_checkpoint_request_retry_timeout
+    version_added: "6.9.0"
+  rate_limit:
+    type: float
+    description:
+      - When greater than 0, the maximum amount of requests per second that are sent to the management server by all
+        the connections to it from the controller, like the connections of all the forks of a play.
+      - Requests are limited by a token bucket, which holds up to a second of requests, so short bursts are sent at once.
+      - The limit is kept in files under I(rate_limit_path), for each server by its host and port.
+    default: 0
+    vars:
+      - name: ansible_checkpoint_rate_limit
+    version_added: "6.9.0"
+  rate_limit_max_concurrent:
+    type: int
+    description:
+      - When greater than 0, the maximum amount of requests that are sent to the management server at once by all the
+        connections to it from the controller.
+    default: 0
+    vars:
+      - name: ansible_checkpoint_rate_limit_max_concurrent
+    version_added: "6.9.0"
+  rate_limit_path:
+    type: path
+    description:
+      - Directory of the files that the connections from the controller share their rate limits of each server in.
+    default: ~/.ansible/cp_rate_limits
+    vars:
+      - name: ansible_checkpoint_rate_limit_path
+    version_added: "6.9.0"
 """
 
+import codecs
+import contextlib
+import fcntl
+import glob
+import hashlib
 import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
 from ansible.module_utils.basic import to_text
+from ansible.module_utils.common.text.converters import to_bytes
 from ansible.errors import AnsibleConnectionFailure
-from ansible.module_utils.six.moves.urllib.error import HTTPError
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+from ansible.module_utils.urls import open_url
 from ansible.plugins.httpapi import HttpApiBase
 from ansible.module_utils.connection import ConnectionError
+from ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint import (
+    get_plural_object_type,
+    get_relevant_show_rulebase_command,
+    get_relevant_show_rulebase_identifier_payload,
+    get_rulebase_generator,
+    get_rules_amount,
+    get_task_failure_message,
+    is_equals_locally,
+    poll_task,
+    run_objects_batch_chunk,
+    send_request,
+)
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 BASE_HEADERS = {
     "Content-Type": "application/json",
     "User-Agent": "Ansible",
 }
 
+JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# the Accept-Encoding of requests whose responses may be compressed, and the zlib wbits of each encoding
+COMPRESSED_RESPONSE_ENCODING = "gzip, deflate"
+RESPONSE_ENCODING_WBITS = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS,
+}
+GZIP_HEADER = b"\x1f\x8b"
+
+# the lists of responses that are decoded one element at a time by incremental decoding, and the amount of bytes of
+# the response that are converted to text at once
+INCREMENTAL_DECODING_LIST_KEYS = ["objects", "rulebase", "logs"]
+INCREMENTAL_DECODING_CHUNK_SIZE = 1024 * 1024
+# the characters that go on a JSON number
+NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+# HTTP errors and error codes of requests that were not done because of a transient condition, so they can be sent
+# again, and the delays in seconds between the retries
+RETRY_HTTP_CODES = [429, 503]
+# HTTP errors after which the server may have done the request, like a proxy that timed out while the server went on,
+# so only requests that don't change anything are sent again after them
+RETRY_READ_ONLY_HTTP_CODES = [409, 502, 504]
+RETRY_ERROR_CODES = [
+    "generic_err_too_many_requests",
+    "generic_err_object_locked",
+    "err_object_locked",
+]
+RETRY_INITIAL_DELAY = 1
+RETRY_MAX_DELAY = 16
+# commands other than show commands that are sent again after a connection failure, as they don't change anything
+RETRY_READ_ONLY_COMMANDS = ["equals", "keepalive", "where-used"]
+
+# the seconds between the attempts to get a free slot of rate_limit_max_concurrent
+RATE_LIMIT_SLOT_POLL_INTERVAL = 0.05
+
+# the server's default session timeout in seconds, used when the login reply does not state it
+DEFAULT_SESSION_TIMEOUT = 600
+# error codes the server returns for a request that was sent with an expired or unknown session id
+SESSION_EXPIRED_ERROR_CODES = ["generic_err_wrong_session_id"]
+# a cached session that expires in less than this amount of seconds is not reused
+SESSION_CACHE_EXPIRY_MARGIN = 30
+# commands of a single rule, which the rulebase indexes are updated by
+RULE_COMMAND_PATTERN = re.compile(
+    r"^(add|set|delete)-(.+-rule|threat-exception)$"
+)
+# commands after which the rulebase indexes are built again when next used
+RULEBASE_INDEX_RESET_COMMANDS = [
+    "discard",
+    "switch-session",
+    "revert-to-revision",
+]
+RULEBASE_INDEX_RESET_SUFFIXES = (
+    "-section",
+    "-layer",
+    "-batch",
+    "-rulebase",
+    "-exception-group",
+)
+# commands of a single object, which drop the cached responses of the object's type
+OBJECT_COMMAND_PATTERN = re.compile(r"^(add|set|delete)-(.+)$")
+# commands that match OBJECT_COMMAND_PATTERN but don't change objects, which are not counted as changes of the session
+SESSION_CHANGES_NEUTRAL_COMMANDS = [
+    "set-session",
+    "add-api-key",
+    "delete-api-key",
+]
+# commands other than show commands that don't change objects
+OBJECT_CACHE_NEUTRAL_COMMANDS = [
+    "equals",
+    "keepalive",
+    "login",
+    "logout",
+    "where-used",
+]
+# page limit of the show requests that prefetch objects, the maximum the API allows
+PREFETCH_PAGE_LIMIT = 500
+# params of show requests of a single object, which are cached
+OBJECT_CACHE_SHOW_PARAMS = set(
+    ["name", "uid", "details-level", "layer", "package"]
+)
+# types of objects that contain objects of other types, whose cached responses are dropped as well when an object of
+# the containing type is changed. other containing types, like other layers and sections, drop the whole cache
+OBJECT_CACHE_DEPENDENT_TYPES = {
+    "access-layer": ["access-section", "access-rule"],
+    "access-section": ["access-rule"],
+    "nat-section": ["nat-rule"],
+    "threat-layer": ["threat-rule", "threat-exception"],
+    "https-layer": ["https-section", "https-rule"],
+    "https-section": ["https-rule"],
+}
+OBJECT_CACHE_CONTAINER_SUFFIXES = ("-layer", "-section", "package")
+# types of objects whose show responses are never cached, as they change without a command of their type, like the
+# session that every change, publish, discard and switch-session changes
+OBJECT_CACHE_UNCACHED_TYPES = ["session"]
+# options of the connection that the requests of parallel sessions are sent with, by their open_url argument
+PARALLEL_SESSION_URL_OPTIONS = {
+    "use_proxy": "use_proxy",
+    "timeout": "persistent_command_timeout",
+    "validate_certs": "validate_certs",
+    "http_agent": "http_agent",
+    "client_cert": "client_cert",
+    "client_key": "client_key",
+    "ca_path": "ca_path",
+}
+
+
+# the body of a request, as compact JSON bytes
+def dumps_json(value):
+    if HAS_ORJSON:
+        return orjson.dumps(value)
+    return to_bytes(json.dumps(value, separators=(",", ":")))
+
+
+# decodes the JSON of a response, from its bytes or text. raises ValueError when it is not a valid JSON. orjson decodes
+# the bytes directly, json.loads still converts the whole bytes to text first
+def loads_json(value):
+    if HAS_ORJSON:
+        return orjson.loads(value)
+    return json.loads(value)
+
+
+# a session of its own, which sends requests like the connection does, so the module_utils functions can use it
+class ParallelSession(object):
+    def __init__(self, httpapi, sid=None):
+        self._httpapi = httpapi
+        self.sid = sid
+
+    def send_request(self, path, body_params):
+        return self._httpapi._send_in_session(self.sid, path, body_params)
+
+
+# decodes a JSON document from its bytes, converting a chunk of them to text at a time. the elements of the top level
+# lists of the given keys are decoded one by one, any other value is decoded as a whole once all of its text was read
+class IncrementalJSONDecoder(object):
+    def __init__(self, body, chunk_size):
+        self._body = body
+        self._offset = 0
+        self._chunk_size = chunk_size
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._text = ""
+        self._pos = 0
+
+    def decode(self, list_keys):
+        if self._peek() == "{":
+            result = self._decode_object(list_keys)
+        else:
+            result = self._decode_value()
+        if self._peek():
+            raise ValueError("Extra data at character %d" % self._pos)
+        return result
+
+    def _decode_object(self, list_keys):
+        result = {}
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return result
+        while True:
+            if self._peek() != '"':
+                raise ValueError(
+                    "Expecting property name at character %d" % self._pos
+                )
+            key = self._decode_value()
+            self._expect(":")
+            if key in list_keys and self._peek() == "[":
+                result[key] = self._decode_list()
+            else:
+                result[key] = self._decode_value()
+            if self._expect(",}") == "}":
+                return result
+
+    def _decode_list(self):
+        result = []
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return result
+        while True:
+            result.append(self._decode_value())
+            if self._expect(",]") == "]":
+                return result
+
+    def _decode_value(self):
+        self._skip_whitespace()
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._text, self._pos)
+            except ValueError:
+                if not self._read(size):
+                    raise
+                # a value larger than the read text, read more of it at a time so it is not decoded too many times
+                size *= 2
+                continue
+            # a number that ends with the text, or is followed by more of a number, was cut by the end of the chunk
+            # and goes on in the next one, like 1.5 read as 1 from "1." or 1e5 read as 1 from "1e"
+            is_cut = end >= len(self._text) or self._text[end] in NUMBER_CHARS
+            if not is_cut or not self._read(size):
+                self._pos = end
+                return value
+
+    def _expect(self, chars):
+        char = self._peek()
+        if not char or char not in chars:
+            raise ValueError(
+                "Expecting one of '%s' at character %d" % (chars, self._pos)
+            )
+        self._pos += 1
+        return char
+
+    def _peek(self):
+        self._skip_whitespace()
+        return self._text[self._pos] if self._pos < len(self._text) else ""
+
+    def _skip_whitespace(self):
+        while True:
+            self._pos = JSON_WHITESPACE.match(self._text, self._pos).end()
+            if self._pos < len(self._text) or not self._read(self._chunk_size):
+                return
+
+    # append the next bytes of the body as text, dropping the text that was already decoded. returns False when the
+    # whole body was read
+    def _read(self, size):
+        if self._offset >= len(self._body):
+            return False
+        start, end, pos = self._offset, self._offset + size, self._pos
+        self._offset = end
+        self._text = self._text[pos:] + self._text_decoder.decode(
+            self._body[start:end], end >= len(self._body)
+        )
+        self._pos = 0
+        return True
+
+
+# limits the requests sent to a management server by all the connections of the controller, to rate requests per
+# second by a token bucket and to max_concurrent requests at once. the state is kept in files locked with flock, so the
+# connections of all the processes share it, and the locks of a process that died are released with it
+class ServerRateLimiter(object):
+    def __init__(self, directory, key, rate, max_concurrent):
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        self._bucket_path = os.path.join(directory, key + ".bucket")
+        self._slot_paths = [
+            os.path.join(directory, "%s-%d.slot" % (key, slot))
+            for slot in range(max(max_concurrent or 0, 0))
+        ]
+        self._rate = rate or 0
+
+    @contextlib.contextmanager
+    def request(self):
+        self._wait_for_token()
+        slot = self._acquire_slot()
+        try:
+            yield
+        finally:
+            if slot is not None:
+                os.close(slot)
+
+    def _wait_for_token(self):
+        if self._rate <= 0:
+            return
+        fd = os.open(self._bucket_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                bucket = json.loads(to_text(os.read(fd, 1024)) or "{}")
+            except ValueError:
+                bucket = {}
+            now = time.time()
+            burst = max(self._rate, 1)
+            tokens = min(
+                burst,
+                bucket.get("tokens", burst)
+                + (now - bucket.get("time", now)) * self._rate,
+            )
+            # the token is taken even when there is none yet, so waiting requests get the next tokens in order
+            tokens -= 1
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, to_bytes(json.dumps({"tokens": tokens, "time": now})))
+        finally:
+            os.close(fd)
+        if tokens < 0:
+            time.sleep(-tokens / self._rate)
+
+    # returns the descriptor of the locked slot file, which is released by closing it
+    def _acquire_slot(self):
+        if not self._slot_paths:
+            return None
+        while True:
+            for path in self._slot_paths:
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except (IOError, OSError):
+                    os.close(fd)
+            time.sleep(RATE_LIMIT_SLOT_POLL_INTERVAL)
+
 
 class HttpApi(HttpApiBase):
+    def __init__(self, connection):
+        super(HttpApi, self).__init__(connection)
+        self._session_timeout = DEFAULT_SESSION_TIMEOUT
+        self._session_cache_key = None
+        self._local = threading.local()
+        self._request_lock = threading.RLock()
+        self._last_request_time = None
+        self._keepalive_thread = None
+        self._keepalive_stop = threading.Event()
+        self._rulebase_indexes = {}
+        self._object_cache = {}
+        self._object_cache_keys_by_type = {}
+        self._object_cache_keys_by_uid = {}
+        self._object_cache_uids = {}
+        self._prefetched_objects = {}
+        self._prefetched_uids = {}
+        self._deferred_publishes = 0
+        self._session_changes = {}
+        self._pending_task_changes = {}
+        self._auto_publishing = False
+        self._retry_counters = {}
+        self._rate_limiter = None
+
+    # the state of the request that the current thread sends, as several threads can send requests at once
+    @property
+    def _authenticating(self):
+        return getattr(self._local, "authenticating", False)
+
+    @_authenticating.setter
+    def _authenticating(self, value):
+        self._local.authenticating = value
+
+    @property
+    def _relogin_attempted(self):
+        return getattr(self._local, "relogin_attempted", False)
+
+    @_relogin_attempted.setter
+    def _relogin_attempted(self, value):
+        self._local.relogin_attempted = value
+
     def login(self, username, password):
+        payload = self._get_login_payload(username, password)
+        # a persistent connection logs in again after it logged out, and its keepalive thread starts again with it
+        with self._request_lock:
+            if self._keepalive_stop.is_set():
+                self._keepalive_stop = threading.Event()
+                self._keepalive_thread = None
+        self._authenticating = True
+        try:
+            self._login(payload)
+        finally:
+            self._authenticating = False
+
+    def _get_login_payload(self, username, password):
         payload = {}
         cp_domain = self.get_option("domain")
         cp_api_key = self.get_option("api_key")
@@ -71,6 +653,13 @@ class HttpApi(HttpApiBase):
             raise AnsibleConnectionFailure(
                 "[Username and password] or api_key are required for login"
             )
+        return payload
+
+    def _login(self, payload):
+        if self.get_option("session_cache") and self._reuse_cached_session(
+            payload
+        ):
+            return
         url = "/web_api/login"
         response, response_data = self.send_request(url, payload)
         if response != 200:
@@ -85,13 +674,20 @@ class HttpApi(HttpApiBase):
         # Case of read-only
         if "uid" in response_data.keys():
             self.connection._session_uid = response_data["uid"]
+        self._session_timeout = response_data.get(
+            "session-timeout", DEFAULT_SESSION_TIMEOUT
+        )
 
     def logout(self):
+        self._keepalive_stop.set()
         if any([
             not self.connection._auth,
             (self.connection._auth and "X-chkp-sid" not in self.connection._auth)
         ]):
             return
+        # keep the session open for the next run instead of logging out
+        if self.get_option("session_cache") and self._store_cached_session():
+            return
         url = "/web_api/logout"
 
         response, dummy = self.send_request(url, None)
@@ -99,7 +695,195 @@ class HttpApi(HttpApiBase):
     def get_session_uid(self):
         return self.connection._session_uid
 
+    def handle_httperror(self, exc):
+        # an expired session is replaced by a new login, after which the failed request is sent again (only once)
+        if (
+            self._authenticating
+            or self._relogin_attempted
+            or not self.connection._auth
+            or not self._is_session_expired(exc)
+        ):
+            return False
+        with self._request_lock:
+            # another thread may have logged in again while this request was sent
+            if self.connection._auth == getattr(
+                self._local, "auth", self.connection._auth
+            ):
+                self._relogin()
+        self._relogin_attempted = True
+        return True
+
+    def _is_session_expired(self, exc):
+        if exc.code == 401:
+            return True
+        error = self._get_http_error_body(exc)
+        return (
+            isinstance(error, dict)
+            and error.get("code") in SESSION_EXPIRED_ERROR_CODES
+        )
+
+    # the body of an HTTPError can be read only once, so it is kept on the exception for the other readers
+    def _get_http_error_body(self, exc):
+        if not hasattr(exc, "_checkpoint_error"):
+            body = self._decompress(
+                exc.read(), self._get_response_headers(exc)
+            )
+            try:
+                exc._checkpoint_error = loads_json(body) if body else {}
+            except ValueError:
+                exc._checkpoint_error = {"message": to_text(body)}
+        return exc._checkpoint_error
+
+    def _relogin(self):
+        expired_session_uid = getattr(self.connection, "_session_uid", None)
+        self.connection.queue_message(
+            "vvv", "Check Point session expired, logging in again"
+        )
+        self.connection._auth = None
+        self.login(
+            self.connection.get_option("remote_user"),
+            self.connection.get_option("password"),
+        )
+        # continue working on the expired session, so changes that were not published yet are kept
+        if (
+            expired_session_uid
+            and expired_session_uid != self.connection._session_uid
+        ):
+            self._authenticating = True
+            try:
+                code, response = self.send_request(
+                    "/web_api/switch-session", {"uid": expired_session_uid}
+                )
+            finally:
+                self._authenticating = False
+            if code == 200:
+                self.connection._session_uid = response.get(
+                    "uid", expired_session_uid
+                )
+            else:
+                self.connection.queue_message(
+                    "warning",
+                    "Could not switch back to the expired session {0}, its unpublished changes are not part of the "
+                    "new session: {1}".format(expired_session_uid, response),
+                )
+
+    def _start_keepalive_thread(self):
+        interval = self.get_option("session_keepalive_interval")
+        if not interval or interval <= 0 or self._keepalive_thread:
+            return
+        self._keepalive_thread = threading.Thread(
+            target=self._keepalive_loop, args=(interval, self._keepalive_stop)
+        )
+        self._keepalive_thread.daemon = True
+        self._keepalive_thread.start()
+
+    # the keepalive is sent without holding the request lock, so it never blocks the requests of other threads, like
+    # a login again, while it waits for the server or for a rate_limit_max_concurrent slot
+    def _keepalive_loop(self, interval, stop):
+        while not stop.wait(interval):
+            with self._request_lock:
+                is_idle = (
+                    self.connection._auth
+                    and time.time() - self._last_request_time >= interval
+                )
+            if is_idle:
+                self.send_request("/web_api/keepalive", None)
+
+    def _get_session_cache_dir(self):
+        return os.path.expanduser(
+            self.get_option("session_cache_path") or "~/.ansible/cp_sessions"
+        )
+
+    # the cache key identifies the server, the domain and the credentials without storing the credentials themselves
+    def _get_session_cache_key(self, login_payload):
+        credentials = login_payload.get("api-key") or "%s:%s" % (
+            login_payload.get("user"),
+            login_payload.get("password"),
+        )
+        key = "|".join(
+            [
+                str(self.connection.get_option("host")),
+                str(self.connection.get_option("port")),
+                str(self.get_option("cloud_mgmt_id") or ""),
+                str(login_payload.get("domain") or ""),
+                hashlib.sha256(to_bytes(credentials)).hexdigest(),
+            ]
+        )
+        return hashlib.sha256(to_bytes(key)).hexdigest()
+
+    # a cached session file is removed from the cache while it is used, so two connections never share a session
+    @staticmethod
+    def _claim_cached_session(path):
+        try:
+            with open(path) as f:
+                session = json.load(f)
+            os.remove(path)
+        except (OSError, ValueError):
+            return None
+        return session
+
+    def _reuse_cached_session(self, login_payload):
+        self._session_cache_key = self._get_session_cache_key(login_payload)
+        pattern = os.path.join(
+            self._get_session_cache_dir(), self._session_cache_key + "-*.json"
+        )
+        for path in glob.glob(pattern):
+            session = self._claim_cached_session(path)
+            if (
+                not session
+                or session.get("expires", 0) - SESSION_CACHE_EXPIRY_MARGIN
+                <= time.time()
+            ):
+                continue
+            self.connection._auth = {"X-chkp-sid": session["sid"]}
+            code, dummy = self.send_request("/web_api/keepalive", None)
+            if code == 200:
+                if session.get("uid"):
+                    self.connection._session_uid = session["uid"]
+                self._session_timeout = session.get(
+                    "timeout", DEFAULT_SESSION_TIMEOUT
+                )
+                return True
+            self.connection._auth = None
+        return False
+
+    def _store_cached_session(self):
+        if self._session_cache_key is None:
+            return False
+        sid = self.connection._auth["X-chkp-sid"]
+        session = {
+            "sid": sid,
+            "uid": getattr(self.connection, "_session_uid", None),
+            "timeout": self._session_timeout,
+            "expires": time.time() + self._session_timeout,
+        }
+        directory = self._get_session_cache_dir()
+        path = os.path.join(
+            directory,
+            "%s-%s.json"
+            % (
+                self._session_cache_key,
+                hashlib.sha256(to_bytes(sid)).hexdigest()[:16],
+            ),
+        )
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory, 0o700)
+            fd = os.open(
+                path + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+            )
+            with os.fdopen(fd, "w") as f:
+                json.dump(session, f)
+            # rename is atomic, so a concurrent login never reads a partially written file
+            os.rename(path + ".tmp", path)
+        except OSError:
+            return False
+        return True
+
     def send_request(self, path, body_params):
+        # requests that are sent while handling this one are prefixed again by send_request, so they are built from
+        # the path before the prefix
+        request_path = path
         cp_cloud_mgmt_id = self.get_option("cloud_mgmt_id")
         if cp_cloud_mgmt_id:
             path = "/" + cp_cloud_mgmt_id + path
@@ -107,32 +891,867 @@ class HttpApi(HttpApiBase):
         if 'gaia_api/' in path and self.get_option("target"):
             path = path.replace("gaia_api/", "web_api/gaia-api/")
             body_params['target'] = self.get_option("target")
-        data = json.dumps(body_params) if body_params else '{}'
+        data = dumps_json(body_params) if body_params else b"{}"
+        command = path.rsplit("/", 1)[-1]
+        if command == "equals" and self.get_option("prefetch_object_types"):
+            result = self._equals_prefetched_object(request_path, body_params)
+            if result is not None:
+                return result
+        cache_key = None
+        if self.get_option("object_cache"):
+            object_type = self._get_cached_object_type(command, body_params)
+            if object_type:
+                cache_key = path + json.dumps(body_params, sort_keys=True)
+                if cache_key in self._object_cache:
+                    return self._object_cache[cache_key]
+        with self._request_lock:
+            if not self._authenticating:
+                self._relogin_attempted = False
+            self._last_request_time = time.time()
+            self._start_keepalive_thread()
+            self._local.auth = self.connection._auth
+        code, response = self._send_with_retries(path, command, data)
+        if code == 200 and self._rulebase_indexes:
+            with self._request_lock:
+                self._update_rulebase_indexes(path, body_params, response)
+        if cache_key and code in [200, 404]:
+            with self._request_lock:
+                self._cache_object_response(
+                    cache_key, object_type, code, response
+                )
+        elif code == 200 and self._object_cache:
+            with self._request_lock:
+                self._update_object_cache(command, body_params, response)
+        if code == 200 and self._prefetched_objects:
+            with self._request_lock:
+                self._update_prefetched_objects(command, body_params, response)
+        if code == 200 and command in ["publish", "discard"]:
+            with self._request_lock:
+                self._deferred_publishes = 0
+                session_uid = self._get_session_key()
+                self._session_changes.pop(session_uid, None)
+                self._pending_task_changes = dict(
+                    (task_id, pending)
+                    for task_id, pending in self._pending_task_changes.items()
+                    if pending[0] != session_uid
+                )
+        elif code == 200 and command == "show-task":
+            self._count_task_changes(response)
+        elif code == 200:
+            self._count_session_changes(command, body_params, response)
+        return code, response
+
+    # send the request again while it fails with a transient error, until request_retry_timeout seconds passed since it
+    # was first sent
+    def _send_with_retries(self, path, command, data):
+        timeout = self.get_option("request_retry_timeout")
+        start = time.time()
+        retries = 0
+        while True:
+            code, response, retry_reason = self._send(path, command, data)
+            if not retry_reason or not timeout or timeout <= 0:
+                return code, response
+            delay = min(RETRY_MAX_DELAY, RETRY_INITIAL_DELAY * 2**retries)
+            # a random delay between half and all of it, so requests that failed together are not sent together again
+            delay *= random.uniform(0.5, 1)
+            if time.time() + delay - start > timeout:
+                return code, response
+            self._count_retry(retry_reason, retries == 0)
+            self.connection.queue_message(
+                "vvv",
+                "Sending %s again in %.1f seconds after %s"
+                % (command, delay, retry_reason),
+            )
+            time.sleep(delay)
+            retries += 1
+
+    # returns the code and the response, and the reason to send the request again when it failed with a transient error
+    def _send(self, path, command, data):
         try:
             self._display_request()
-            response, response_data = self.connection.send(
-                path, data, method="POST", headers=BASE_HEADERS
+            with self._rate_limited():
+                response, response_data = self.connection.send(
+                    path, data, method="POST", headers=self._get_headers()
+                )
+            value = self._get_response_value(
+                response_data, self._get_response_headers(response)
             )
-            value = self._get_response_value(response_data)
-
-            return response.getcode(), self._response_to_json(value)
+            code = response.getcode()
+            return code, self._response_to_json(value), None
         except AnsibleConnectionFailure as e:
-            return 404, e.message
+            retry_reason = None
+            if self._is_read_only_command(command):
+                retry_reason = "connection failure"
+            return 404, e.message, retry_reason
+        except HTTPError as e:
+            error = self._get_http_error_body(e)
+            retry_reason = None
+            if e.code in RETRY_HTTP_CODES or (
+                e.code in RETRY_READ_ONLY_HTTP_CODES
+                and self._is_read_only_command(command)
+            ):
+                retry_reason = "HTTP %d" % e.code
+            elif (
+                isinstance(error, dict)
+                and error.get("code") in RETRY_ERROR_CODES
+            ):
+                retry_reason = error["code"]
+            return e.code, error, retry_reason
+
+    @staticmethod
+    def _is_read_only_command(command):
+        return (
+            command.startswith("show-") or command in RETRY_READ_ONLY_COMMANDS
+        )
+
+    def _count_retry(self, retry_reason, first_retry):
+        with self._request_lock:
+            counters = self._retry_counters
+            if first_retry:
+                counters["requests"] = counters.get("requests", 0) + 1
+            counters["retries"] = counters.get("retries", 0) + 1
+            errors = counters.setdefault("errors", {})
+            errors[retry_reason] = errors.get(retry_reason, 0) + 1
+
+    # requests that are sent while another request of the same thread is sent, like the login again of an expired
+    # session, are not limited, so they don't wait for the slot that the thread already holds
+    @contextlib.contextmanager
+    def _rate_limited(self):
+        rate_limiter = self._get_rate_limiter()
+        if rate_limiter is None or getattr(self._local, "rate_limited", False):
+            yield
+            return
+        self._local.rate_limited = True
+        try:
+            with rate_limiter.request():
+                yield
+        finally:
+            self._local.rate_limited = False
+
+    def _get_rate_limiter(self):
+        rate = self.get_option("rate_limit")
+        max_concurrent = self.get_option("rate_limit_max_concurrent")
+        if (not rate or rate <= 0) and (
+            not max_concurrent or max_concurrent <= 0
+        ):
+            return None
+        if self._rate_limiter is None:
+            server = "%s:%s" % (
+                self.connection.get_option("host"),
+                self.connection.get_option("port"),
+            )
+            self._rate_limiter = ServerRateLimiter(
+                os.path.expanduser(
+                    self.get_option("rate_limit_path")
+                    or "~/.ansible/cp_rate_limits"
+                ),
+                hashlib.sha256(to_bytes(server)).hexdigest(),
+                rate,
+                max_concurrent,
+            )
+        return self._rate_limiter
+
+    # the retries since the last call, which a module adds to its result
+    def pop_retry_counters(self):
+        with self._request_lock:
+            counters = self._retry_counters
+            self._retry_counters = {}
+        return counters
+
+    # send the requests, each one is a [path, body_params], from up to max_concurrent_requests threads at once.
+    # returns the code and response of each request in the order of the requests
+    def send_requests(self, requests):
+        max_workers = min(
+            self.get_option("max_concurrent_requests") or 1, len(requests)
+        )
+        if max_workers <= 1:
+            return [
+                self.send_request(path, body_params)
+                for path, body_params in requests
+            ]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(
+                executor.map(
+                    lambda request: self.send_request(*request), requests
+                )
+            )
+
+    def get_paging_options(self):
+        return {
+            "max_concurrent_requests": self.get_option(
+                "max_concurrent_requests"
+            ),
+            "rulebase_page_limit": self.get_option("rulebase_page_limit"),
+        }
+
+    # called by tasks that would publish the session. returns True when the publish is deferred, and False when the
+    # task should publish now
+    def defer_publish(self):
+        if not self.get_option("deferred_publish"):
+            return False
+        threshold = self.get_option("deferred_publish_threshold")
+        with self._request_lock:
+            self._deferred_publishes += 1
+            return not threshold or self._deferred_publishes < threshold
+
+    def get_deferred_publishes(self):
+        return self._deferred_publishes
+
+    # run the chunks of an objects batch of each session in a new session of its own, all the sessions at once. every
+    # session publishes its changes and logs out at the end. returns the amount of applied objects, and the failures
+    def run_objects_batch_in_sessions(
+        self, version, command, chunks_by_session, polling_params
+    ):
+        if not chunks_by_session:
+            return 0, []
+        with ThreadPoolExecutor(
+            max_workers=len(chunks_by_session)
+        ) as executor:
+            results = list(
+                executor.map(
+                    lambda chunks: self._run_objects_batch_in_session(
+                        version, command, chunks, polling_params
+                    ),
+                    chunks_by_session,
+                )
+            )
+        applied = sum(result[0] for result in results)
+        failures = [failure for result in results for failure in result[1]]
+        return applied, failures
+
+    def _run_objects_batch_in_session(
+        self, version, command, chunks, polling_params
+    ):
+        session = self._login_parallel_session()
+        try:
+            applied = 0
+            failures = []
+            for chunk in chunks:
+                chunk_applied, chunk_failures = run_objects_batch_chunk(
+                    session, version, command, chunk, polling_params
+                )
+                applied += chunk_applied
+                failures.extend(chunk_failures)
+            if applied:
+                message = self._publish_parallel_session(
+                    session, version, polling_params
+                )
+                if message:
+                    # nothing of the session was published, so all of its objects failed
+                    failed = set(id(failure["object"]) for failure in failures)
+                    failures.extend(
+                        {
+                            "type": objects["type"],
+                            "object": obj,
+                            "message": message,
+                        }
+                        for chunk in chunks
+                        for objects in chunk
+                        for obj in objects["list"]
+                        if id(obj) not in failed
+                    )
+                    applied = 0
+            return applied, failures
+        except Exception:
+            # the changes and locks of the session would stay on the server after the logout
+            try:
+                send_request(session, version, "discard")
+            except Exception:
+                pass
+            raise
+        finally:
+            send_request(session, version, "logout")
+
+    def _login_parallel_session(self):
+        payload = self._get_login_payload(
+            self.connection.get_option("remote_user"),
+            self.connection.get_option("password"),
+        )
+        code, response = ParallelSession(self).send_request(
+            "/web_api/login", payload
+        )
+        if code != 200 or "sid" not in response:
+            raise ConnectionError(
+                "Login of a parallel session failed: %s" % response
+            )
+        return ParallelSession(self, response["sid"])
+
+    # returns the failure message when the publish failed, after the changes of the session were discarded
+    def _publish_parallel_session(self, session, version, polling_params):
+        code, response = send_request(session, version, "publish")
+        if code == 200:
+            task = poll_task(
+                session,
+                version,
+                response["task-id"],
+                None,
+                *polling_params,
+                fail_on_task_failure=False
+            )["tasks"][0]
+            if task["status"] != "failed":
+                return None
+            message = get_task_failure_message(task)
+        else:
+            message = "Publish failed with error {0} with message {1}".format(
+                code, response
+            )
+        send_request(session, version, "discard")
+        return message
+
+    # send a request in a session other than the one of the connection. connection.send always sends the session id of
+    # the connection, so the request is sent with the same options directly
+    def _send_in_session(self, sid, path, body_params):
+        cp_cloud_mgmt_id = self.get_option("cloud_mgmt_id")
+        if cp_cloud_mgmt_id:
+            path = "/" + cp_cloud_mgmt_id + path
+        headers = dict(self._get_headers())
+        if sid:
+            headers["X-chkp-sid"] = sid
+        url_kwargs = {}
+        for argument, option in PARALLEL_SESSION_URL_OPTIONS.items():
+            try:
+                value = self.connection.get_option(option)
+            except KeyError:
+                continue
+            if value is not None:
+                url_kwargs[argument] = value
+        try:
+            with self._rate_limited():
+                response = open_url(
+                    self.connection._url + path,
+                    data=dumps_json(body_params) if body_params else b"{}",
+                    method="POST",
+                    headers=headers,
+                    **url_kwargs
+                )
+            return response.getcode(), self._response_to_json(
+                self._decompress(
+                    response.read(), self._get_response_headers(response)
+                )
+            )
         except HTTPError as e:
-            error = json.loads(e.read())
-            return e.code, error
+            return e.code, self._get_http_error_body(e)
+        except URLError as e:
+            return 404, "Could not connect to {0}: {1}".format(
+                self.connection._url + path, e.reason
+            )
+
+    # the amount of objects and rules added, edited or deleted in the current session
+    def get_session_changes(self):
+        return self._session_changes.get(self._get_session_key(), 0)
+
+    # read-only sessions have no uid, their changes are counted under None
+    def _get_session_key(self):
+        return getattr(self.connection, "_session_uid", None)
+
+    # the amount of objects and rules that a successful command changed
+    @staticmethod
+    def _get_changes_amount(command, body_params):
+        if (
+            not OBJECT_COMMAND_PATTERN.match(command)
+            or command in SESSION_CHANGES_NEUTRAL_COMMANDS
+        ):
+            return 0
+        if command.endswith("-batch"):
+            return sum(
+                len(objects.get("list") or [])
+                for objects in (body_params or {}).get("objects") or []
+            )
+        return 1
+
+    # a command that returned a task, like an objects batch command, only started it, so its changes are counted once
+    # show-task returns that the task succeeded
+    def _count_session_changes(self, command, body_params, response):
+        changes = self._get_changes_amount(command, body_params)
+        if not changes:
+            return
+        session_uid = self._get_session_key()
+        if isinstance(response, dict) and "task-id" in response:
+            with self._request_lock:
+                self._pending_task_changes[response["task-id"]] = (
+                    session_uid,
+                    changes,
+                )
+            return
+        self._add_session_changes(session_uid, changes)
+
+    def _count_task_changes(self, response):
+        for task in response.get("tasks") or []:
+            if task.get("status") == "in progress":
+                continue
+            with self._request_lock:
+                pending = self._pending_task_changes.pop(
+                    task.get("task-id"), None
+                )
+            # a session that crossed the threshold while the task ran is published once it ended
+            if pending:
+                session_uid, changes = pending
+                if task.get("status") != "succeeded":
+                    changes = 0
+                self._add_session_changes(session_uid, changes)
+
+    def _add_session_changes(self, session_uid, changes):
+        threshold = self.get_option("auto_publish_threshold")
+        with self._request_lock:
+            self._session_changes[session_uid] = (
+                self._session_changes.get(session_uid, 0) + changes
+            )
+            # the requests of other threads that cross the threshold while publishing are published with it. the
+            # session is not published while a task of it still runs, it is published once that task ended instead
+            if (
+                not threshold
+                or self._session_changes[session_uid] < threshold
+                or self._auto_publishing
+                or session_uid != self._get_session_key()
+                or any(
+                    pending[0] == session_uid
+                    for pending in self._pending_task_changes.values()
+                )
+            ):
+                return
+            self._auto_publishing = True
+        try:
+            self._auto_publish()
+        finally:
+            self._auto_publishing = False
+
+    def _auto_publish(self):
+        changes = self.get_session_changes()
+        self.connection.queue_message(
+            "vvv", "Publishing the session after %d changes" % changes
+        )
+        code, response = self.send_request("/web_api/publish", None)
+        if code == 200:
+            try:
+                poll_task(self, "", response["task-id"])
+                return
+            except Exception as e:
+                response = to_text(e)
+            # the count was cleared when the publish started, but its changes were not published
+            with self._request_lock:
+                session_uid = self._get_session_key()
+                self._session_changes[session_uid] = (
+                    self._session_changes.get(session_uid, 0) + changes
+                )
+        self.connection.queue_message(
+            "warning",
+            "Could not publish the session after {0} changes, it is published again after the next change: "
+            "{1}".format(changes, response),
+        )
 
     def _display_request(self):
         self.connection.queue_message(
             "vvvv", "Web Services: %s %s" % ("POST", self.connection._url)
         )
 
-    def _get_response_value(self, response_data):
-        return to_text(response_data.getvalue())
+    # the body of the response as bytes, which the JSON is decoded from without a copy of the whole body as text
+    def _get_response_value(self, response_data, headers=None):
+        return self._decompress(response_data.getvalue(), headers)
+
+    def _get_headers(self):
+        if not self.get_option("response_compression"):
+            return BASE_HEADERS
+        headers = dict(BASE_HEADERS)
+        headers["Accept-Encoding"] = COMPRESSED_RESPONSE_ENCODING
+        return headers
 
-    def _response_to_json(self, response_text):
+    @staticmethod
+    def _get_response_headers(response):
+        return getattr(response, "headers", None)
+
+    # responses are decompressed by their Content-Encoding. open_url of newer ansible-core versions already decompresses
+    # gzip responses but keeps their Content-Encoding, so a gzip body is decompressed only when it still starts with the
+    # gzip header. a deflate body is either wrapped by zlib, or raw deflate data, which some servers send
+    def _decompress(self, body, headers):
+        if not self.get_option("response_compression") or not headers:
+            return body
+        encoding = to_text(headers.get("Content-Encoding") or "").strip()
+        encoding = encoding.lower()
+        if encoding not in RESPONSE_ENCODING_WBITS or not body:
+            return body
+        if encoding == "gzip" and not body.startswith(GZIP_HEADER):
+            return body
         try:
-            return json.loads(response_text) if response_text else {}
-        # JSONDecodeError only available on Python 3.5+
+            if encoding == "deflate" and not self._has_zlib_header(body):
+                decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                return decompressor.decompress(body) + decompressor.flush()
+            return zlib.decompress(body, RESPONSE_ENCODING_WBITS[encoding])
+        except zlib.error as e:
+            raise ConnectionError(
+                "Invalid %s response: %s" % (encoding, to_text(e))
+            )
+
+    @staticmethod
+    def _has_zlib_header(body):
+        header = bytearray(body[:2])
+        if len(header) < 2:
+            return False
+        # a zlib header holds the deflate method, and is a multiple of 31
+        is_deflate = (header[0] & 0x0F) == 8
+        return is_deflate and (header[0] * 256 + header[1]) % 31 == 0
+
+    def _response_to_json(self, response_body):
+        try:
+            if not response_body:
+                return {}
+            if self.get_option("incremental_decoding"):
+                return IncrementalJSONDecoder(
+                    to_bytes(response_body), INCREMENTAL_DECODING_CHUNK_SIZE
+                ).decode(INCREMENTAL_DECODING_LIST_KEYS)
+            return loads_json(response_body)
+        # JSONDecodeError only available on Python 3.5+, orjson.JSONDecodeError is a ValueError as well
         except ValueError:
-            raise ConnectionError("Invalid JSON response: %s" % response_text)
+            raise ConnectionError(
+                "Invalid JSON response: %s" % to_text(response_body)
+            )
+
+    # the index of a rulebase is a list of its sections in order, each with the [name, uid] of its rules. rules that are
+    # not in a section are kept in sections with no name
+    def get_rulebase_index(
+        self, version, show_rulebase_command, show_rulebase_payload
+    ):
+        if not self.get_option("rulebase_index"):
+            return None
+        key = self._get_rulebase_index_key(
+            show_rulebase_command, show_rulebase_payload
+        )
+        if key not in self._rulebase_indexes:
+            self._rulebase_indexes[key] = self._build_rulebase_index(
+                version, show_rulebase_command, show_rulebase_payload
+            )
+        return self._rulebase_indexes[key]
+
+    @staticmethod
+    def _get_rulebase_index_key(show_rulebase_command, show_rulebase_payload):
+        return show_rulebase_command + json.dumps(
+            show_rulebase_payload, sort_keys=True
+        )
+
+    def _build_rulebase_index(
+        self, version, show_rulebase_command, show_rulebase_payload
+    ):
+        index = []
+        rules_amount = get_rules_amount(
+            self, version, show_rulebase_payload, show_rulebase_command
+        )
+        for rulebase in get_rulebase_generator(
+            self,
+            version,
+            show_rulebase_payload,
+            show_rulebase_command,
+            rules_amount,
+        ):
+            for item in rulebase:
+                if "rulebase" in item:
+                    # a section that is cut between two pages is continued in the next one
+                    if not index or index[-1]["name"] != item["name"]:
+                        index.append({"name": item["name"], "rules": []})
+                    rules = [
+                        [rule.get("name"), rule.get("uid")]
+                        for rule in item["rulebase"]
+                    ]
+                else:
+                    if not index or index[-1]["name"] is not None:
+                        index.append({"name": None, "rules": []})
+                    rules = [[item.get("name"), item.get("uid")]]
+                index[-1]["rules"].extend(rules)
+        return index
+
+    def _update_rulebase_indexes(self, path, payload, response):
+        command = path.rsplit("/", 1)[-1]
+        if command in RULEBASE_INDEX_RESET_COMMANDS or command.endswith(
+            RULEBASE_INDEX_RESET_SUFFIXES
+        ):
+            self._rulebase_indexes.clear()
+            return
+        match = RULE_COMMAND_PATTERN.match(command)
+        if not match:
+            return
+        action, api_call_object = match.groups()
+        show_rulebase_command = get_relevant_show_rulebase_command(
+            api_call_object
+        )
+        try:
+            key = self._get_rulebase_index_key(
+                show_rulebase_command,
+                get_relevant_show_rulebase_identifier_payload(
+                    api_call_object, payload
+                ),
+            )
+        except (KeyError, TypeError):
+            key = None
+        # the same rulebase may be indexed by the name and by the uid of its layer, so the other indexes of this kind of
+        # rulebase are built again
+        for other_key in list(self._rulebase_indexes):
+            if other_key != key and other_key.startswith(
+                str(show_rulebase_command) + "{"
+            ):
+                del self._rulebase_indexes[other_key]
+        index = self._rulebase_indexes.get(key)
+        if index is not None and not self._update_rulebase_index(
+            index, action, payload, response
+        ):
+            del self._rulebase_indexes[key]
+
+    # returns False if the index could not be updated
+    def _update_rulebase_index(self, index, action, payload, response):
+        if action == "add":
+            rule = [response.get("name"), response.get("uid")]
+            return "position" in payload and self._insert_indexed_rule(
+                index, rule, payload["position"]
+            )
+
+        location = self._find_indexed_rule(
+            index, payload.get("uid") or payload.get("name")
+        )
+        if location is None:
+            return False
+        section, rule_index = location
+        if action == "delete":
+            del section["rules"][rule_index]
+            return True
+        rule = section["rules"][rule_index]
+        if payload.get("new-name"):
+            rule[0] = payload["new-name"]
+        if "new-position" in payload:
+            del section["rules"][rule_index]
+            return self._insert_indexed_rule(
+                index, rule, payload["new-position"]
+            )
+        return True
+
+    @staticmethod
+    def _find_indexed_rule(index, identifier):
+        if identifier is None:
+            return None
+        for section in index:
+            for rule_index, rule in enumerate(section["rules"]):
+                if identifier in rule:
+                    return section, rule_index
+        return None
+
+    # insert the rule at the given position. positions that can't tell which section the rule is put in, like a rule
+    # number that is the first rule of a section, are not handled and False is returned
+    def _insert_indexed_rule(self, index, rule, position):
+        if isinstance(position, dict):
+            relation, target = list(position.items())[0]
+            location = self._find_indexed_rule(index, target)
+            if location is not None and relation in ["above", "below"]:
+                section, rule_index = location
+                if relation == "below":
+                    rule_index += 1
+                section["rules"].insert(rule_index, rule)
+                return True
+            sections = [
+                section for section in index if section["name"] == target
+            ]
+            if location is not None or len(sections) != 1:
+                return False
+            if relation in ["top", "below"]:
+                sections[0]["rules"].insert(0, rule)
+            elif relation == "bottom":
+                sections[0]["rules"].append(rule)
+            else:
+                return False
+            return True
+
+        rules = [
+            (section, rule_index)
+            for section in index
+            for rule_index in range(len(section["rules"]))
+        ]
+        if position == "top":
+            number = 1
+        elif position == "bottom":
+            number = len(rules) + 1
+        else:
+            try:
+                number = int(position)
+            except ValueError:
+                return False
+        if 1 <= number <= len(rules):
+            section, rule_index = rules[number - 1]
+            if rule_index > 0 or (number == 1 and section is index[0]):
+                section["rules"].insert(rule_index, rule)
+                return True
+        elif number == len(rules) + 1 and rules and rules[-1][0] is index[-1]:
+            index[-1]["rules"].append(rule)
+            return True
+        return False
+
+    # returns the type of the object that the request reads, if its response is cached
+    @staticmethod
+    def _get_cached_object_type(command, body_params):
+        if not body_params:
+            return None
+        if command == "equals":
+            return body_params.get("type")
+        if (
+            not command.startswith("show-")
+            or not set(body_params) <= OBJECT_CACHE_SHOW_PARAMS
+            or ("name" not in body_params and "uid" not in body_params)
+        ):
+            return None
+        object_type = command.split("-", 1)[1]
+        if (
+            object_type.endswith(("rulebase", "structure"))
+            or object_type in OBJECT_CACHE_UNCACHED_TYPES
+        ):
+            return None
+        return object_type
+
+    def _cache_object_response(self, cache_key, object_type, code, response):
+        self._object_cache[cache_key] = (code, response)
+        self._object_cache_keys_by_type.setdefault(object_type, set()).add(
+            cache_key
+        )
+        for uid in self._get_uids(response):
+            self._object_cache_keys_by_uid.setdefault(uid, set()).add(
+                cache_key
+            )
+        if isinstance(response, dict) and response.get("uid"):
+            self._object_cache_uids[
+                (object_type, response.get("name"))
+            ] = response["uid"]
+
+    def _update_object_cache(self, command, body_params, response):
+        if command.startswith("show-") or command in (
+            OBJECT_CACHE_NEUTRAL_COMMANDS
+        ):
+            return
+        match = OBJECT_COMMAND_PATTERN.match(command)
+        object_type = match.group(2) if match else None
+        if (
+            not match
+            or command.endswith("-batch")
+            or (
+                object_type.endswith(OBJECT_CACHE_CONTAINER_SUFFIXES)
+                and object_type not in OBJECT_CACHE_DEPENDENT_TYPES
+            )
+        ):
+            self._object_cache.clear()
+            self._object_cache_keys_by_type.clear()
+            self._object_cache_keys_by_uid.clear()
+            self._object_cache_uids.clear()
+            return
+        keys = set()
+        for changed_type in [object_type] + OBJECT_CACHE_DEPENDENT_TYPES.get(
+            object_type, []
+        ):
+            keys |= self._object_cache_keys_by_type.pop(changed_type, set())
+        # the responses that refer to the changed object, or to objects that the change refers to, like the members of
+        # a group, are dropped as well
+        uids = self._get_uids(body_params) | self._get_uids(response)
+        name = body_params.get("name") if body_params else None
+        if (object_type, name) in self._object_cache_uids:
+            uids.add(self._object_cache_uids.pop((object_type, name)))
+        for uid in uids:
+            keys |= self._object_cache_keys_by_uid.pop(uid, set())
+        for key in keys:
+            self._object_cache.pop(key, None)
+
+    @classmethod
+    def _get_uids(cls, value):
+        uids = set()
+        if isinstance(value, dict):
+            if isinstance(value.get("uid"), str):
+                uids.add(value["uid"])
+            value = list(value.values())
+        if isinstance(value, list):
+            for element in value:
+                uids |= cls._get_uids(element)
+        return uids
+
+    # answer an equals request from the prefetched objects of its type. returns None if the server should answer it
+    def _equals_prefetched_object(self, path, body_params):
+        object_type = body_params.get("type") if body_params else None
+        params = body_params.get("params") or {} if body_params else {}
+        if (
+            object_type not in self.get_option("prefetch_object_types")
+            or params.get("name") is None
+        ):
+            return None
+        if object_type not in self._prefetched_objects:
+            self._prefetched_objects[object_type] = self._prefetch_objects(
+                path[: -len("equals")], object_type
+            )
+        objects = self._prefetched_objects[object_type]
+        if objects is None:
+            return None
+        if params["name"] not in objects:
+            return 404, {
+                "code": "generic_err_object_not_found",
+                "message": "Requested object [%s] not found" % params["name"],
+            }
+        if objects[params["name"]] is None:
+            return None
+        equals = is_equals_locally(params, objects[params["name"]])
+        if equals is None:
+            return None
+        return 200, {"equals": equals}
+
+    # returns the objects of the type by their names, or None if they could not be read
+    def _prefetch_objects(self, base_path, object_type):
+        show_path = base_path + "show-" + get_plural_object_type(object_type)
+        payload = {
+            "details-level": "full",
+            "limit": PREFETCH_PAGE_LIMIT,
+            "offset": 0,
+        }
+        code, response = self.send_request(show_path, payload)
+        if code != 200:
+            return None
+        pages = [(code, response)] + self.send_requests(
+            [
+                [show_path, dict(payload, offset=offset)]
+                for offset in range(
+                    response.get("to", 0),
+                    response.get("total", 0),
+                    PREFETCH_PAGE_LIMIT,
+                )
+            ]
+        )
+        objects = {}
+        for code, response in pages:
+            if code != 200:
+                return None
+            for obj in response.get("objects", []):
+                objects[obj["name"]] = obj
+                self._prefetched_uids[obj["uid"]] = (object_type, obj["name"])
+        return objects
+
+    def _update_prefetched_objects(self, command, body_params, response):
+        if command.startswith("show-") or command in (
+            OBJECT_CACHE_NEUTRAL_COMMANDS + ["publish"]
+        ):
+            return
+        match = OBJECT_COMMAND_PATTERN.match(command)
+        if not match or command.endswith("-batch"):
+            self._prefetched_objects.clear()
+            self._prefetched_uids.clear()
+            return
+        action, object_type = match.groups()
+        body_params = body_params or {}
+        changed = [
+            (object_type, body_params.get("name")),
+            (object_type, response.get("name")),
+        ]
+        # objects that refer to the changed object, like the hosts of a changed group, have changed as well
+        for uid in self._get_uids(body_params) | self._get_uids(response):
+            if uid in self._prefetched_uids:
+                changed.append(self._prefetched_uids[uid])
+        for changed_type, name in changed:
+            objects = self._prefetched_objects.get(changed_type)
+            if not objects or name not in objects:
+                continue
+            if changed_type == object_type and (
+                action == "delete" or body_params.get("new-name")
+            ):
+                del objects[name]
+            else:
+                objects[name] = None
+        if action != "delete":
+            objects = self._prefetched_objects.get(object_type)
+            for name in [body_params.get("new-name"), response.get("name")]:
+                if objects is not None and name:
+                    objects[name] = None
@@ -30,8 +30,12 @@ from __future__ import absolute_import, division, print_function
 
 __metaclass__ = type
 
+import json
+import os
 import time
-from ansible.module_utils.six import iteritems
+import zlib
+from ansible.module_utils.six import iteritems, string_types
+from ansible.module_utils.common.text.converters import to_bytes, to_text
 from ansible.module_utils.connection import ConnectionError
 from ansible.module_utils.connection import Connection
 from ansible_collections.ansible.netcommon.plugins.module_utils.network.common import (
@@ -43,6 +47,30 @@ BASE_HEADERS = {
     "User-Agent": "Ansible",
 }
 
+# default polling intervals, in seconds, of show-task while waiting for a task
+TASK_POLL_INITIAL_INTERVAL = 0.5
+TASK_POLL_MAX_INTERVAL = 10
+TASK_POLL_BACKOFF_FACTOR = 2
+# details level of show-task while the task is in progress, the status and progress of the task are enough
+TASK_POLL_DETAILS_LEVEL = "standard"
+
+# page limit of a rulebase when the connection doesn't set one, and the bounds of a page limit chosen by rulebase size
+RULEBASE_PAGE_LIMIT = 100
+RULEBASE_PAGE_MIN_LIMIT = 50
+RULEBASE_PAGE_MAX_LIMIT = 500
+
+OBJECTS_BATCH_SIZE = 500
+# a failed chunk of an objects batch whose task does not tell which objects failed is split in halves while it is
+# larger than this, smaller chunks are reported as failed as a whole
+OBJECTS_BATCH_MIN_SPLIT_SIZE = 10
+
+FACTS_PAGE_LIMIT = 500
+
+SHOW_CHANGES_PAGE_LIMIT = 500
+
+# bulky keys of objects that are dropped from the results by default
+RESULT_DROP_KEYS = ["meta-info", "icon"]
+
 checkpoint_argument_spec_for_action_module = dict(
     auto_publish_session=dict(type="bool", default=False),
     wait_for_task_timeout=dict(type="int", default=30),
@@ -53,17 +81,37 @@ checkpoint_argument_spec_for_objects = dict(
     auto_publish_session=dict(type="bool", default=False),
     wait_for_task=dict(type="bool", default=True),
     wait_for_task_timeout=dict(type="int", default=30),
+    wait_for_task_initial_interval=dict(
+        type="float", default=TASK_POLL_INITIAL_INTERVAL
+    ),
+    wait_for_task_max_interval=dict(
+        type="float", default=TASK_POLL_MAX_INTERVAL
+    ),
     state=dict(type="str", choices=["present", "absent"], default="present"),
     version=dict(type="str"),
 )
 
-checkpoint_argument_spec_for_facts = dict(version=dict(type="str"))
+checkpoint_argument_spec_for_facts = dict(
+    version=dict(type="str"),
+    fetch_all=dict(type="bool", default=False),
+    output_file=dict(type="path"),
+    fields=dict(type="list", elements="str"),
+    drop_keys=dict(type="list", elements="str", default=RESULT_DROP_KEYS),
+)
 
 checkpoint_argument_spec_for_commands = dict(
     wait_for_task=dict(type="bool", default=True),
     wait_for_task_timeout=dict(type="int", default=30),
+    wait_for_task_initial_interval=dict(
+        type="float", default=TASK_POLL_INITIAL_INTERVAL
+    ),
+    wait_for_task_max_interval=dict(
+        type="float", default=TASK_POLL_MAX_INTERVAL
+    ),
     version=dict(type="str"),
     auto_publish_session=dict(type="bool", default=False),
+    fields=dict(type="list", elements="str"),
+    drop_keys=dict(type="list", elements="str", default=RESULT_DROP_KEYS),
 )
 
 delete_params = [
@@ -96,6 +144,44 @@ remove_from_set_payload = {
 
 remove_from_add_payload = {"lsm-cluster": ["name"]}
 
+# rule params that are not part of the rule itself, so they are not compared with the existing rule
+access_rule_params_not_compared = [
+    "name",
+    "layer",
+    "state",
+    "position",
+    "relative-position",
+    "search-entire-rulebase",
+    "details-level",
+    "ignore-warnings",
+    "ignore-errors",
+]
+
+# params of equals that are not compared with the existing object
+object_params_not_compared = [
+    "details-level",
+    "ignore-warnings",
+    "ignore-errors",
+    "set-if-exists",
+]
+
+# params of objects that the show commands return under other names
+object_params_aliases = {
+    "ip-address": ["ipv4-address", "ipv6-address"],
+    "subnet": ["subnet4", "subnet6"],
+    "mask-length": ["mask-length4", "mask-length6"],
+}
+
+# rule params that add-rules-batch does not accept
+access_rule_params_not_in_batch = [
+    "layer",
+    "position",
+    "details-level",
+    "ignore-warnings",
+    "ignore-errors",
+    "set-if-exists",
+]
+
 
 def _fail_json(msg):
     """Replace the AnsibleModule fail_json here
@@ -255,6 +341,17 @@ def send_request(connection, version, url, payload=None):
     return code, response
 
 
+# add the retries of requests that the connection did while the module ran to its result, when there were any
+def add_retry_counters(connection, result):
+    try:
+        counters = connection.pop_retry_counters()
+    except ConnectionError:
+        return result
+    if isinstance(counters, dict) and counters:
+        result["checkpoint_retries"] = counters
+    return result
+
+
 # get the payload from the user parameters
 def is_checkpoint_param(parameter):
     if (
@@ -262,7 +359,13 @@ def is_checkpoint_param(parameter):
         or parameter == "state"
         or parameter == "wait_for_task"
         or parameter == "wait_for_task_timeout"
+        or parameter == "wait_for_task_initial_interval"
+        or parameter == "wait_for_task_max_interval"
         or parameter == "version"
+        or parameter == "fetch_all"
+        or parameter == "output_file"
+        or parameter == "fields"
+        or parameter == "drop_keys"
     ):
         return False
     return True
@@ -326,98 +429,279 @@ def get_payload_from_parameters(params):
     return payload
 
 
-# wait for task
-def wait_for_task(module, version, connection, task_id):
-    task_id_payload = {"task-id": task_id, "details-level": "full"}
-    task_complete = False
-    minutes_until_timeout = 30
-    if (
-            module.params["wait_for_task_timeout"] is not None
-            and module.params["wait_for_task_timeout"] >= 0
-    ):
-        minutes_until_timeout = module.params["wait_for_task_timeout"]
-    max_num_iterations = minutes_until_timeout * 30
-    current_iteration = 0
+# keep only the given paths of a response. a path is keys separated by dots, e.g. 'objects.name', and lists on the
+# way are projected item by item
+def project_fields(value, paths):
+    if isinstance(value, list):
+        return [project_fields(item, paths) for item in value]
+    if not isinstance(value, dict):
+        return value
+    sub_paths = {}
+    for path in paths:
+        key, dummy, rest = path.partition(".")
+        sub_paths.setdefault(key, []).append(rest)
+    projected = {}
+    for key, rests in sub_paths.items():
+        if key not in value:
+            continue
+        if "" in rests:
+            projected[key] = value[key]
+        else:
+            projected[key] = project_fields(value[key], rests)
+    return projected
+
+
+# remove the given keys from a response, at any depth
+def drop_keys(value, keys):
+    if isinstance(value, list):
+        return [drop_keys(item, keys) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return dict(
+        (key, drop_keys(item, keys))
+        for key, item in value.items()
+        if key not in keys
+    )
 
-    # As long as there is a task in progress
-    while not task_complete and current_iteration < max_num_iterations:
-        current_iteration += 1
-        # Check the status of the task
-        code, response = send_request(
-            connection, version, "show-task", task_id_payload
+
+# trim a response before it is returned, by the fields and drop_keys params of the module
+def slim_response(module, response):
+    if module.params.get("drop_keys"):
+        response = drop_keys(response, module.params["drop_keys"])
+    if module.params.get("fields"):
+        response = project_fields(response, module.params["fields"])
+    return response
+
+
+# fail the module, or raise an exception when there is no module (action plugins)
+def _fail(module, msg):
+    if module:
+        module.fail_json(msg=msg)
+    _fail_json(msg)
+
+
+def get_task_failure_message(task):
+    status_description, comments = get_status_description_and_comments(task)
+    if comments and status_description:
+        return (
+            "Task {0} with task id {1} failed. Message: {2} with description: {3} - "
+            "Look at the logs for more details ".format(
+                task["task-name"],
+                task["task-id"],
+                comments,
+                status_description,
+            )
+        )
+    elif comments:
+        return "Task {0} with task id {1} failed. Message: {2} - Look at the logs for more details ".format(
+            task["task-name"], task["task-id"], comments
         )
+    elif status_description:
+        return (
+            "Task {0} with task id {1} failed. Message: {2} - Look at the logs for more "
+            "details ".format(
+                task["task-name"], task["task-id"], status_description
+            )
+        )
+    return "Task {0} with task id {1} failed. Look at the logs for more details".format(
+        task["task-name"], task["task-id"]
+    )
 
-        attempts_counter = 0
-        while code != 200:
-            if attempts_counter < 5:
-                attempts_counter += 1
-                time.sleep(2)
-                code, response = send_request(
-                    connection, version, "show-task", task_id_payload
-                )
-            else:
-                response["message"] = (
-                    "ERROR: Failed to handle asynchronous tasks as synchronous, tasks result is"
-                    " undefined. " + response["message"]
-                )
-                module.fail_json(msg=parse_fail_message(code, response))
 
-        # Count the number of tasks that are not in-progress
-        completed_tasks = 0
+# the interval to sleep before the next show-task. The interval grows exponentially, but when the progress of the
+# task so far predicts that it ends sooner, we poll at the predicted time instead
+def get_next_poll_interval(
+    interval, progress_history, initial_interval, max_interval
+):
+    next_interval = interval * TASK_POLL_BACKOFF_FACTOR
+    if len(progress_history) > 1:
+        first_time, first_progress = progress_history[0]
+        last_time, last_progress = progress_history[-1]
+        if last_progress > first_progress and last_time > first_time:
+            progress_rate = float(last_progress - first_progress) / (
+                last_time - first_time
+            )
+            next_interval = min(
+                next_interval, (100 - last_progress) / progress_rate
+            )
+    return min(max(next_interval, initial_interval), max_interval)
+
+
+# show-task of one or more tasks, retrying a few times when the request fails
+def show_task(connection, version, task_id, details_level, module=None):
+    task_id_payload = {"task-id": task_id, "details-level": details_level}
+    code, response = send_request(
+        connection, version, "show-task", task_id_payload
+    )
+
+    attempts_counter = 0
+    while code != 200:
+        if attempts_counter < 5:
+            attempts_counter += 1
+            time.sleep(2)
+            code, response = send_request(
+                connection, version, "show-task", task_id_payload
+            )
+        else:
+            response["message"] = (
+                "ERROR: Failed to handle asynchronous tasks as synchronous, tasks result is"
+                " undefined. " + response["message"]
+            )
+            _fail(module, parse_fail_message(code, response))
+    return response
+
+
+# poll show-task until the tasks complete, one of them fails or the timeout (in minutes) passes. Shared by modules and
+# action plugins. All the tasks that are still in progress are polled together in a single show-task, for which we ask
+# only the status of the tasks. The full task (with the potentially large task-details) is fetched once it has ended.
+# Returns a dict of task-id -> show-task response of that task
+def poll_tasks(
+    connection,
+    version,
+    task_ids,
+    module=None,
+    timeout=30,
+    initial_interval=TASK_POLL_INITIAL_INTERVAL,
+    max_interval=TASK_POLL_MAX_INTERVAL,
+    fail_on_task_failure=True,
+    task_end_times=None,
+):
+    deadline = time.time() + timeout * 60
+    interval = initial_interval
+    progress_history = []
+    pending_task_ids = list(task_ids)
+    responses = {}
+
+    while True:
+        # Check the status of the tasks
+        response = show_task(
+            connection,
+            version,
+            pending_task_ids,
+            TASK_POLL_DETAILS_LEVEL,
+            module,
+        )
+
+        in_progress_task_ids = []
+        progress = 100
         for task in response["tasks"]:
-            if task["status"] == "failed":
-                (
-                    status_description,
-                    comments,
-                ) = get_status_description_and_comments(task)
-                if comments and status_description:
-                    module.fail_json(
-                        msg="Task {0} with task id {1} failed. Message: {2} with description: {3} - "
-                        "Look at the logs for more details ".format(
-                            task["task-name"],
-                            task["task-id"],
-                            comments,
-                            status_description,
-                        )
-                    )
-                elif comments:
-                    module.fail_json(
-                        msg="Task {0} with task id {1} failed. Message: {2} - Look at the logs for more details ".format(
-                            task["task-name"], task["task-id"], comments
-                        )
-                    )
-                elif status_description:
-                    module.fail_json(
-                        msg="Task {0} with task id {1} failed. Message: {2} - Look at the logs for more "
-                        "details ".format(
-                            task["task-name"],
-                            task["task-id"],
-                            status_description,
-                        )
-                    )
-                else:
-                    module.fail_json(
-                        msg="Task {0} with task id {1} failed. Look at the logs for more details".format(
-                            task["task-name"], task["task-id"]
-                        )
-                    )
             if task["status"] == "in progress":
-                break
-            completed_tasks += 1
+                in_progress_task_ids.append(task["task-id"])
+                progress = min(progress, task.get("progress-percentage", 0))
+        ended_task_ids = []
+        for task in response["tasks"]:
+            if (
+                task["task-id"] not in in_progress_task_ids
+                and task["task-id"] not in ended_task_ids
+            ):
+                ended_task_ids.append(task["task-id"])
+
+        if ended_task_ids:
+            if task_end_times is not None:
+                for task_id in ended_task_ids:
+                    task_end_times[task_id] = time.time()
+            full_response = show_task(
+                connection, version, ended_task_ids, "full", module
+            )
+            for task in full_response["tasks"]:
+                if task["status"] == "failed" and fail_on_task_failure:
+                    _fail(module, get_task_failure_message(task))
+            if len(ended_task_ids) == 1:
+                responses[ended_task_ids[0]] = full_response
+            else:
+                for task in full_response["tasks"]:
+                    responses.setdefault(task["task-id"], {"tasks": []})[
+                        "tasks"
+                    ].append(task)
+            pending_task_ids = [
+                task_id
+                for task_id in pending_task_ids
+                if task_id not in ended_task_ids
+            ]
+            # the progress of the tasks that ended says nothing about the others
+            progress_history = []
 
         # Are we done? check if all tasks are completed
-        if completed_tasks == len(response["tasks"]) and completed_tasks != 0:
-            task_complete = True
-        else:
-            time.sleep(2)  # Wait for two seconds
-    if not task_complete:
-        module.fail_json(
-            msg="ERROR: Timeout. Task-id: {0}.".format(
-                task_id_payload["task-id"]
+        if not pending_task_ids:
+            return responses
+
+        now = time.time()
+        if now >= deadline:
+            _fail(
+                module,
+                "ERROR: Timeout. Task-id: {0}.".format(
+                    ", ".join(pending_task_ids)
+                ),
             )
+        progress_history.append((now, progress))
+        time.sleep(min(interval, deadline - now))
+        interval = get_next_poll_interval(
+            interval, progress_history, initial_interval, max_interval
         )
-    else:
-        return response
+
+
+def poll_task(
+    connection,
+    version,
+    task_id,
+    module=None,
+    timeout=30,
+    initial_interval=TASK_POLL_INITIAL_INTERVAL,
+    max_interval=TASK_POLL_MAX_INTERVAL,
+    fail_on_task_failure=True,
+):
+    return poll_tasks(
+        connection,
+        version,
+        [task_id],
+        module,
+        timeout,
+        initial_interval,
+        max_interval,
+        fail_on_task_failure,
+    )[task_id]
+
+
+# the polling settings of wait_for_task from the module parameters
+def get_task_polling_params(module):
+    minutes_until_timeout = 30
+    if (
+        module.params["wait_for_task_timeout"] is not None
+        and module.params["wait_for_task_timeout"] >= 0
+    ):
+        minutes_until_timeout = module.params["wait_for_task_timeout"]
+    return (
+        minutes_until_timeout,
+        module.params.get("wait_for_task_initial_interval")
+        or TASK_POLL_INITIAL_INTERVAL,
+        module.params.get("wait_for_task_max_interval")
+        or TASK_POLL_MAX_INTERVAL,
+    )
+
+
+# wait for task
+def wait_for_task(module, version, connection, task_id):
+    return poll_task(
+        connection, version, task_id, module, *get_task_polling_params(module)
+    )
+
+
+# wait for several tasks together, returns a dict of task-id -> show-task response of that task
+def wait_for_tasks(module, version, connection, task_ids):
+    return poll_tasks(
+        connection, version, task_ids, module, *get_task_polling_params(module)
+    )
+
+
+# replace the 'tasks' of a response with the result of each of them, keyed by the task-id
+def wait_for_tasks_in_response(module, version, connection, response):
+    task_ids = [
+        task["task-id"] for task in response["tasks"] if "task-id" in task
+    ]
+    if task_ids:
+        response.update(wait_for_tasks(module, version, connection, task_ids))
+    del response["tasks"]
+    return response
 
 
 # Getting a status description and comments of task failure details
@@ -465,11 +749,17 @@ def discard_and_fail(module, code, response, connection, version):
     )
 
 
+# whether the connection defers the publish of the task to a later task (deferred_publish connection option)
+def defer_publish(connection):
+    return connection.defer_publish() is True
+
+
 # handle publish command, and wait for it to end if the user asked so
 def handle_publish(module, connection, version):
     if (
         "auto_publish_session" in module.params
         and module.params["auto_publish_session"]
+        and not defer_publish(connection)
     ):
         publish_code, publish_response = send_request(
             connection, version, "publish"
@@ -529,13 +819,9 @@ def handle_call(
                     module, version, connection, response["task-id"]
                 )
             elif "tasks" in response:
-                for task in response["tasks"]:
-                    if "task-id" in task:
-                        task_id = task["task-id"]
-                        response[task_id] = wait_for_task(
-                            module, version, connection, task["task-id"]
-                        )
-                del response["tasks"]
+                response = wait_for_tasks_in_response(
+                    module, version, connection, response
+                )
     if to_publish:
         handle_publish(module, connection, version)
     return response
@@ -560,15 +846,11 @@ def api_command(module, command):
                     module, version, connection, response["task-id"]
                 )
             elif "tasks" in response:
-                for task in response["tasks"]:
-                    if "task-id" in task:
-                        task_id = task["task-id"]
-                        response[task_id] = wait_for_task(
-                            module, version, connection, task["task-id"]
-                        )
-                del response["tasks"]
+                response = wait_for_tasks_in_response(
+                    module, version, connection, response
+                )
 
-        result[command] = response
+        result[command] = slim_response(module, response)
 
         handle_publish(module, connection, version)
     else:
@@ -577,7 +859,694 @@ def api_command(module, command):
         else:
             discard_and_fail(module, code, response, connection, version)
 
-    return result
+    return add_retry_counters(connection, result)
+
+
+# handle a list of commands, sending up to 'concurrency' of them at once. the tasks of the commands that were sent
+# together are waited for together, and the session is published once at the end
+def api_commands(module):
+    connection = Connection(module._socket_path)
+    version = get_version(module)
+    concurrency = max(module.params["concurrency"], 1)
+    chunks = []
+    for command in module.params["commands"]:
+        if not chunks or len(chunks[-1]) == concurrency:
+            chunks.append([])
+        chunks[-1].append(command)
+
+    result = {"changed": False, "cp_mgmt_batch": []}
+    for chunk in chunks:
+        requests = [
+            (command["command"], command["payload"] or {}) for command in chunk
+        ]
+        responses = []
+        for (command, payload), (code, response) in zip(
+            requests, send_requests(connection, version, requests)
+        ):
+            if code != 200:
+                if result["changed"] or not is_no_changes_command(command):
+                    discard_and_fail(
+                        module, code, response, connection, version
+                    )
+                module.fail_json(msg=parse_fail_message(code, response))
+            if not is_no_changes_command(command):
+                result["changed"] = True
+            responses.append(response)
+
+        if module.params["wait_for_task"]:
+            task_ids = []
+            for response in responses:
+                if "task-id" in response:
+                    task_ids.append(response["task-id"])
+                elif "tasks" in response:
+                    task_ids.extend(
+                        task["task-id"]
+                        for task in response["tasks"]
+                        if "task-id" in task
+                    )
+            tasks = (
+                wait_for_tasks(module, version, connection, task_ids)
+                if task_ids
+                else {}
+            )
+            for i, response in enumerate(responses):
+                if "task-id" in response:
+                    responses[i] = tasks[response["task-id"]]
+                elif "tasks" in response:
+                    for task in response.pop("tasks"):
+                        if "task-id" in task:
+                            response[task["task-id"]] = tasks[task["task-id"]]
+
+        result["cp_mgmt_batch"].extend(
+            {"command": command, "response": slim_response(module, response)}
+            for (command, payload), response in zip(requests, responses)
+        )
+
+    if result["changed"]:
+        handle_publish(module, connection, version)
+    return add_retry_counters(connection, result)
+
+
+# split the objects of an objects batch into chunks of at most batch_size objects. the objects of each type in a
+# chunk are kept together, in their original order
+def get_objects_batch_chunks(objects, batch_size):
+    chunks = []
+    chunk_size = 0
+    for objects_of_type in objects:
+        for obj in objects_of_type.get("list") or []:
+            if not chunks or chunk_size == batch_size:
+                chunks.append([])
+                chunk_size = 0
+            object_type = objects_of_type["type"]
+            if not chunks[-1] or chunks[-1][-1]["type"] != object_type:
+                chunks[-1].append({"type": object_type, "list": []})
+            chunks[-1][-1]["list"].append(obj)
+            chunk_size += 1
+    return chunks
+
+
+def get_objects_batch_size(chunk):
+    return sum(len(objects_of_type["list"]) for objects_of_type in chunk)
+
+
+# the error messages of the objects of a failed chunk that the details of its task tell of, by the id of the object.
+# an error refers to an object by its name or uid, either in the error itself or in its 'object'
+def get_objects_batch_task_failures(task, chunk):
+    objects = {}
+    for objects_of_type in chunk:
+        for obj in objects_of_type["list"]:
+            for key in ["name", "uid"]:
+                if isinstance(obj.get(key), string_types):
+                    objects.setdefault(obj[key], obj)
+    failures = {}
+    pending = [task.get("task-details") or []]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, list):
+            pending.extend(value)
+        elif isinstance(value, dict):
+            target = value.get("object")
+            if not isinstance(target, dict):
+                target = value
+            message = value.get("message") or value.get("statusDescription")
+            for key in ["name", "uid"]:
+                identifier = target.get(key)
+                if (
+                    message
+                    and isinstance(identifier, string_types)
+                    and identifier in objects
+                ):
+                    failures[id(objects[identifier])] = message
+                    break
+            pending.extend(value.values())
+    return failures
+
+
+# run one chunk of an objects batch. the server applies a chunk as a whole, so when it fails, the objects that its task
+# tells of are reported and the others run again. when the task does not tell which objects failed, the chunk is split
+# in halves and each half runs again, down to chunks of OBJECTS_BATCH_MIN_SPLIT_SIZE objects, which are reported as
+# failed as a whole. without retry, a chunk that fails is reported as it is, with the objects its task tells of, or
+# all of its objects when it tells of none. returns the amount of applied objects and the failures of the others.
+# polling_params are the wait_for_task params of get_task_polling_params
+def run_objects_batch_chunk(
+    connection,
+    version,
+    command,
+    chunk,
+    polling_params,
+    module=None,
+    retry=True,
+):
+    code, response = send_request(
+        connection, version, command, {"objects": chunk}
+    )
+    object_failures = {}
+    if code == 200:
+        task = poll_task(
+            connection,
+            version,
+            response["task-id"],
+            module,
+            *polling_params,
+            fail_on_task_failure=False
+        )["tasks"][0]
+        if task["status"] != "failed":
+            return get_objects_batch_size(chunk), []
+        message = get_task_failure_message(task)
+        object_failures = get_objects_batch_task_failures(task, chunk)
+    else:
+        message = parse_fail_message(code, response)
+
+    chunk_size = get_objects_batch_size(chunk)
+    if (
+        object_failures
+        or chunk_size <= OBJECTS_BATCH_MIN_SPLIT_SIZE
+        or not retry
+    ):
+        failures = [
+            {
+                "type": objects_of_type["type"],
+                "object": obj,
+                "message": object_failures.get(id(obj), message),
+            }
+            for objects_of_type in chunk
+            for obj in objects_of_type["list"]
+            if not object_failures or id(obj) in object_failures
+        ]
+        rest = [
+            {
+                "type": objects_of_type["type"],
+                "list": [
+                    obj
+                    for obj in objects_of_type["list"]
+                    if object_failures and id(obj) not in object_failures
+                ],
+            }
+            for objects_of_type in chunk
+        ]
+        rest = [
+            objects_of_type
+            for objects_of_type in rest
+            if objects_of_type["list"]
+        ]
+        if not rest or not retry:
+            return 0, failures
+        rest_applied, rest_failures = run_objects_batch_chunk(
+            connection, version, command, rest, polling_params, module
+        )
+        return rest_applied, failures + rest_failures
+    applied = 0
+    failures = []
+    for half in get_objects_batch_chunks(chunk, (chunk_size + 1) // 2):
+        half_applied, half_failures = run_objects_batch_chunk(
+            connection, version, command, half, polling_params, module
+        )
+        applied += half_applied
+        failures.extend(half_failures)
+    return applied, failures
+
+
+# split the objects of an objects batch between the given amount of sessions. an object goes to a session by its name
+# (or uid), so two sessions never change the same object
+def partition_objects_batch(objects, sessions):
+    partitions = [[] for i in range(sessions)]
+    for objects_of_type in objects:
+        for obj in objects_of_type.get("list") or []:
+            identifier = obj.get("name") or obj.get("uid") or ""
+            partition = partitions[zlib.crc32(to_bytes(identifier)) % sessions]
+            object_type = objects_of_type["type"]
+            if not partition or partition[-1]["type"] != object_type:
+                partition.append({"type": object_type, "list": []})
+            partition[-1]["list"].append(obj)
+    return [partition for partition in partitions if partition]
+
+
+# run an objects batch in several new sessions at once, each publishing its own changes. objects that fail, for
+# example because they depend on objects of another session, or on objects that another session locked, are tried
+# again in another round, for as long as each round applies some of them
+def run_objects_batch_in_sessions(
+    module, connection, version, command, objects
+):
+    applied = 0
+    failures = []
+    pending = objects
+    while pending:
+        chunks_by_session = [
+            get_objects_batch_chunks(
+                partition, max(module.params["batch_size"], 1)
+            )
+            for partition in partition_objects_batch(
+                pending, module.params["parallel_sessions"]
+            )
+        ]
+        try:
+            round_applied, failures = connection.run_objects_batch_in_sessions(
+                version,
+                command,
+                chunks_by_session,
+                get_task_polling_params(module),
+            )
+        except ConnectionError as e:
+            module.fail_json(msg=to_text(e))
+        applied += round_applied
+        if not round_applied:
+            break
+        pending = [
+            {"type": failure["type"], "list": [failure["object"]]}
+            for failure in failures
+        ]
+    return applied, failures
+
+
+# handle add-objects-batch, set-objects-batch and delete-objects-batch. the objects are sent in chunks of batch_size
+# objects, one chunk after the other, and the objects that fail are reported one by one. unless failed objects are
+# ignored, the first chunk that fails ends the batch, as its changes are discarded anyway
+def api_objects_batch(module, command):
+    connection = Connection(module._socket_path)
+    version = get_version(module)
+    objects = get_payload_from_parameters(
+        {"objects": module.params["objects"]}
+    ).get("objects", [])
+    parallel = module.params.get("parallel_sessions", 1) > 1
+    ignore_failed_objects = module.params["ignore_failed_objects"]
+    failed_chunk = None
+    sent = 0
+
+    if parallel:
+        applied, failures = run_objects_batch_in_sessions(
+            module, connection, version, command, objects
+        )
+    else:
+        applied = 0
+        failures = []
+        for chunk in get_objects_batch_chunks(
+            objects, max(module.params["batch_size"], 1)
+        ):
+            chunk_applied, chunk_failures = run_objects_batch_chunk(
+                connection,
+                version,
+                command,
+                chunk,
+                get_task_polling_params(module),
+                module,
+                ignore_failed_objects,
+            )
+            applied += chunk_applied
+            failures.extend(chunk_failures)
+            sent += get_objects_batch_size(chunk)
+            if chunk_failures and not ignore_failed_objects:
+                failed_chunk = chunk
+                break
+
+    if failures and not ignore_failed_objects:
+        objects_amount = sum(
+            len(objects_of_type.get("list") or [])
+            for objects_of_type in objects
+        )
+        msg = "{0} of {1} objects failed".format(len(failures), objects_amount)
+        if failed_chunk is not None and sent < objects_amount:
+            msg += ", the objects after the failed chunk were not sent"
+        msg += ". First failure: {0}".format(failures[0]["message"])
+        # the changes of parallel sessions are already published
+        if applied > 0 and not parallel:
+            discard_code, discard_response = send_request(
+                connection, version, "discard"
+            )
+            if discard_code == 200:
+                msg += " Unpublished changes were discarded"
+                applied = 0
+            else:
+                msg += " Failed to discard session with error {0} with message {1}".format(
+                    discard_code, discard_response
+                )
+        batch_result = {"applied": applied, "failures": failures}
+        if failed_chunk is not None:
+            batch_result["failed_chunk"] = failed_chunk
+        module.fail_json(
+            msg=msg,
+            changed=applied > 0,
+            **{command: slim_response(module, batch_result)}
+        )
+
+    result = {
+        "changed": applied > 0,
+        command: slim_response(
+            module, {"applied": applied, "failures": failures}
+        ),
+    }
+
+    if applied > 0 and not parallel:
+        handle_publish(module, connection, version)
+    return add_retry_counters(connection, result)
+
+
+# whether the policy package was installed on all the targets after the last publish, in which case installing it
+# again changes nothing. returns False whenever it can't be told
+def is_policy_installed_since_last_publish(
+    connection, version, policy_package, targets
+):
+    if not policy_package or not targets:
+        return False
+    code, response = send_request(
+        connection, version, "show-last-published-session"
+    )
+    if code != 200:
+        return False
+    publish_time = response.get("publish-time", {}).get("posix", 0)
+
+    gateways = {}
+    offset = 0
+    while True:
+        code, response = send_request(
+            connection,
+            version,
+            "show-gateways-and-servers",
+            {"details-level": "full", "limit": 500, "offset": offset},
+        )
+        if code != 200:
+            return False
+        for gateway in response.get("objects", []):
+            gateways[gateway.get("name")] = gateway
+            gateways[gateway.get("uid")] = gateway
+        offset += len(response.get("objects", []))
+        if not response.get("objects") or offset >= response.get("total", 0):
+            break
+
+    for target in targets:
+        policy = gateways.get(target, {}).get("policy", {})
+        installation_times = [
+            policy[policy_type + "-installation-date"]["posix"]
+            for policy_type in ["access-policy", "threat-policy"]
+            if policy.get(policy_type + "-installed")
+            and policy.get(policy_type + "-name", "").lower()
+            == policy_package.lower()
+            and policy_type + "-installation-date" in policy
+        ]
+        if not installation_times or min(installation_times) < publish_time:
+            return False
+    return True
+
+
+# install policy on the targets in waves: first the canary targets, then waves of wave_size targets. every target gets
+# an install-policy of its own, and the tasks of a wave are polled together. the install stops after a wave when the
+# ratio of the failed targets so far is above max_failure_ratio
+def api_install_policy_waves(module):
+    connection = Connection(module._socket_path)
+    version = get_version(module)
+    payload = get_payload_from_parameters(module.params)
+    for param in ["targets", "canary-size", "wave-size", "max-failure-ratio"]:
+        payload.pop(param, None)
+    targets = module.params["targets"]
+    canary_size = max(module.params["canary_size"], 0)
+    wave_size = max(module.params["wave_size"], 1)
+    waves = []
+    for i, target in enumerate(targets):
+        if (
+            i == 0
+            or i == canary_size
+            or (i > canary_size and len(waves[-1]) == wave_size)
+        ):
+            waves.append([])
+        waves[-1].append(target)
+
+    results = []
+    failed = 0
+    max_failure_ratio = module.params["max_failure_ratio"]
+    for wave_number, wave in enumerate(waves):
+        if results and float(failed) / len(results) > max_failure_ratio:
+            results.extend(
+                {"target": target, "wave": number, "status": "skipped"}
+                for number, skipped_wave in enumerate(waves)
+                if number >= wave_number
+                for target in skipped_wave
+            )
+            break
+        start_time = time.time()
+        responses = send_requests(
+            connection,
+            version,
+            [
+                ("install-policy", dict(payload, targets=[target]))
+                for target in wave
+            ],
+        )
+        wave_results = []
+        task_ids = []
+        for target, (code, response) in zip(wave, responses):
+            result = {"target": target, "wave": wave_number}
+            if code == 200:
+                result["task-id"] = response["task-id"]
+                task_ids.append(response["task-id"])
+            else:
+                result["status"] = "failed"
+                result["message"] = parse_fail_message(code, response)
+                result["duration"] = 0
+            wave_results.append(result)
+
+        task_end_times = {}
+        tasks = (
+            poll_tasks(
+                connection,
+                version,
+                task_ids,
+                module,
+                *get_task_polling_params(module),
+                fail_on_task_failure=False,
+                task_end_times=task_end_times
+            )
+            if task_ids
+            else {}
+        )
+        for result in wave_results:
+            if "task-id" not in result:
+                continue
+            task = tasks[result["task-id"]]["tasks"][0]
+            result["status"] = task["status"]
+            result["duration"] = round(
+                task_end_times[result["task-id"]] - start_time, 1
+            )
+            if task["status"] == "failed":
+                result["message"] = get_task_failure_message(task)
+        failed += len([r for r in wave_results if r["status"] == "failed"])
+        results.extend(wave_results)
+
+    summary = {"targets": results}
+    for status in ["succeeded", "partially succeeded", "failed", "skipped"]:
+        summary[status] = len([r for r in results if r["status"] == status])
+    result = {
+        "changed": summary["succeeded"] + summary["partially succeeded"] > 0,
+        "cp_mgmt_install_policy_waves": slim_response(module, summary),
+    }
+    attempted = len(results) - summary["skipped"]
+    if summary["skipped"]:
+        module.fail_json(
+            msg="Install policy stopped after {0} of {1} targets failed".format(
+                failed, attempted
+            ),
+            **result
+        )
+    # failures of the last wave are not followed by a wave that stops, but they still fail the install
+    if attempted and float(failed) / attempted > max_failure_ratio:
+        module.fail_json(
+            msg="Install policy failed on {0} of {1} targets".format(
+                failed, attempted
+            ),
+            **result
+        )
+    return add_retry_counters(connection, result)
+
+
+# the uid, name and type of an object, which is how changed objects are reported
+def get_object_summary(obj):
+    return {
+        "uid": obj.get("uid"),
+        "name": obj.get("name"),
+        "type": obj.get("type"),
+    }
+
+
+# apply the changes of show-changes to the objects of a snapshot, a dict of uid -> object. applying the same changes
+# twice gives the same objects. returns the summary of the added, modified and deleted objects
+def apply_show_changes(objects, changes):
+    drift = {"added": [], "modified": [], "deleted": []}
+    for change in changes:
+        operations = change.get("operations", {})
+        for obj in operations.get("added-objects", []):
+            objects[obj["uid"]] = obj
+            drift["added"].append(get_object_summary(obj))
+        for modification in operations.get("modified-objects", []):
+            obj = modification["new-object"]
+            objects[obj["uid"]] = obj
+            drift["modified"].append(get_object_summary(obj))
+        for obj in operations.get("deleted-objects", []):
+            objects.pop(obj["uid"], None)
+            drift["deleted"].append(get_object_summary(obj))
+    return drift
+
+
+def get_changes_amount(changes):
+    return sum(
+        len(change.get("operations", {}).get(operation, []))
+        for change in changes
+        for operation in [
+            "added-objects",
+            "modified-objects",
+            "deleted-objects",
+        ]
+    )
+
+
+# the changes between two published sessions, page by page. show-changes answers with a task, whose details hold the
+# changes. the pages are read until a page returns less than the limit
+def get_show_changes(module, connection, version, from_session, to_session):
+    changes = []
+    offset = 0
+    while True:
+        payload = {
+            "from-session": from_session,
+            "to-session": to_session,
+            "offset": offset,
+            "limit": SHOW_CHANGES_PAGE_LIMIT,
+        }
+        if module.params["details_level"]:
+            payload["details-level"] = module.params["details_level"]
+        response = handle_call(
+            connection, version, "show-changes", payload, module, False, False
+        )
+        if "task-id" in response:
+            response = wait_for_task(
+                module, version, connection, response["task-id"]
+            )
+        page = []
+        for task in response.get("tasks", []):
+            for details in task.get("task-details", []):
+                page.extend(details.get("changes", []))
+        changes.extend(page)
+        page_amount = get_changes_amount(page)
+        if page_amount < SHOW_CHANGES_PAGE_LIMIT:
+            return changes
+        offset += page_amount
+
+
+# keep a local snapshot of all the objects, and bring it up to date with the changes that were published since it was
+# taken, instead of reading all the objects again. returns the objects that changed since the last run
+def api_objects_snapshot(module):
+    connection = Connection(module._socket_path)
+    version = get_version(module)
+    path = module.params["path"]
+
+    code, last_session = send_request(
+        connection, version, "show-last-published-session"
+    )
+    if code != 200:
+        module.fail_json(msg=parse_fail_message(code, last_session))
+    last_session_uid = last_session["uid"]
+
+    snapshot = None
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (ValueError, OSError) as e:
+            module.fail_json(
+                msg="Failed to read the objects snapshot {0}: {1}. Remove it "
+                "to take a new snapshot".format(path, to_text(e))
+            )
+        if not isinstance(snapshot, dict) or not all(
+            key in snapshot for key in ("session-uid", "objects")
+        ):
+            module.fail_json(
+                msg="The objects snapshot {0} is invalid. Remove it to take a "
+                "new snapshot".format(path)
+            )
+
+    if snapshot is None:
+        payload = {}
+        if module.params["details_level"]:
+            payload["details-level"] = module.params["details_level"]
+        objects = {}
+        for code, response in get_show_pages_generator(
+            connection, version, "show-objects", payload
+        ):
+            if code != 200:
+                module.fail_json(msg=parse_fail_message(code, response))
+            for obj in response.get("objects", []):
+                objects[obj["uid"]] = obj
+        drift = {"added": [], "modified": [], "deleted": []}
+    elif snapshot["session-uid"] == last_session_uid:
+        objects = snapshot["objects"]
+        drift = {"added": [], "modified": [], "deleted": []}
+    else:
+        objects = snapshot["objects"]
+        drift = apply_show_changes(
+            objects,
+            get_show_changes(
+                module,
+                connection,
+                version,
+                snapshot["session-uid"],
+                last_session_uid,
+            ),
+        )
+
+    changed = snapshot is None or snapshot["session-uid"] != last_session_uid
+    if changed and not module.check_mode:
+        snapshot = {
+            "session-uid": last_session_uid,
+            "publish-time": last_session.get("publish-time"),
+            "objects": objects,
+        }
+        # replace is atomic, so an interrupted run never leaves a partially written snapshot
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump(snapshot, f)
+            os.replace(path + ".tmp", path)
+        except (OSError, IOError) as e:
+            try:
+                os.remove(path + ".tmp")
+            except OSError:
+                pass
+            module.fail_json(
+                msg="Failed to write the objects snapshot {0}: {1}".format(
+                    path, to_text(e)
+                )
+            )
+
+    result = {
+        "changed": changed,
+        "cp_mgmt_objects_snapshot": slim_response(
+            module,
+            {
+                "path": path,
+                "session-uid": last_session_uid,
+                "publish-time": last_session.get("publish-time"),
+                "objects": len(objects),
+                "drift": drift,
+            },
+        ),
+    }
+    return add_retry_counters(connection, result)
+
+
+# publish the session if tasks deferred their publish to it, and wait for it to end if the user asked so
+def api_flush_publish(module):
+    connection = Connection(module._socket_path)
+    version = get_version(module)
+
+    if not connection.get_deferred_publishes():
+        return {"changed": False}
+    code, response = send_request(connection, version, "publish")
+    if code != 200:
+        discard_and_fail(module, code, response, connection, version)
+    if module.params["wait_for_task"]:
+        response = wait_for_task(
+            module, version, connection, response["task-id"]
+        )
+    result = {
+        "changed": True,
+        "cp_mgmt_flush_publish": slim_response(module, response),
+    }
+    return add_retry_counters(connection, result)
 
 
 # handle api call facts
@@ -589,18 +1558,164 @@ def api_call_facts(module, api_call_object, api_call_object_plural_version):
     # if there isn't an identifier param, the API command will be in plural version (e.g. show-hosts instead of show-host)
     if not contains_show_identifier_param(payload):
         api_call_object = api_call_object_plural_version
+        response = get_facts_pages_response(
+            module, connection, version, "show-" + api_call_object, payload
+        )
+    else:
+        response = slim_response(
+            module,
+            handle_call(
+                connection,
+                version,
+                "show-" + api_call_object,
+                payload,
+                module,
+                False,
+                False,
+            ),
+        )
+    result = {api_call_object.replace("-", "_"): response}
+    return add_retry_counters(connection, result)
 
-    response = handle_call(
-        connection,
-        version,
-        "show-" + api_call_object,
-        payload,
-        module,
-        False,
-        False,
+
+# how many requests the connection sends at once
+def get_max_concurrent_requests(connection):
+    try:
+        options = connection.get_paging_options()
+    except ConnectionError:
+        return 1
+    return max(options.get("max_concurrent_requests") or 1, 1)
+
+
+# returns a generator of the code and response of every page of a show command of many objects, in order. after the
+# first page, which tells the total, the next pages are fetched together, as many as the connection allows
+def get_show_pages_generator(connection, version, command, payload):
+    limit = payload.get("limit") or FACTS_PAGE_LIMIT
+    offset = payload.get("offset") or 0
+    code, response = send_request(
+        connection, version, command, dict(payload, limit=limit, offset=offset)
     )
-    result = {api_call_object.replace("-", "_"): response}
-    return result
+    yield code, response
+    if code != 200:
+        return
+    total = response.get("total", 0)
+    offset = response.get("to", total)
+    concurrency = get_max_concurrent_requests(connection)
+    while offset < total:
+        offsets = [
+            offset + i * limit
+            for i in range(concurrency)
+            if offset + i * limit < total
+        ]
+        for code, response in send_requests(
+            connection,
+            version,
+            [
+                (command, dict(payload, limit=limit, offset=page_offset))
+                for page_offset in offsets
+            ],
+        ):
+            yield code, response
+            if code != 200:
+                return
+        offset = offsets[-1] + limit
+
+
+# the key of the list of objects in a response of a show command of many objects, e.g. 'objects' or 'packages'
+def get_objects_list_key(response):
+    if "rulebase" in response:
+        return "rulebase"
+    if "objects" in response:
+        return "objects"
+    for key, value in response.items():
+        if isinstance(value, list):
+            return key
+    return None
+
+
+# add the objects of a page of a show command of many objects to the response of the pages before it
+def merge_show_page(merged, page, list_key):
+    items = page.get(list_key) or []
+    merged_items = merged.setdefault(list_key, [])
+    # a section of a rulebase that is cut between two pages is continued in the next one
+    if (
+        list_key == "rulebase"
+        and items
+        and merged_items
+        and "rulebase" in items[0]
+        and items[0].get("uid") is not None
+        and items[0].get("uid") == merged_items[-1].get("uid")
+    ):
+        merged_items[-1].setdefault("rulebase", []).extend(
+            items[0]["rulebase"]
+        )
+        items = items[1:]
+    merged_items.extend(items)
+    if page.get("objects-dictionary"):
+        objects_dictionary = merged.setdefault("objects-dictionary", [])
+        uids = set(obj.get("uid") for obj in objects_dictionary)
+        objects_dictionary.extend(
+            obj
+            for obj in page["objects-dictionary"]
+            if obj.get("uid") not in uids
+        )
+    if "to" in page:
+        merged["to"] = page["to"]
+    return merged
+
+
+# the response of a show command of many objects. with fetch_all, all the pages are fetched and merged into one
+# response. with output_file, the objects are written to the file as JSON lines, page by page, and only a summary is
+# returned. every page is slimmed before it is merged or written
+def get_facts_pages_response(module, connection, version, command, payload):
+    if module.params.get("fetch_all") and not payload.get("async-response"):
+        pages = get_show_pages_generator(connection, version, command, payload)
+    else:
+        pages = iter(
+            [
+                (
+                    200,
+                    handle_call(
+                        connection,
+                        version,
+                        command,
+                        payload,
+                        module,
+                        False,
+                        False,
+                    ),
+                )
+            ]
+        )
+    output_file = module.params.get("output_file")
+
+    merged = None
+    written = 0
+    output = open(output_file, "w") if output_file else None
+    try:
+        for code, response in pages:
+            if code != 200:
+                module.fail_json(msg=parse_fail_message(code, response))
+            list_key = get_objects_list_key(response)
+            total = response.get("total")
+            response = slim_response(module, response)
+            if output:
+                for item in response.get(list_key) or []:
+                    output.write(json.dumps(item) + "\n")
+                    written += 1
+                merged = {
+                    "output-file": output_file,
+                    "written": written,
+                    "total": written if total is None else total,
+                }
+            elif merged is None:
+                merged = response
+            else:
+                merged = merge_show_page(merged, response, list_key)
+    finally:
+        if output:
+            output.close()
+    return merged
 
 
 # handle delete
@@ -709,37 +1824,89 @@ def api_call(module, api_call_object):
         )
     if not module.check_mode:
         result["checkpoint_session_uid"] = connection.get_session_uid()
-    return result
+    return add_retry_counters(connection, result)
+
+
+# send several requests to checkpoint at once. returns the code and response of each request in order
+def send_requests(connection, version, requests):
+    if len(requests) == 1:
+        return [send_request(connection, version, *requests[0])]
+    return connection.send_requests(
+        [["/web_api/" + version + url, payload] for url, payload in requests]
+    )
+
 
+# returns the limit of each page of a rulebase of rules_amount rules, and how many pages are fetched at once
+def get_rulebase_paging(connection, rules_amount):
+    try:
+        options = connection.get_paging_options()
+    except ConnectionError:
+        return RULEBASE_PAGE_LIMIT, 1
+    concurrency = max(options.get("max_concurrent_requests") or 1, 1)
+    limit = options.get("rulebase_page_limit")
+    if not limit:
+        # pages large enough to fetch the whole rulebase in one round of concurrent requests
+        limit = max(-(-rules_amount // concurrency), RULEBASE_PAGE_MIN_LIMIT)
+    return min(limit, RULEBASE_PAGE_MAX_LIMIT), concurrency
 
-# returns a generator of the entire rulebase. show_rulebase_identifier_payload can be either package or layer
+
+# returns a generator of the entire rulebase, page by page in order. show_rulebase_identifier_payload can be either
+# package or layer. after the first page, the next pages are fetched together, as many as the connection allows
 def get_rulebase_generator(
     connection, version, show_rulebase_identifier_payload, show_rulebase_command, rules_amount
 ):
-    offset = 0
-    limit = 100
-    while True:
+    limit, concurrency = get_rulebase_paging(connection, rules_amount)
+
+    def build_page_payload(offset, total):
         payload_for_show_rulebase = {
             "limit": limit,
             "offset": offset,
         }
         payload_for_show_rulebase.update(show_rulebase_identifier_payload)
         # in case there are empty sections after the last rule, we need them to appear in the reply and the limit might
-        # cut them out
-        if offset + limit >= rules_amount:
-            del payload_for_show_rulebase["limit"]
-        code, response = send_request(
-            connection,
-            version,
-            show_rulebase_command,
-            payload_for_show_rulebase,
-        )
-        offset = response["to"]
-        total = response["total"]
-        rulebase = response["rulebase"]
-        yield rulebase
-        if total <= offset:
-            return
+        # cut them out, so the last page asks for as much as the API allows. without a limit the server would return its
+        # default page size only
+        if offset + limit >= total:
+            payload_for_show_rulebase["limit"] = RULEBASE_PAGE_MAX_LIMIT
+        return payload_for_show_rulebase
+
+    code, response = send_request(
+        connection,
+        version,
+        show_rulebase_command,
+        build_page_payload(0, rules_amount),
+    )
+    yield response["rulebase"]
+    offset = response["to"]
+    total = response["total"]
+    while offset < total:
+        offsets = [
+            offset + i * limit
+            for i in range(concurrency)
+            if offset + i * limit < total
+        ]
+        offset = offsets[-1] + limit
+        for page_offset, (code, response) in zip(
+            offsets,
+            send_requests(
+                connection,
+                version,
+                [
+                    (
+                        show_rulebase_command,
+                        build_page_payload(page_offset, total),
+                    )
+                    for page_offset in offsets
+                ],
+            ),
+        ):
+            yield response["rulebase"]
+            # a page that ended before its limit is continued from where it ended, and the pages after it are fetched
+            # again, so no rule is skipped
+            page_end = min(page_offset + limit, total)
+            if response.get("to", page_end) < page_end:
+                offset = response["to"]
+                break
 
 
 # get 'to' or 'from' of given section
@@ -1260,9 +2427,83 @@ def get_relevant_layer_or_package_identifier(api_call_object, payload):
 
 
 # is the param position (if the user inserted it) equals between the object and the user input, as well as the section the rule is in
+# returns the index of the rulebase of the rule that the connection keeps, or None if it doesn't keep one
+def get_rulebase_index(connection, version, api_call_object, payload):
+    try:
+        return connection.get_rulebase_index(
+            version,
+            get_relevant_show_rulebase_command(api_call_object),
+            get_relevant_show_rulebase_identifier_payload(
+                api_call_object, payload
+            ),
+        )
+    except ConnectionError:
+        return None
+
+
+# is the rule at the position of the payload according to the rulebase index. like in is_equals_with_position_param,
+# a relative rule or section that doesn't exist means equals
+def is_equals_with_position_in_index(payload, index):
+    position = payload.get("position")
+    if position is None:
+        return True
+    rules = []
+    for section_number, section in enumerate(index):
+        for rule in section["rules"]:
+            rules.append((rule, section_number))
+    rule_numbers = [
+        i for i, (rule, dummy) in enumerate(rules) if payload["name"] in rule
+    ]
+    if not rule_numbers:
+        return False
+    rule_number = rule_numbers[0]
+    section_number = rules[rule_number][1]
+
+    if not isinstance(position, dict):
+        if position == "top":
+            return rule_number == 0
+        if position == "bottom":
+            return rule_number == len(rules) - 1
+        return rule_number == int(position) - 1
+
+    relation, relative_to = list(position.items())[0]
+    for i, (rule, relative_section_number) in enumerate(rules):
+        if relative_to in rule:
+            if relation == "below":
+                expected_rule_number = i + 1
+            elif relation == "above":
+                expected_rule_number = i - 1
+            else:
+                return True
+            return (
+                rule_number == expected_rule_number
+                and section_number == relative_section_number
+            )
+
+    section_names = [section["name"] for section in index]
+    if relative_to not in section_names:
+        return True
+    relative_section_number = section_names.index(relative_to)
+    if relation == "above":
+        relative_section_number -= 1
+        relation = "bottom"
+    if (
+        relative_section_number < 0
+        or section_number != relative_section_number
+    ):
+        return False
+    section_rules = index[section_number]["rules"]
+    edge_rule = section_rules[-1] if relation == "bottom" else section_rules[0]
+    return payload["name"] in edge_rule
+
+
 def is_equals_with_position_param(
     payload, connection, version, api_call_object
 ):
+    index = get_rulebase_index(connection, version, api_call_object, payload)
+    if index is not None:
+        return is_equals_with_position_in_index(payload, index)
+
     (
         position_number,
         section_according_to_position,
@@ -1430,7 +2671,7 @@ def api_call_for_rule(module, api_call_object):
         )
     if not module.check_mode:
         result["checkpoint_session_uid"] = connection.get_session_uid()
-    return result
+    return add_retry_counters(connection, result)
 
 
 # check if call is in plural form
@@ -1459,18 +2700,24 @@ def api_call_facts_for_rule(
     # if there is no layer, the API command will be in plural version (e.g. show-https-rulebase instead of show-https-rule)
     if call_is_plural(api_call_object, payload):
         api_call_object = api_call_object_plural_version
-
-    response = handle_call(
-        connection,
-        version,
-        "show-" + api_call_object,
-        payload,
-        module,
-        False,
-        False,
-    )
+        response = get_facts_pages_response(
+            module, connection, version, "show-" + api_call_object, payload
+        )
+    else:
+        response = slim_response(
+            module,
+            handle_call(
+                connection,
+                version,
+                "show-" + api_call_object,
+                payload,
+                module,
+                False,
+                False,
+            ),
+        )
     result = {api_call_object: response}
-    return result
+    return add_retry_counters(connection, result)
 
 
 # The code from here till EOF will be deprecated when Rikis' modules will be deprecated
@@ -1512,6 +2759,8 @@ def prepare_rule_params_for_execute_module(
     rule["layer"] = module_args["layer"]
     if "details_level" in module_args.keys():
         rule["details_level"] = module_args["details_level"]
+    if "wait_for_task_timeout" in module_args.keys():
+        rule["wait_for_task_timeout"] = module_args["wait_for_task_timeout"]
     if "state" not in rule.keys() or (
         "state" in rule.keys() and rule["state"] != "absent"
     ):
@@ -1540,6 +2789,307 @@ def check_if_to_publish_for_action(result, module_args):
     return to_publish
 
 
+# returns the rules of the layer in their rulebase order, with the rules of the sections flattened
+def get_layer_rules(connection, version, layer):
+    show_rulebase_payload = {
+        "name": layer,
+        "details-level": "standard",
+        "use-object-dictionary": False,
+    }
+    code, response = send_request(
+        connection,
+        version,
+        "show-access-rulebase",
+        dict(show_rulebase_payload, limit=0),
+    )
+    if code != 200:
+        _fail_json(parse_fail_message(code, response))
+    rules = []
+    for rulebase in get_rulebase_generator(
+        connection,
+        version,
+        show_rulebase_payload,
+        "show-access-rulebase",
+        int(response["total"]),
+    ):
+        for item in rulebase:
+            if item.get("type") == "access-section":
+                rules.extend(item.get("rulebase", []))
+            else:
+                rules.append(item)
+    return rules
+
+
+# compare a value of the user's rule with the value of the existing rule. objects are given by the user by name or UID
+# and returned by the API as objects. returns None if it can't be decided without asking the server
+def rule_value_matches(value, existing_value):
+    if isinstance(value, dict):
+        if not isinstance(existing_value, dict):
+            return None
+        matches = True
+        for key in value:
+            if key not in existing_value:
+                matches = None
+                continue
+            key_matches = rule_value_matches(value[key], existing_value[key])
+            if key_matches is False:
+                return False
+            if key_matches is None:
+                matches = None
+        return matches
+    if isinstance(value, list):
+        if not isinstance(existing_value, list) or any(
+            isinstance(element, (dict, list)) for element in value
+        ):
+            return None
+        if len(value) != len(existing_value):
+            return False
+        for element in value:
+            if not any(
+                rule_value_matches(element, existing_element)
+                for existing_element in existing_value
+            ):
+                return False
+        return True
+    if isinstance(existing_value, list):
+        # single value the API returns as a list, like the vpn
+        if len(existing_value) != 1:
+            return False
+        return rule_value_matches(value, existing_value[0])
+    if isinstance(existing_value, dict):
+        if "name" not in existing_value and "uid" not in existing_value:
+            return None
+        return value == existing_value.get("uid") or (
+            existing_value.get("name") is not None
+            and str(value).lower() == existing_value["name"].lower()
+        )
+    return value == existing_value
+
+
+# compare the params of an equals request with the object as shown with details-level full. like rule_value_matches,
+# returns None if it can't be decided without asking the server
+def is_equals_locally(params, existing_object):
+    uncertain = False
+    for key in params:
+        if key in object_params_not_compared:
+            continue
+        keys = [
+            existing_key
+            for existing_key in [key] + object_params_aliases.get(key, [])
+            if existing_key in existing_object
+        ]
+        matches = [
+            rule_value_matches(params[key], existing_object[existing_key])
+            for existing_key in keys
+        ]
+        if True in matches:
+            continue
+        if not matches or None in matches:
+            uncertain = True
+            continue
+        return False
+    return None if uncertain else True
+
+
+# returns the plural form of an object type, as used by its show command of many objects
+def get_plural_object_type(object_type):
+    if object_type == "group-with-exclusion":
+        return "groups-with-exclusion"
+    if object_type.startswith("service-") and object_type != "service-group":
+        return object_type.replace("service-", "services-", 1)
+    if object_type.startswith("vpn-community-"):
+        return object_type.replace("vpn-community-", "vpn-communities-", 1)
+    return object_type + "s"
+
+
+# is the access rule in the payload equals to the existing rule. the server is asked with 'equals' only for the params
+# that can't be compared locally
+def is_access_rule_equals(connection, version, payload, existing_rule):
+    uncertain = False
+    for key in payload:
+        if key in access_rule_params_not_compared:
+            continue
+        if key not in existing_rule:
+            uncertain = True
+            continue
+        matches = rule_value_matches(payload[key], existing_rule[key])
+        if (
+            key == "action"
+            and matches is False
+            and payload[key].lower() == "apply layer"
+            and existing_rule[key].get("name", "").lower() == "inner layer"
+        ):
+            matches = True
+        if matches is False:
+            return False
+        if matches is None:
+            uncertain = True
+    if not uncertain:
+        return True
+
+    params = extract_payload_without_some_params(
+        payload, ["action", "position", "search-entire-rulebase"]
+    )
+    code, response = send_request(
+        connection,
+        version,
+        "equals",
+        {"type": "access-rule", "params": params},
+    )
+    if code != 200:
+        _fail_json(parse_fail_message(code, response))
+    return response["equals"]
+
+
+# returns the calls that bring the layer to the given rules, with the rules that they change. like the action module
+# does rule by rule, the present rules are placed one below the other from the top of the layer. the existing rules
+# are keyed by their uid, or by their position when they have none, so unnamed rules and rules with the same name are
+# kept apart. a rule is matched with the first existing rule of its name that no earlier rule was matched with, and the
+# calls refer to existing rules by their uid
+def get_access_rules_changes(connection, version, layer, rules):
+    existing_rules = {}
+    rules_order = []
+    keys_by_name = {}
+    for position, rule in enumerate(
+        get_layer_rules(connection, version, layer)
+    ):
+        key = rule.get("uid") or position
+        existing_rules[key] = rule
+        rules_order.append(key)
+        if rule.get("name"):
+            keys_by_name.setdefault(rule["name"], []).append(key)
+
+    changes = []
+    below_rule = None
+    below_key = None
+    for i, rule in enumerate(rules):
+        payload = get_payload_from_parameters(rule)
+        payload["layer"] = layer
+        name = payload["name"]
+        keys = keys_by_name.get(name)
+        key = keys.pop(0) if keys else None
+        existing_rule = existing_rules.get(key)
+        identifier = (
+            {"uid": existing_rule["uid"], "layer": layer}
+            if existing_rule and existing_rule.get("uid")
+            else {"name": name, "layer": layer}
+        )
+        if rule.get("state") == "absent":
+            if existing_rule:
+                changes.append(
+                    {
+                        "command": "delete-access-rule",
+                        "name": name,
+                        "payload": identifier,
+                    }
+                )
+                rules_order.remove(key)
+            continue
+
+        new_position = {"below": below_rule} if below_rule else 1
+        old_rule_number = rules_order.index(key) if existing_rule else None
+        if existing_rule:
+            rules_order.remove(key)
+        else:
+            # a new rule has no key yet
+            key = ("new", i)
+        rule_number = rules_order.index(below_key) + 1 if below_rule else 0
+        rules_order.insert(rule_number, key)
+        below_key = key
+        below_rule = identifier.get("uid", name)
+
+        if old_rule_number is None:
+            payload["position"] = new_position
+            command = "add-access-rule"
+        else:
+            payload = dict(
+                extract_payload_without_some_params(payload, ["name"]),
+                **identifier
+            )
+            if is_access_rule_equals(
+                connection, version, payload, existing_rule
+            ):
+                payload = dict(identifier)
+            if rule_number != old_rule_number:
+                payload["new-position"] = new_position
+            if len(payload) == 2:
+                continue
+            command = "set-access-rule"
+        changes.append(
+            {
+                "command": command,
+                "name": name,
+                "payload": payload,
+                "rule-number": rule_number + 1,
+            }
+        )
+    return changes
+
+
+# add the rules of the given changes with a single add-rules-batch call. returns False if the server doesn't support it
+def add_access_rules_batch(connection, version, layer, changes, timeout=30):
+    rules = [
+        extract_payload_without_some_params(
+            change["payload"], access_rule_params_not_in_batch
+        )
+        for change in changes
+    ]
+    payload = {
+        "objects": [
+            {
+                "layer": layer,
+                "type": "access-rule",
+                "first-position": changes[0]["rule-number"],
+                "list": rules,
+            }
+        ]
+    }
+    code, response = send_request(
+        connection, version, "add-rules-batch", payload
+    )
+    if code == 404 and response.get("code") == "generic_err_command_not_found":
+        return False
+    if code != 200:
+        _fail_json(parse_fail_message(code, response))
+    poll_task(connection, version, response["task-id"], timeout=timeout)
+    return True
+
+
+# send the calls returned by get_access_rules_changes. new rules that follow each other are added in one batch
+def apply_access_rules_changes(
+    connection, version, layer, changes, timeout=30
+):
+    batch_supported = True
+    i = 0
+    while i < len(changes):
+        batch = []
+        for change in changes[i:]:
+            if change["command"] != "add-access-rule":
+                break
+            batch.append(change)
+        if len(batch) > 1 and batch_supported:
+            if add_access_rules_batch(
+                connection, version, layer, batch, timeout
+            ):
+                i += len(batch)
+                continue
+            batch_supported = False
+
+        change = changes[i]
+        code, response = send_request(
+            connection, version, change["command"], change["payload"]
+        )
+        if code != 200:
+            _fail_json(
+                "Failed to {0} rule {1}, {2}".format(
+                    change["command"].split("-")[0],
+                    change["name"],
+                    parse_fail_message(code, response),
+                )
+            )
+        i += 1
+
+
 class CheckPointRequest(object):
     def __init__(
         self,
@@ -1548,6 +3098,8 @@ class CheckPointRequest(object):
         headers=None,
         not_rest_data_keys=None,
         task_vars=None,
+        wait_for_task=False,
+        wait_for_task_timeout=None,
     ):
         self.module = module
         if module:
@@ -1572,66 +3124,17 @@ class CheckPointRequest(object):
             self.not_rest_data_keys = []
         self.not_rest_data_keys.append("validate_certs")
         self.headers = headers if headers else BASE_HEADERS
+        # the task waiting settings are module params, not API parameters, so they are never part of the payload
+        if module and wait_for_task_timeout is None:
+            wait_for_task_timeout = module.params.get("wait_for_task_timeout")
+        if wait_for_task_timeout is None or wait_for_task_timeout < 0:
+            wait_for_task_timeout = 30
+        self.wait_for_task_timeout = wait_for_task_timeout
+        self.to_wait_for_task = wait_for_task
 
     # wait for task
-    def wait_for_task(self, version, connection, task_id):
-        task_id_payload = {"task-id": task_id, "details-level": "full"}
-        task_complete = False
-        minutes_until_timeout = 30
-        # if module.params['wait_for_task_timeout'] is not None and module.params['wait_for_task_timeout'] >= 0:
-        #     minutes_until_timeout = module.params['wait_for_task_timeout']
-        max_num_iterations = minutes_until_timeout * 30
-        current_iteration = 0
-
-        # As long as there is a task in progress
-        while not task_complete and current_iteration < max_num_iterations:
-            current_iteration += 1
-            # Check the status of the task
-            code, response = send_request(
-                connection, version, "show-task", task_id_payload
-            )
-
-            attempts_counter = 0
-            while code != 200:
-                if attempts_counter < 5:
-                    attempts_counter += 1
-                    time.sleep(2)
-                    code, response = send_request(
-                        connection, version, "show-task", task_id_payload
-                    )
-                else:
-                    response["message"] = (
-                        "ERROR: Failed to handle asynchronous tasks as synchronous, tasks result is"
-                        " undefined. " + response["message"]
-                    )
-                    _fail_json(parse_fail_message(code, response))
-
-            # Count the number of tasks that are not in-progress
-            completed_tasks = 0
-            for task in response["tasks"]:
-                if task["status"] == "failed":
-                    _fail_json(
-                        "Task {0} with task id {1} failed. Look at the logs for more details".format(
-                            task["task-name"], task["task-id"]
-                        )
-                    )
-                if task["status"] == "in progress":
-                    break
-                completed_tasks += 1
-
-            # Are we done? check if all tasks are completed
-            if completed_tasks == len(response["tasks"]):
-                task_complete = True
-            else:
-                time.sleep(2)  # Wait for two seconds
-        if not task_complete:
-            _fail_json(
-                "ERROR: Timeout. Task-id: {0}.".format(
-                    task_id_payload["task-id"]
-                )
-            )
-        else:
-            return response
+    def wait_for_task(self, version, connection, task_id, timeout=30):
+        return poll_task(connection, version, task_id, timeout=timeout)
 
     # if failed occurred, in some cases we want to discard changes before exiting. We also notify the user about the `discard`
     def discard_and_fail(
@@ -1669,7 +3172,9 @@ class CheckPointRequest(object):
         )
 
     # handle publish command, and wait for it to end if the user asked so
-    def handle_publish(self, connection, version, payload):
+    def handle_publish(self, connection, version, payload, timeout=30):
+        if defer_publish(connection):
+            return
         publish_code, publish_response = send_request(
             connection, version, "publish"
         )
@@ -1677,9 +3182,9 @@ class CheckPointRequest(object):
             self.discard_and_fail(
                 publish_code, publish_response, connection, version
             )
-        if payload.get("wait_for_task"):
+        if self.to_wait_for_task or payload.get("wait_for_task"):
             self.wait_for_task(
-                version, connection, publish_response["task-id"]
+                version, connection, publish_response["task-id"], timeout
             )
 
     # handle call
@@ -1693,6 +3198,7 @@ class CheckPointRequest(object):
             session_uid=None,
             to_publish=False,
     ):
+        timeout = self.wait_for_task_timeout
         code, response = send_request(connection, version, api_url, payload)
         if code != 200:
             if to_discard_on_failure:
@@ -1708,22 +3214,27 @@ class CheckPointRequest(object):
                     + parse_fail_message(code, response)
                 )
         else:
-            if "wait_for_task" in payload and payload["wait_for_task"]:
+            if self.to_wait_for_task or payload.get("wait_for_task"):
                 if "task-id" in response:
                     response = self.wait_for_task(
-                        version, connection, response["task-id"]
+                        version, connection, response["task-id"], timeout
                     )
                 elif "tasks" in response:
-                    for task in response["tasks"]:
-                        if "task-id" in task:
-                            task_id = task["task-id"]
-                            response[task_id] = self.wait_for_task(
-                                version, connection, task["task-id"]
+                    task_ids = [
+                        task["task-id"]
+                        for task in response["tasks"]
+                        if "task-id" in task
+                    ]
+                    if task_ids:
+                        response.update(
+                            poll_tasks(
+                                connection, version, task_ids, timeout=timeout
                             )
+                        )
                     del response["tasks"]
 
         if to_publish:
-            self.handle_publish(connection, version, payload)
+            self.handle_publish(connection, version, payload, timeout)
         return code, response
 
     # handle the call and set the result with 'changed' and teh response
@@ -179,6 +179,18 @@ options:
     - replaced
     - gathered
     - deleted
+  wait_for_task:
+    description:
+      - Wait for the publish of I(auto_publish_session) to end before the task returns.
+    type: bool
+    default: False
+    version_added: "6.9.0"
+  wait_for_task_timeout:
+    description:
+      - How many minutes to wait for the publish to end until throwing a timeout error.
+    type: int
+    default: 30
+    version_added: "6.9.0"
 """
 
 EXAMPLES = """
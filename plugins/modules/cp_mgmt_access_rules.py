@@ -273,6 +273,17 @@ options:
         representation of the object.
     type: str
     choices: ['uid', 'standard', 'full']
+  bulk:
+    description:
+      - Fetch the rulebase of the layer once, compare it with all the rules locally and send only the needed changes,
+        instead of running the access rule module for each rule.
+      - New rules that follow each other are added with a single add-rules-batch call when the management server
+        supports it. Errors and warnings of these rules are reported when publishing the session.
+      - When several rules of the layer have the same name, the given rules of that name are matched with them in their
+        order in the rulebase. Rules without a name are never matched.
+    type: bool
+    default: false
+    version_added: "6.9.0"
 extends_documentation_fragment: check_point.mgmt.checkpoint_objects_action_module
 """
 
@@ -291,6 +302,19 @@ EXAMPLES = """
         state: present
     layer: Network
     auto_publish_session: true
+
+- name: add-access-rules-in-bulk
+  cp_mgmt_access_rules:
+    rules:
+      - name: Rule 1
+        service:
+          - SMTP
+        state: present
+      - name: Rule 2
+        state: absent
+    layer: Network
+    bulk: true
+    auto_publish_session: true
 """
 
 RETURN = """
@@ -434,6 +458,7 @@ def main():
         ),
         layer=dict(type="str", required=True),
         details_level=dict(type="str", choices=["uid", "standard", "full"]),
+        bulk=dict(type="bool", default=False),
     )
 
     argument_spec["rules"]["options"]["vpn_list"]["options"]["directional"][
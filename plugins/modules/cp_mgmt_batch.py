@@ -0,0 +1,125 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Ansible module to manage Check Point Firewall (c) 2019
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+ANSIBLE_METADATA = {
+    "metadata_version": "1.1",
+    "status": ["preview"],
+    "supported_by": "community",
+}
+
+DOCUMENTATION = """
+---
+module: cp_mgmt_batch
+short_description: Run a list of Web API commands in a single task.
+description:
+  - Run a list of Web API commands, in order, over one connection and in a single task.
+  - Commands that return a task are waited for together with the other commands that were sent with them.
+  - If any of the commands fails, the unpublished changes of the session are discarded.
+  - The session is published once, after all the commands were run.
+  - All operations are performed over Web Services API.
+version_added: "6.9.0"
+author: "Eden Brillant (@chkp-edenbr)"
+options:
+  commands:
+    description:
+      - The commands to run, in order.
+    type: list
+    elements: dict
+    required: True
+    suboptions:
+      command:
+        description:
+          - The Web API command, for example C(add-host) or C(set-group).
+        type: str
+        required: True
+      payload:
+        description:
+          - The payload of the command.
+        type: dict
+  concurrency:
+    description:
+      - How many commands are sent at once.
+      - Commands that are sent together must not depend on each other.
+      - The amount of requests that are in flight is also bounded by the C(max_concurrent_requests) connection option.
+    type: int
+    default: 1
+extends_documentation_fragment: check_point.mgmt.checkpoint_commands
+"""
+
+EXAMPLES = """
+- name: add a group and its members
+  cp_mgmt_batch:
+    commands:
+      - command: add-host
+        payload:
+          name: host1
+          ip-address: 192.0.2.1
+      - command: add-host
+        payload:
+          name: host2
+          ip-address: 192.0.2.2
+      - command: add-group
+        payload:
+          name: group1
+          members:
+            - host1
+            - host2
+"""
+
+RETURN = """
+cp_mgmt_batch:
+  description: The command and the checkpoint output of each of the commands, in order.
+  returned: always.
+  type: list
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint import (
+    checkpoint_argument_spec_for_commands,
+    api_commands,
+)
+
+
+def main():
+    argument_spec = dict(
+        commands=dict(
+            type="list",
+            elements="dict",
+            required=True,
+            options=dict(
+                command=dict(type="str", required=True),
+                payload=dict(type="dict"),
+            ),
+        ),
+        concurrency=dict(type="int", default=1),
+    )
+    argument_spec.update(checkpoint_argument_spec_for_commands)
+
+    module = AnsibleModule(argument_spec=argument_spec)
+
+    result = api_commands(module)
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Ansible module to manage Check Point Firewall (c) 2019
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+ANSIBLE_METADATA = {
+    "metadata_version": "1.1",
+    "status": ["preview"],
+    "supported_by": "community",
+}
+
+DOCUMENTATION = """
+---
+module: cp_mgmt_delete_objects_batch
+short_description: Delete existing objects in batch. Use this API to achieve optimum performance when removing many objects.
+description:
+  - Delete existing objects in batch. Use this API to achieve optimum performance when removing many objects.
+  - The objects are sent in chunks of I(batch_size) objects, and the task of each chunk is waited for before the next
+    chunk is sent.
+  - When a chunk fails, the objects that its task reports errors of are reported as failed, and the other objects
+    of the chunk are sent again, so they are still deleted. When the task does not tell which objects failed, the chunk
+    is split and sent again, down to chunks of 10 objects, which are reported as failed as a whole.
+  - This module is not idempotent.
+  - All operations are performed over Web Services API.
+  - Available from R80.40 management version.
+version_added: "6.9.0"
+author: "Eden Brillant (@chkp-edenbr)"
+options:
+  objects:
+    description:
+      - Batch of objects separated by types.
+    type: list
+    elements: dict
+    required: True
+    suboptions:
+      type:
+        description:
+          - Type of the objects to be deleted.
+        type: str
+        required: True
+      list:
+        description:
+          - List of objects from the same type to be deleted. <br>Use the "delete" API reference documentation for a single object command to find the
+            expected fields for the request. <br>For example, to delete hosts, use the "delete-host" command found in the
+            API reference documentation.
+        type: list
+        elements: dict
+  batch_size:
+    description:
+      - The maximal amount of objects that are sent to the server in a single request.
+    type: int
+    default: 500
+  parallel_sessions:
+    description:
+      - When greater than 1, the objects are split between this amount of new sessions, which log in with the credentials
+        of the connection and send their chunks at the same time. An object is always sent by the same session.
+      - Each session publishes its own changes, regardless of I(auto_publish_session), and the session of the
+        connection is not used.
+      - Objects that fail, for example because they refer to objects of another session, are sent again after the
+        sessions published, for as long as some of them succeed.
+    type: int
+    default: 1
+  ignore_failed_objects:
+    description:
+      - Whether to keep the changes of the other objects when some of the objects fail.
+      - When false, the module fails and the unpublished changes are discarded if any object fails. The changes of
+        parallel sessions are already published, and are not discarded.
+      - When false and I(parallel_sessions) is 1, the first chunk that fails ends the batch, and the chunks after it
+        are not sent. The failed chunk is returned in C(failed_chunk).
+    type: bool
+    default: False
+extends_documentation_fragment: check_point.mgmt.checkpoint_commands
+"""
+
+EXAMPLES = """
+- name: delete-objects-batch
+  cp_mgmt_delete_objects_batch:
+    objects:
+      - type: host
+        list:
+          - name: host1
+          - name: host2
+    batch_size: 1000
+"""
+
+RETURN = """
+cp_mgmt_delete_objects_batch:
+  description: The amount of objects that were deleted, and the objects that failed with the failure message of each.
+  returned: always.
+  type: dict
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint import (
+    checkpoint_argument_spec_for_commands,
+    api_objects_batch,
+    OBJECTS_BATCH_SIZE,
+)
+
+
+def main():
+    argument_spec = dict(
+        objects=dict(
+            type="list",
+            elements="dict",
+            required=True,
+            options=dict(
+                type=dict(type="str", required=True),
+                list=dict(type="list", elements="dict"),
+            ),
+        ),
+        batch_size=dict(type="int", default=OBJECTS_BATCH_SIZE),
+        parallel_sessions=dict(type="int", default=1),
+        ignore_failed_objects=dict(type="bool", default=False),
+    )
+    argument_spec.update(checkpoint_argument_spec_for_commands)
+
+    module = AnsibleModule(argument_spec=argument_spec)
+
+    command = "delete-objects-batch"
+
+    result = api_objects_batch(module, command)
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
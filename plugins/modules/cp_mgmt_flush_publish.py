@@ -0,0 +1,75 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Ansible module to manage Check Point Firewall (c) 2019
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+ANSIBLE_METADATA = {
+    "metadata_version": "1.1",
+    "status": ["preview"],
+    "supported_by": "community",
+}
+
+DOCUMENTATION = """
+---
+module: cp_mgmt_flush_publish
+short_description: Publish the session if tasks deferred their publish to it.
+description:
+  - Publish the session if tasks deferred their publish to it, when the C(deferred_publish) connection option is set.
+  - Should run at the end of the play, or as a handler that the tasks which change the session notify.
+  - If the publish fails, the unpublished changes are discarded.
+  - All operations are performed over Web Services API.
+version_added: "6.9.0"
+author: "Eden Brillant (@chkp-edenbr)"
+options: {}
+extends_documentation_fragment: check_point.mgmt.checkpoint_commands
+"""
+
+EXAMPLES = """
+- name: publish the changes of the play
+  cp_mgmt_flush_publish:
+"""
+
+RETURN = """
+cp_mgmt_flush_publish:
+  description: The checkpoint publish output.
+  returned: when the session was published.
+  type: dict
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint import (
+    checkpoint_argument_spec_for_commands,
+    api_flush_publish,
+)
+
+
+def main():
+    argument_spec = dict()
+    argument_spec.update(checkpoint_argument_spec_for_commands)
+
+    module = AnsibleModule(argument_spec=argument_spec)
+
+    result = api_flush_publish(module)
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
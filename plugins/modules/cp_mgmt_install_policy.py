@@ -85,6 +85,16 @@ options:
       - The UID of the revision of the policy to install.
       - Available from R80.10 management version.
     type: str
+  skip_if_unchanged:
+    description:
+      - Don't install the policy if it was installed on all the targets after the last published session, and return
+        changed false instead.
+      - The install is always done when no I(targets) are given, or when the policy is not installed on a target.
+      - The install is also always done when I(revision), I(prepare_only), I(qos) or I(desktop_security) is set,
+        because the installed revision and the installed policies of these blades are not compared.
+    type: bool
+    default: False
+    version_added: "6.9.0"
 extends_documentation_fragment: check_point.mgmt.checkpoint_commands
 """
 
@@ -96,6 +106,13 @@ EXAMPLES = """
     targets:
       - corporate-gateway
     threat_prevention: true
+
+- name: install-policy only if something was published since the last install
+  cp_mgmt_install_policy:
+    policy_package: standard
+    targets:
+      - corporate-gateway
+    skip_if_unchanged: true
 """
 
 RETURN = """
@@ -106,11 +123,23 @@ cp_mgmt_install_policy:
 """
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.connection import Connection
 from ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint import (
     checkpoint_argument_spec_for_commands,
     api_command,
+    get_version,
+    is_policy_installed_since_last_publish,
 )
 
+# the installed revision and the installed policies of these blades are not compared by skip_if_unchanged, so the
+# install is never skipped when one of them is set
+SKIP_IF_UNCHANGED_UNSUPPORTED_PARAMS = [
+    "revision",
+    "prepare_only",
+    "qos",
+    "desktop_security",
+]
+
 
 def main():
     argument_spec = dict(
@@ -123,6 +152,7 @@ def main():
         install_on_all_cluster_members_or_fail=dict(type="bool"),
         prepare_only=dict(type="bool"),
         revision=dict(type="str"),
+        skip_if_unchanged=dict(type="bool", default=False),
     )
     argument_spec.update(checkpoint_argument_spec_for_commands)
 
@@ -130,6 +160,21 @@ def main():
 
     command = "install-policy"
 
+    # skip_if_unchanged is not an API parameter
+    skip_if_unchanged = module.params.pop("skip_if_unchanged")
+    if any(module.params[p] for p in SKIP_IF_UNCHANGED_UNSUPPORTED_PARAMS):
+        skip_if_unchanged = False
+    if skip_if_unchanged and is_policy_installed_since_last_publish(
+        Connection(module._socket_path),
+        get_version(module),
+        module.params["policy_package"],
+        module.params["targets"],
+    ):
+        module.exit_json(
+            changed=False,
+            msg="The policy was installed on all the targets after the last publish",
+        )
+
     result = api_command(module, command)
     module.exit_json(**result)
 
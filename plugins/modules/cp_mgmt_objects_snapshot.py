@@ -0,0 +1,105 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Ansible module to manage Check Point Firewall (c) 2019
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+ANSIBLE_METADATA = {
+    "metadata_version": "1.1",
+    "status": ["preview"],
+    "supported_by": "community",
+}
+
+DOCUMENTATION = """
+---
+module: cp_mgmt_objects_snapshot
+short_description: Keep a local snapshot of all the objects, updated by the changes published since the last run.
+description:
+  - Keep a local snapshot of all the objects, together with the last published session it is up to date with.
+  - The first run reads all the objects. Later runs read only the changes that were published since the session of
+    the snapshot, with show-changes, apply them to the snapshot and return them as the drift since the last run.
+  - The drift of the first run is empty.
+  - All operations are performed over Web Services API.
+  - Available from R80.10 management version.
+version_added: "6.9.0"
+author: "Eden Brillant (@chkp-edenbr)"
+options:
+  path:
+    description:
+      - The file of the snapshot, on the host the module runs on, which is the controller with the httpapi connection.
+      - The snapshot is created when the file does not exist.
+      - The module fails when the file is not a valid snapshot, for example after it was truncated. Remove the file to
+        take a new snapshot.
+    type: path
+    required: True
+  details_level:
+    description:
+      - The level of detail of the objects of the snapshot. The same level should be used by all the runs of the same
+        snapshot.
+    type: str
+    choices: ['uid', 'standard', 'full']
+extends_documentation_fragment: check_point.mgmt.checkpoint_commands
+"""
+
+EXAMPLES = """
+- name: objects-snapshot
+  cp_mgmt_objects_snapshot:
+    path: /var/lib/checkpoint/objects.json
+    details_level: full
+  register: snapshot
+
+- name: report the objects that changed since the last run
+  debug:
+    var: snapshot.cp_mgmt_objects_snapshot.drift
+"""
+
+RETURN = """
+cp_mgmt_objects_snapshot:
+  description:
+    - The path, published session and amount of objects of the snapshot, and the uid, name and type of the objects
+      that were added, modified and deleted since the last run.
+  returned: always.
+  type: dict
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint import (
+    checkpoint_argument_spec_for_commands,
+    api_objects_snapshot,
+)
+
+
+def main():
+    argument_spec = dict(
+        path=dict(type="path", required=True),
+        details_level=dict(type="str", choices=["uid", "standard", "full"]),
+    )
+    argument_spec.update(checkpoint_argument_spec_for_commands)
+
+    module = AnsibleModule(
+        argument_spec=argument_spec, supports_check_mode=True
+    )
+
+    result = api_objects_snapshot(module)
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,860 @@
+# Ansible module to manage CheckPoint Firewall (c) 2019
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+
+import pytest
+
+from ansible_collections.check_point.mgmt.plugins.module_utils import (
+    checkpoint,
+)
+
+TASK_ID = "2eec70e5-78a8-4bdb-9a76-cfb5601d0bcb"
+OTHER_TASK_ID = "7f9a6dcc-7ab9-4a33-9f0e-1b3b0f4b3c11"
+
+
+def task(status, progress=100, task_id=TASK_ID):
+    return {
+        "task-id": task_id,
+        "task-name": "Publish operation",
+        "status": status,
+        "progress-percentage": progress,
+    }
+
+
+def task_response(status, progress=100):
+    return 200, {"tasks": [task(status, progress)]}
+
+
+class TestCheckpointTaskPolling(object):
+    @pytest.fixture
+    def sleep_mock(self, mocker):
+        return mocker.patch(
+            "ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint.time.sleep"
+        )
+
+    def test_poll_task_returns_when_task_succeeds(self, mocker, sleep_mock):
+        connection = mocker.Mock()
+        connection.send_request.side_effect = [
+            task_response("in progress", 0),
+            task_response("in progress", 0),
+            task_response("succeeded"),
+            task_response("succeeded"),
+        ]
+
+        response = checkpoint.poll_task(connection, "", TASK_ID)
+
+        assert response["tasks"][0]["status"] == "succeeded"
+        assert [c[0][0] for c in sleep_mock.call_args_list] == [0.5, 1.0]
+
+    def test_poll_task_fetches_full_details_only_when_done(
+        self, mocker, sleep_mock
+    ):
+        connection = mocker.Mock()
+        connection.send_request.side_effect = [
+            task_response("in progress", 50),
+            task_response("succeeded"),
+            task_response("succeeded"),
+        ]
+
+        checkpoint.poll_task(connection, "", TASK_ID)
+
+        details_levels = [
+            c[0][1]["details-level"]
+            for c in connection.send_request.call_args_list
+        ]
+        assert details_levels == ["standard", "standard", "full"]
+
+    def test_poll_task_fails_when_task_fails(self, mocker, sleep_mock):
+        connection = mocker.Mock()
+        connection.send_request.return_value = task_response("failed")
+
+        with pytest.raises(Exception) as ex:
+            checkpoint.poll_task(connection, "", TASK_ID)
+
+        assert "with task id {0} failed".format(TASK_ID) in str(ex.value)
+
+    def test_poll_task_fails_on_timeout(self, mocker, sleep_mock):
+        connection = mocker.Mock()
+        connection.send_request.return_value = task_response("in progress")
+
+        with pytest.raises(Exception) as ex:
+            checkpoint.poll_task(connection, "", TASK_ID, timeout=0)
+
+        assert "Timeout" in str(ex.value)
+        sleep_mock.assert_not_called()
+
+    def test_poll_tasks_polls_pending_tasks_together(self, mocker, sleep_mock):
+        connection = mocker.Mock()
+        connection.send_request.side_effect = [
+            (
+                200,
+                {
+                    "tasks": [
+                        task("succeeded"),
+                        task("in progress", 20, OTHER_TASK_ID),
+                    ]
+                },
+            ),
+            (200, {"tasks": [task("succeeded")]}),
+            (200, {"tasks": [task("succeeded", task_id=OTHER_TASK_ID)]}),
+            (200, {"tasks": [task("succeeded", task_id=OTHER_TASK_ID)]}),
+        ]
+
+        responses = checkpoint.poll_tasks(
+            connection, "", [TASK_ID, OTHER_TASK_ID]
+        )
+
+        assert sorted(responses.keys()) == sorted([TASK_ID, OTHER_TASK_ID])
+        polled_task_ids = [
+            c[0][1]["task-id"] for c in connection.send_request.call_args_list
+        ]
+        assert polled_task_ids == [
+            [TASK_ID, OTHER_TASK_ID],
+            [TASK_ID],
+            [OTHER_TASK_ID],
+            [OTHER_TASK_ID],
+        ]
+
+    def test_next_poll_interval_grows_up_to_max_interval(self):
+        assert checkpoint.get_next_poll_interval(1, [], 0.5, 10) == 2
+        assert checkpoint.get_next_poll_interval(8, [], 0.5, 10) == 10
+
+    def test_next_poll_interval_follows_task_progress(self):
+        # 10% in 2 seconds, so the remaining 10% should take 2 more seconds
+        progress_history = [(100.0, 80), (102.0, 90)]
+
+        assert (
+            checkpoint.get_next_poll_interval(4, progress_history, 0.5, 10)
+            == 2
+        )
+
+
+def access_rule(name, action="Accept", source=None):
+    return {
+        "type": "access-rule",
+        "name": name,
+        "uid": name + "-uid",
+        "action": {"name": action, "uid": action + "-uid"},
+        "source": [
+            {"name": host, "uid": host + "-uid"} for host in source or []
+        ],
+        "enabled": True,
+    }
+
+
+def rulebase_responses(rulebase):
+    total = len(rulebase)
+    return {
+        "show-access-rulebase": [
+            (200, {"total": total}),
+            (200, {"rulebase": rulebase, "to": total, "total": total}),
+        ]
+    }
+
+
+def fake_connection(mocker, responses):
+    connection = mocker.Mock()
+
+    def send_request(path, payload=None):
+        return responses[path.split("/")[-1]].pop(0)
+
+    connection.send_request.side_effect = send_request
+    connection.get_paging_options.return_value = {
+        "max_concurrent_requests": 1,
+        "rulebase_page_limit": 0,
+    }
+    return connection
+
+
+class TestCheckpointAccessRulesBulk(object):
+    def test_rule_value_matches_objects_by_name_or_uid(self):
+        existing = [
+            {"name": "host1", "uid": "1"},
+            {"name": "host2", "uid": "2"},
+        ]
+
+        assert checkpoint.rule_value_matches(["2", "host1"], existing)
+        assert not checkpoint.rule_value_matches(["host1"], existing)
+        assert checkpoint.rule_value_matches("any", [{"name": "Any"}])
+        assert checkpoint.rule_value_matches(
+            {"type": "Log"}, {"type": {"name": "Log"}}
+        )
+        assert checkpoint.rule_value_matches([{"name": "x"}], []) is None
+
+    def test_changes_are_found_locally(self, mocker):
+        rulebase = [
+            {
+                "type": "access-section",
+                "name": "Section",
+                "rulebase": [
+                    access_rule("A", source=["host1"]),
+                    access_rule("B"),
+                ],
+            }
+        ]
+        connection = fake_connection(mocker, rulebase_responses(rulebase))
+        rules = [
+            {"name": "A", "action": "accept", "source": ["host1"]},
+            {"name": "C", "action": "Drop"},
+            {"name": "B", "action": "Drop"},
+            {"name": "D", "state": "absent"},
+        ]
+
+        changes = checkpoint.get_access_rules_changes(
+            connection, "", "Network", rules
+        )
+
+        assert [(c["command"], c["name"]) for c in changes] == [
+            ("add-access-rule", "C"),
+            ("set-access-rule", "B"),
+        ]
+        assert changes[0]["payload"]["position"] == {"below": "A-uid"}
+        assert changes[0]["rule-number"] == 2
+        assert "new-position" not in changes[1]["payload"]
+        assert connection.send_request.call_count == 2
+
+    def test_changes_move_and_delete_rules(self, mocker):
+        rulebase = [access_rule("A"), access_rule("B"), access_rule("C")]
+        connection = fake_connection(mocker, rulebase_responses(rulebase))
+        rules = [
+            {"name": "B", "state": "present"},
+            {"name": "A", "state": "present"},
+            {"name": "C", "state": "absent"},
+        ]
+
+        changes = checkpoint.get_access_rules_changes(
+            connection, "", "Network", rules
+        )
+
+        assert [c["payload"] for c in changes] == [
+            {"uid": "B-uid", "layer": "Network", "new-position": 1},
+            {"uid": "C-uid", "layer": "Network"},
+        ]
+        assert changes[1]["command"] == "delete-access-rule"
+
+    def test_unnamed_and_same_name_rules_are_kept_apart(self, mocker):
+        rulebase = [
+            dict(access_rule("A"), uid="a1"),
+            dict(access_rule(""), name=None, uid="unnamed1"),
+            dict(access_rule("A", action="Drop"), uid="a2"),
+            dict(access_rule(""), name=None, uid="unnamed2"),
+        ]
+        connection = fake_connection(mocker, rulebase_responses(rulebase))
+        rules = [
+            {"name": "A", "action": "Accept"},
+            {"name": "A", "action": "Accept"},
+            {"name": "B", "action": "Accept"},
+        ]
+
+        changes = checkpoint.get_access_rules_changes(
+            connection, "", "Network", rules
+        )
+
+        assert [c["payload"] for c in changes] == [
+            {
+                "uid": "a2",
+                "layer": "Network",
+                "action": "Accept",
+                "new-position": {"below": "a1"},
+            },
+            {
+                "name": "B",
+                "layer": "Network",
+                "action": "Accept",
+                "position": {"below": "a2"},
+            },
+        ]
+        assert [c["rule-number"] for c in changes] == [2, 3]
+        assert connection.send_request.call_count == 2
+
+    def test_uncertain_rule_is_compared_by_the_server(self, mocker):
+        responses = rulebase_responses([access_rule("A")])
+        responses["equals"] = [(200, {"equals": True})]
+        connection = fake_connection(mocker, responses)
+        rules = [{"name": "A", "vpn_list": [{"community": ["MyIntranet"]}]}]
+
+        changes = checkpoint.get_access_rules_changes(
+            connection, "", "Network", rules
+        )
+
+        assert changes == []
+        assert connection.send_request.call_args[0][0] == "/web_api/equals"
+
+    def test_new_rules_are_added_in_batch(self, mocker):
+        mocker.patch(
+            "ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint.poll_task"
+        )
+        connection = fake_connection(
+            mocker,
+            {
+                "add-rules-batch": [(200, {"task-id": "1"})],
+                "delete-access-rule": [(200, {})],
+            },
+        )
+        changes = [
+            {
+                "command": "add-access-rule",
+                "name": name,
+                "payload": {"name": name, "layer": "Network", "position": 1},
+                "rule-number": number,
+            }
+            for number, name in [(1, "A"), (2, "B")]
+        ]
+        changes.append(
+            {
+                "command": "delete-access-rule",
+                "name": "C",
+                "payload": {"name": "C", "layer": "Network"},
+            }
+        )
+
+        checkpoint.apply_access_rules_changes(
+            connection, "", "Network", changes
+        )
+
+        batch_payload = connection.send_request.call_args_list[0][0][1]
+        assert batch_payload["objects"][0]["first-position"] == 1
+        assert batch_payload["objects"][0]["list"] == [
+            {"name": "A"},
+            {"name": "B"},
+        ]
+        assert connection.send_request.call_count == 2
+
+    def test_new_rules_are_added_one_by_one_without_batch_support(
+        self, mocker
+    ):
+        connection = fake_connection(
+            mocker,
+            {
+                "add-rules-batch": [
+                    (404, {"code": "generic_err_command_not_found"})
+                ],
+                "add-access-rule": [(200, {}), (200, {})],
+            },
+        )
+        changes = [
+            {
+                "command": "add-access-rule",
+                "name": name,
+                "payload": {"name": name, "layer": "Network"},
+                "rule-number": 1,
+            }
+            for name in ["A", "B"]
+        ]
+
+        checkpoint.apply_access_rules_changes(
+            connection, "", "Network", changes
+        )
+
+        assert connection.send_request.call_count == 3
+
+
+RULEBASE_INDEX = [
+    {"name": None, "rules": [["A", "a"]]},
+    {"name": "Section 1", "rules": [["B", "b"], ["C", "c"]]},
+    {"name": "Section 2", "rules": []},
+    {"name": "Section 3", "rules": [["D", "d"]]},
+]
+
+
+class TestCheckpointRulebaseIndex(object):
+    @pytest.mark.parametrize(
+        "name, position, equals",
+        [
+            ("A", 1, True),
+            ("C", "bottom", False),
+            ("D", "bottom", True),
+            ("C", {"below": "B"}, True),
+            ("C", {"below": "b"}, True),
+            ("B", {"above": "C"}, True),
+            ("A", {"above": "B"}, False),
+            ("B", {"top": "Section 1"}, True),
+            ("C", {"bottom": "Section 1"}, True),
+            ("C", {"above": "Section 2"}, True),
+            ("C", {"above": "Section 3"}, False),
+            ("D", {"below": "Section 2"}, False),
+            ("D", {"below": "no such rule"}, True),
+        ],
+    )
+    def test_position_is_checked_in_index(self, name, position, equals):
+        payload = {"name": name, "layer": "Network", "position": position}
+
+        assert (
+            checkpoint.is_equals_with_position_in_index(
+                payload, RULEBASE_INDEX
+            )
+            is equals
+        )
+
+    def test_position_is_checked_without_requests_when_indexed(self, mocker):
+        connection = mocker.Mock()
+        connection.get_rulebase_index.return_value = RULEBASE_INDEX
+        payload = {"name": "C", "layer": "Network", "position": 3}
+
+        assert checkpoint.is_equals_with_position_param(
+            payload, connection, "", "access-rule"
+        )
+        connection.get_rulebase_index.assert_called_once_with(
+            "", "show-access-rulebase", {"name": "Network"}
+        )
+        connection.send_request.assert_not_called()
+
+
+class TestCheckpointRulebasePaging(object):
+    @staticmethod
+    def _rulebase_server(rules_amount, max_limit):
+        # pages of a rulebase like the server returns them, with its default page size when no limit is sent
+        def show_rulebase(path, payload):
+            offset = payload.get("offset", 0)
+            limit = min(payload.get("limit", 50), max_limit)
+            to = min(offset + limit, rules_amount)
+            return (
+                200,
+                {
+                    "rulebase": list(range(offset, to)),
+                    "from": offset + 1,
+                    "to": to,
+                    "total": rules_amount,
+                },
+            )
+
+        return show_rulebase
+
+    @pytest.mark.parametrize(
+        "rules_amount, concurrency, max_limit",
+        [(1000, 4, 500), (1000, 1, 500), (2001, 4, 500), (1000, 4, 100)],
+    )
+    def test_every_rule_is_fetched(
+        self, mocker, rules_amount, concurrency, max_limit
+    ):
+        connection = mocker.Mock()
+        connection.get_paging_options.return_value = {
+            "max_concurrent_requests": concurrency,
+            "rulebase_page_limit": 0,
+        }
+        show_rulebase = self._rulebase_server(rules_amount, max_limit)
+        connection.send_request.side_effect = show_rulebase
+        connection.send_requests.side_effect = lambda requests: [
+            show_rulebase(*request) for request in requests
+        ]
+
+        pages = list(
+            checkpoint.get_rulebase_generator(
+                connection,
+                "",
+                {"name": "Network"},
+                "show-access-rulebase",
+                rules_amount,
+            )
+        )
+
+        assert [rule for page in pages for rule in page] == list(
+            range(rules_amount)
+        )
+        for request in connection.send_requests.call_args_list:
+            for path, payload in request[0][0]:
+                assert "limit" in payload
+
+    @pytest.mark.parametrize(
+        "options, rules_amount, paging",
+        [
+            (
+                {"max_concurrent_requests": 4, "rulebase_page_limit": 0},
+                10,
+                (50, 4),
+            ),
+            (
+                {"max_concurrent_requests": 4, "rulebase_page_limit": 0},
+                1000,
+                (250, 4),
+            ),
+            (
+                {"max_concurrent_requests": 1, "rulebase_page_limit": 0},
+                10000,
+                (500, 1),
+            ),
+            (
+                {"max_concurrent_requests": 4, "rulebase_page_limit": 20},
+                1000,
+                (20, 4),
+            ),
+        ],
+    )
+    def test_page_limit_follows_rulebase_size(
+        self, mocker, options, rules_amount, paging
+    ):
+        connection = mocker.Mock()
+        connection.get_paging_options.return_value = options
+
+        assert (
+            checkpoint.get_rulebase_paging(connection, rules_amount) == paging
+        )
+
+
+class TestCheckpointLocalEquals(object):
+    HOST = {
+        "name": "h1",
+        "ipv4-address": "1.2.3.4",
+        "groups": [{"name": "g1", "uid": "g1-uid"}],
+        "color": "black",
+        "nat-settings": {"auto-rule": False},
+    }
+
+    @pytest.mark.parametrize(
+        "params, equals",
+        [
+            ({"name": "h1", "ip-address": "1.2.3.4"}, True),
+            ({"name": "h1", "groups": ["g1"], "color": "black"}, True),
+            ({"name": "h1", "ip-address": "1.2.3.5"}, False),
+            ({"name": "h1", "groups": []}, False),
+            ({"name": "h1", "nat-settings": {"method": "static"}}, None),
+            ({"name": "h1", "comments": "new"}, None),
+        ],
+    )
+    def test_object_is_compared_locally(self, params, equals):
+        assert checkpoint.is_equals_locally(params, self.HOST) is equals
+
+    @pytest.mark.parametrize(
+        "object_type, plural",
+        [
+            ("host", "hosts"),
+            ("service-tcp", "services-tcp"),
+            ("service-group", "service-groups"),
+            ("vpn-community-star", "vpn-communities-star"),
+            ("group-with-exclusion", "groups-with-exclusion"),
+        ],
+    )
+    def test_plural_object_type(self, object_type, plural):
+        assert checkpoint.get_plural_object_type(object_type) == plural
+
+
+class TestCheckpointObjectsBatch(object):
+    OBJECTS = [
+        {
+            "type": "host",
+            "list": [{"name": "h%d" % i} for i in range(20)],
+        },
+        {"type": "network", "list": [{"uid": "n-uid"}, {"name": "h3"}]},
+    ]
+
+    def test_chunks_keep_types_together(self):
+        chunks = checkpoint.get_objects_batch_chunks(self.OBJECTS, 15)
+
+        assert [[(o["type"], len(o["list"])) for o in c] for c in chunks] == [
+            [("host", 15)],
+            [("host", 5), ("network", 2)],
+        ]
+
+    def test_partitions_never_share_an_object_name(self):
+        partitions = checkpoint.partition_objects_batch(self.OBJECTS, 4)
+
+        names = [
+            [
+                obj.get("name") or obj.get("uid")
+                for objects in partition
+                for obj in objects["list"]
+            ]
+            for partition in partitions
+        ]
+        assert sorted(sum(names, [])) == sorted(
+            obj.get("name") or obj.get("uid")
+            for objects in self.OBJECTS
+            for obj in objects["list"]
+        )
+        assert len([p for p in names if "h3" in p]) == 1
+
+    def test_unknown_failures_stop_splitting_at_the_min_size(self, mocker):
+        connection = mocker.Mock()
+        batches = []
+
+        def send_request(path, payload):
+            if path == "/web_api/add-objects-batch":
+                batches.append(
+                    [obj["name"] for obj in payload["objects"][0]["list"]]
+                )
+                return 200, {"task-id": "task"}
+            status = "failed" if "h7" in batches[-1] else "succeeded"
+            return 200, {
+                "tasks": [
+                    {"task-id": "task", "task-name": "batch", "status": status}
+                ]
+            }
+
+        connection.send_request.side_effect = send_request
+        chunk = [
+            {"type": "host", "list": [{"name": "h%d" % i} for i in range(25)]}
+        ]
+
+        applied, failures = checkpoint.run_objects_batch_chunk(
+            connection, "", "add-objects-batch", chunk, [1, 0, 0]
+        )
+
+        assert applied == 19
+        assert [failure["object"]["name"] for failure in failures] == [
+            "h%d" % i for i in range(7, 13)
+        ]
+        assert [len(batch) for batch in batches] == [25, 13, 7, 6, 12]
+
+
+class TestCheckpointInstallPolicySkip(object):
+    @staticmethod
+    def gateway(name, installation_time, policy_name="Standard"):
+        return {
+            "name": name,
+            "uid": name + "-uid",
+            "policy": {
+                "access-policy-installed": True,
+                "access-policy-name": policy_name,
+                "access-policy-installation-date": {
+                    "posix": installation_time
+                },
+            },
+        }
+
+    @pytest.mark.parametrize(
+        "gateways, installed",
+        [
+            ([("gw1", 2000, "Standard"), ("gw2", 3000, "standard")], True),
+            ([("gw1", 2000, "Standard"), ("gw2", 500, "Standard")], False),
+            ([("gw1", 2000, "Standard"), ("gw2", 3000, "Other")], False),
+            ([("gw1", 2000, "Standard")], False),
+        ],
+    )
+    def test_install_is_skipped_only_after_last_publish(
+        self, mocker, gateways, installed
+    ):
+        connection = mocker.Mock()
+        connection.send_request.side_effect = [
+            (200, {"publish-time": {"posix": 1000}}),
+            (
+                200,
+                {
+                    "objects": [self.gateway(*gw) for gw in gateways],
+                    "total": len(gateways),
+                },
+            ),
+        ]
+
+        assert (
+            checkpoint.is_policy_installed_since_last_publish(
+                connection, "", "Standard", ["gw1", "gw2-uid"]
+            )
+            is installed
+        )
+
+
+class TestCheckpointFactsPaging(object):
+    @staticmethod
+    def hosts_response(offset, limit, total):
+        to = min(offset + limit, total)
+        return (
+            200,
+            {
+                "objects": [{"name": "h%d" % i} for i in range(offset, to)],
+                "from": offset + 1,
+                "to": to,
+                "total": total,
+            },
+        )
+
+    @pytest.fixture
+    def connection(self, mocker):
+        connection = mocker.Mock()
+        connection.get_paging_options.return_value = {
+            "max_concurrent_requests": 2
+        }
+        connection.send_request.side_effect = lambda url, payload: (
+            self.hosts_response(payload["offset"], payload["limit"], 7)
+        )
+        connection.send_requests.side_effect = lambda requests: [
+            self.hosts_response(payload["offset"], payload["limit"], 7)
+            for url, payload in requests
+        ]
+        return connection
+
+    def test_all_pages_are_fetched(self, mocker, connection):
+        module = mocker.Mock(params={"fetch_all": True, "output_file": None})
+        response = checkpoint.get_facts_pages_response(
+            module, connection, "", "show-hosts", {"limit": 2}
+        )
+
+        assert [obj["name"] for obj in response["objects"]] == [
+            "h%d" % i for i in range(7)
+        ]
+        assert response["to"] == 7
+        assert [
+            [payload["offset"] for url, payload in c[0][0]]
+            for c in connection.send_requests.call_args_list
+        ] == [[2, 4]]
+        connection.send_request.assert_called_with(
+            "/web_api/show-hosts", {"limit": 2, "offset": 6}
+        )
+
+    def test_objects_are_written_to_output_file(
+        self, mocker, connection, tmp_path
+    ):
+        output_file = str(tmp_path / "hosts.json")
+        module = mocker.Mock(
+            params={"fetch_all": True, "output_file": output_file}
+        )
+        response = checkpoint.get_facts_pages_response(
+            module, connection, "", "show-hosts", {"limit": 3}
+        )
+
+        assert response == {
+            "output-file": output_file,
+            "written": 7,
+            "total": 7,
+        }
+        with open(output_file) as f:
+            assert [json.loads(line)["name"] for line in f] == [
+                "h%d" % i for i in range(7)
+            ]
+
+    def test_sections_cut_between_pages_are_merged(self):
+        merged = {
+            "rulebase": [{"uid": "s1", "rulebase": [{"uid": "r1"}]}],
+            "objects-dictionary": [{"uid": "o1"}],
+            "to": 1,
+        }
+        page = {
+            "rulebase": [
+                {"uid": "s1", "rulebase": [{"uid": "r2"}]},
+                {"uid": "r3"},
+            ],
+            "objects-dictionary": [{"uid": "o1"}, {"uid": "o2"}],
+            "to": 3,
+        }
+
+        assert checkpoint.merge_show_page(merged, page, "rulebase") == {
+            "rulebase": [
+                {"uid": "s1", "rulebase": [{"uid": "r1"}, {"uid": "r2"}]},
+                {"uid": "r3"},
+            ],
+            "objects-dictionary": [{"uid": "o1"}, {"uid": "o2"}],
+            "to": 3,
+        }
+
+
+class TestCheckpointSlimResponse(object):
+    RESPONSE = {
+        "objects": [
+            {
+                "name": "h1",
+                "ipv4-address": "1.2.3.4",
+                "icon": "NetworkObjects/host",
+                "meta-info": {"lock": "unlocked"},
+                "groups": [{"name": "g1", "icon": "General/group"}],
+            }
+        ],
+        "total": 1,
+    }
+
+    def test_bulky_keys_are_dropped_by_default(self, mocker):
+        module = mocker.Mock(
+            params={"fields": None, "drop_keys": checkpoint.RESULT_DROP_KEYS}
+        )
+
+        assert checkpoint.slim_response(module, self.RESPONSE) == {
+            "objects": [
+                {
+                    "name": "h1",
+                    "ipv4-address": "1.2.3.4",
+                    "groups": [{"name": "g1"}],
+                }
+            ],
+            "total": 1,
+        }
+
+    def test_fields_are_projected_through_lists(self, mocker):
+        module = mocker.Mock(
+            params={
+                "fields": ["objects.name", "objects.groups.name", "total"],
+                "drop_keys": [],
+            }
+        )
+
+        assert checkpoint.slim_response(module, self.RESPONSE) == {
+            "objects": [{"name": "h1", "groups": [{"name": "g1"}]}],
+            "total": 1,
+        }
+
+
+class TestCheckpointShowChanges(object):
+    def test_changes_are_applied_in_order(self):
+        objects = {
+            "h1-uid": {"uid": "h1-uid", "name": "h1", "type": "host"},
+        }
+        changes = [
+            {
+                "operations": {
+                    "added-objects": [
+                        {"uid": "h2-uid", "name": "h2", "type": "host"}
+                    ]
+                }
+            },
+            {
+                "operations": {
+                    "deleted-objects": [
+                        {"uid": "h1-uid", "name": "h1", "type": "host"}
+                    ]
+                }
+            },
+        ]
+
+        drift = checkpoint.apply_show_changes(objects, changes)
+
+        assert list(objects) == ["h2-uid"]
+        assert drift == {
+            "added": [{"uid": "h2-uid", "name": "h2", "type": "host"}],
+            "modified": [],
+            "deleted": [{"uid": "h1-uid", "name": "h1", "type": "host"}],
+        }
+        assert checkpoint.get_changes_amount(changes) == 2
+
+
+class TestCheckpointRetryCounters(object):
+    def test_retries_are_added_to_the_result(self, mocker):
+        connection = mocker.Mock()
+        connection.pop_retry_counters.return_value = {
+            "requests": 1,
+            "retries": 2,
+            "errors": {"HTTP 429": 2},
+        }
+
+        result = checkpoint.add_retry_counters(connection, {"changed": True})
+
+        assert result == {
+            "changed": True,
+            "checkpoint_retries": {
+                "requests": 1,
+                "retries": 2,
+                "errors": {"HTTP 429": 2},
+            },
+        }
+
+    def test_result_is_unchanged_without_retries(self, mocker):
+        connection = mocker.Mock()
+        connection.pop_retry_counters.return_value = {}
+
+        result = checkpoint.add_retry_counters(connection, {"changed": True})
+
+        assert result == {"changed": True}
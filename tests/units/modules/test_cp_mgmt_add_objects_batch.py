@@ -0,0 +1,242 @@
+# Ansible module to manage CheckPoint Firewall (c) 2019
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import pytest
+from units.modules.utils import (
+    set_module_args,
+    exit_json,
+    fail_json,
+    AnsibleExitJson,
+    AnsibleFailJson,
+)
+
+from ansible.module_utils import basic
+from ansible_collections.check_point.mgmt.plugins.modules import (
+    cp_mgmt_add_objects_batch,
+)
+
+PAYLOAD = {
+    "objects": [
+        {
+            "type": "host",
+            "list": [
+                {"name": "host1", "ip_address": "192.0.2.1"},
+                {"name": "host2", "ip_address": "192.0.2.2"},
+                {"name": "host3", "ip_address": "192.0.2.3"},
+            ],
+        },
+        {"type": "network", "list": [{"name": "net1", "subnet": "10.0.0.0"}]},
+    ],
+    "batch_size": 3,
+    "wait_for_task": False,
+}
+
+command = "add-objects-batch"
+
+
+def task_response(status, task_details=None):
+    return (
+        200,
+        {
+            "tasks": [
+                {
+                    "task-id": "task",
+                    "task-name": command,
+                    "status": status,
+                    "comments": "batch " + status,
+                    "task-details": task_details or [],
+                }
+            ]
+        },
+    )
+
+
+class TestCheckpointAddObjectsBatch(object):
+    module = cp_mgmt_add_objects_batch
+
+    @pytest.fixture(autouse=True)
+    def module_mock(self, mocker):
+        return mocker.patch.multiple(
+            basic.AnsibleModule, exit_json=exit_json, fail_json=fail_json
+        )
+
+    @pytest.fixture
+    def connection_mock(self, mocker):
+        connection_class_mock = mocker.patch(
+            "ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint.Connection"
+        )
+        return connection_class_mock.return_value
+
+    @pytest.fixture
+    def batches(self, connection_mock):
+        batches = []
+
+        def send_request(url, payload=None):
+            if url == "/web_api/" + command:
+                batches.append(payload["objects"])
+                return 200, {"task-id": "task"}
+            if url == "/web_api/show-task":
+                names = [
+                    obj["name"]
+                    for objects_of_type in batches[-1]
+                    for obj in objects_of_type["list"]
+                ]
+                if "host2" not in names:
+                    return task_response("succeeded")
+                return task_response(
+                    "failed",
+                    [
+                        {
+                            "errors": [
+                                {
+                                    "name": "host2",
+                                    "message": "host2 already exists",
+                                }
+                            ]
+                        }
+                    ],
+                )
+            return 200, {}
+
+        connection_mock.send_request.side_effect = send_request
+        return batches
+
+    def test_command(self, mocker, connection_mock, batches):
+        args = dict(PAYLOAD)
+        args["objects"] = [PAYLOAD["objects"][1]]
+        result = self._run_module(args)
+
+        assert result["changed"]
+        assert {"applied": 1, "failures": []} == result[command]
+        assert [
+            [
+                {
+                    "type": "network",
+                    "list": [{"name": "net1", "subnet": "10.0.0.0"}],
+                }
+            ]
+        ] == batches
+
+    def test_failed_objects_are_reported(
+        self, mocker, connection_mock, batches
+    ):
+        args = dict(PAYLOAD, ignore_failed_objects=True)
+        result = self._run_module(args)
+
+        assert result["changed"]
+        assert 3 == result[command]["applied"]
+        assert [
+            {
+                "type": "host",
+                "object": {"name": "host2", "ip-address": "192.0.2.2"},
+                "message": "host2 already exists",
+            }
+        ] == result[command]["failures"]
+        assert [
+            ["host1", "host2", "host3"],
+            ["host1", "host3"],
+            ["net1"],
+        ] == [
+            [
+                obj["name"]
+                for objects_of_type in batch
+                for obj in objects_of_type["list"]
+            ]
+            for batch in batches
+        ]
+
+    def test_failed_objects_discard(self, mocker, connection_mock, batches):
+        with pytest.raises(AnsibleFailJson) as ex:
+            self._run_module(dict(PAYLOAD, batch_size=2))
+
+        result = ex.value.args[0]
+        assert result["msg"] == (
+            "1 of 4 objects failed, the objects after the failed chunk were "
+            "not sent. First failure: host2 already exists"
+        )
+        assert not result["changed"]
+        assert 0 == result[command]["applied"]
+        assert ["host1", "host2"] == [
+            obj["name"]
+            for objects_of_type in result[command]["failed_chunk"]
+            for obj in objects_of_type["list"]
+        ]
+        # the failed chunk is neither split nor sent again
+        assert 1 == len(batches)
+        assert ("/web_api/discard", None) not in [
+            c[0] for c in connection_mock.send_request.call_args_list
+        ]
+
+    def test_failed_objects_discard_applied_chunks(
+        self, mocker, connection_mock, batches
+    ):
+        with pytest.raises(AnsibleFailJson) as ex:
+            self._run_module(dict(PAYLOAD, batch_size=1))
+
+        result = ex.value.args[0]
+        assert result["msg"].startswith(
+            "1 of 4 objects failed, the objects after the failed chunk were "
+            "not sent. First failure: host2 already exists"
+        )
+        assert result["msg"].endswith("Unpublished changes were discarded")
+        assert not result["changed"]
+        assert 0 == result[command]["applied"]
+        assert [["host1"], ["host2"]] == [
+            [
+                obj["name"]
+                for objects_of_type in batch
+                for obj in objects_of_type["list"]
+            ]
+            for batch in batches
+        ]
+        connection_mock.send_request.assert_called_with(
+            "/web_api/discard", None
+        )
+
+    def test_failed_objects_are_retried_in_parallel_sessions(
+        self, mocker, connection_mock
+    ):
+        failure = {
+            "type": "network",
+            "object": {"name": "net1", "subnet": "10.0.0.0"},
+            "message": "host3 is locked",
+        }
+        connection_mock.run_objects_batch_in_sessions.side_effect = [
+            (3, [failure]),
+            (1, []),
+        ]
+        args = dict(PAYLOAD, parallel_sessions=2)
+        result = self._run_module(args)
+
+        assert result["changed"]
+        assert {"applied": 4, "failures": []} == result[command]
+        retried_chunks = (
+            connection_mock.run_objects_batch_in_sessions.call_args[0][2]
+        )
+        assert [[[{"type": "network", "list": [failure["object"]]}]]] == (
+            retried_chunks
+        )
+        connection_mock.send_request.assert_not_called()
+
+    def _run_module(self, module_args):
+        set_module_args(module_args)
+        with pytest.raises(AnsibleExitJson) as ex:
+            self.module.main()
+        return ex.value.args[0]
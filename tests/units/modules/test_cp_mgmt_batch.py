@@ -0,0 +1,109 @@
+# Ansible module to manage CheckPoint Firewall (c) 2019
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import pytest
+from units.modules.utils import (
+    set_module_args,
+    exit_json,
+    fail_json,
+    AnsibleExitJson,
+    AnsibleFailJson,
+)
+
+from ansible.module_utils import basic
+from ansible_collections.check_point.mgmt.plugins.modules import (
+    cp_mgmt_batch,
+)
+
+PAYLOAD = {
+    "commands": [
+        {"command": "add-host", "payload": {"name": "host1"}},
+        {"command": "show-host", "payload": {"name": "host1"}},
+        {"command": "add-group", "payload": {"name": "group1"}},
+    ],
+    "concurrency": 2,
+    "wait_for_task": False,
+}
+
+failure_msg = "{command failed}"
+
+
+class TestCheckpointBatch(object):
+    module = cp_mgmt_batch
+
+    @pytest.fixture(autouse=True)
+    def module_mock(self, mocker):
+        return mocker.patch.multiple(
+            basic.AnsibleModule, exit_json=exit_json, fail_json=fail_json
+        )
+
+    @pytest.fixture
+    def connection_mock(self, mocker):
+        connection_class_mock = mocker.patch(
+            "ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint.Connection"
+        )
+        return connection_class_mock.return_value
+
+    def test_command(self, mocker, connection_mock):
+        connection_mock.send_requests.return_value = [
+            (200, {"name": "host1"}),
+            (200, {"name": "host1"}),
+        ]
+        connection_mock.send_request.return_value = (200, {"name": "group1"})
+        result = self._run_module(PAYLOAD)
+
+        assert result["changed"]
+        assert [
+            "add-host",
+            "show-host",
+            "add-group",
+        ] == [item["command"] for item in result["cp_mgmt_batch"]]
+        assert {"name": "group1"} == result["cp_mgmt_batch"][2]["response"]
+        connection_mock.send_requests.assert_called_once_with(
+            [
+                ["/web_api/add-host", {"name": "host1"}],
+                ["/web_api/show-host", {"name": "host1"}],
+            ]
+        )
+
+    def test_command_fail(self, mocker, connection_mock):
+        connection_mock.send_requests.return_value = [
+            (200, {"name": "host1"}),
+            (404, failure_msg),
+        ]
+        connection_mock.send_request.return_value = (200, {})
+        with pytest.raises(AnsibleFailJson) as ex:
+            self._run_module(PAYLOAD)
+
+        assert (
+            "Checkpoint device returned error 404 with message "
+            + failure_msg
+            + " Unpublished changes were discarded"
+            == ex.value.args[0]["msg"]
+        )
+        connection_mock.send_request.assert_called_once_with(
+            "/web_api/discard", None
+        )
+
+    def _run_module(self, module_args):
+        set_module_args(module_args)
+        with pytest.raises(AnsibleExitJson) as ex:
+            self.module.main()
+        return ex.value.args[0]
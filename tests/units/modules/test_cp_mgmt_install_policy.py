@@ -80,6 +80,38 @@ class TestCheckpointInstallPolicy(object):
             == result["msg"]
         )
 
+    @pytest.mark.parametrize(
+        "param, value",
+        [
+            ("revision", "a3c1e7b0-revision-uid"),
+            ("prepare_only", True),
+            ("qos", True),
+            ("desktop_security", True),
+        ],
+    )
+    def test_skip_if_unchanged_installs_other_revisions_and_blades(
+        self, mocker, param, value
+    ):
+        connection_mock = mocker.patch(
+            "ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint.Connection"
+        ).return_value
+        connection_mock.send_request.return_value = (200, RETURN_PAYLOAD)
+        installed_mock = mocker.patch.object(
+            self.module,
+            "is_policy_installed_since_last_publish",
+            return_value=True,
+        )
+        payload = dict(PAYLOAD, skip_if_unchanged=True)
+        payload[param] = value
+
+        result = self._run_module(payload)
+
+        assert result["changed"]
+        assert RETURN_PAYLOAD == result[command]
+        assert not installed_mock.called
+        body = connection_mock.send_request.call_args[0][1]
+        assert "skip_if_unchanged" not in body
+
     def _run_module(self, module_args):
         set_module_args(module_args)
         with pytest.raises(AnsibleExitJson) as ex:
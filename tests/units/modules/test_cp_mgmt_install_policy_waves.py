@@ -0,0 +1,148 @@
+# Ansible module to manage CheckPoint Firewall (c) 2019
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import pytest
+from units.modules.utils import (
+    set_module_args,
+    exit_json,
+    fail_json,
+    AnsibleExitJson,
+    AnsibleFailJson,
+)
+
+from ansible.module_utils import basic
+from ansible_collections.check_point.mgmt.plugins.modules import (
+    cp_mgmt_install_policy_waves,
+)
+
+PAYLOAD = {
+    "policy_package": "standard",
+    "targets": ["gw1", "gw2", "gw3", "gw4"],
+    "canary_size": 1,
+    "wave_size": 2,
+    "wait_for_task": False,
+}
+
+command = "cp_mgmt_install_policy_waves"
+
+
+class TestCheckpointInstallPolicyWaves(object):
+    module = cp_mgmt_install_policy_waves
+
+    @pytest.fixture(autouse=True)
+    def module_mock(self, mocker):
+        return mocker.patch.multiple(
+            basic.AnsibleModule, exit_json=exit_json, fail_json=fail_json
+        )
+
+    @pytest.fixture
+    def connection_mock(self, mocker, failing_targets):
+        connection_class_mock = mocker.patch(
+            "ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint.Connection"
+        )
+        connection_mock = connection_class_mock.return_value
+
+        def install(payload):
+            return 200, {"task-id": "task-" + payload["targets"][0]}
+
+        def send_request(url, payload=None):
+            if url == "/web_api/install-policy":
+                return install(payload)
+            task_ids = payload["task-id"]
+            return (
+                200,
+                {
+                    "tasks": [
+                        {
+                            "task-id": task_id,
+                            "task-name": "Policy installation",
+                            "status": "failed"
+                            if task_id.split("-")[1] in failing_targets
+                            else "succeeded",
+                        }
+                        for task_id in task_ids
+                    ]
+                },
+            )
+
+        connection_mock.send_request.side_effect = send_request
+        connection_mock.send_requests.side_effect = lambda requests: [
+            install(payload) for url, payload in requests
+        ]
+        return connection_mock
+
+    @pytest.fixture
+    def failing_targets(self):
+        return []
+
+    def test_command(self, mocker, connection_mock):
+        result = self._run_module(dict(PAYLOAD))
+
+        assert result["changed"]
+        assert result[command]["succeeded"] == 4
+        assert [
+            (r["target"], r["wave"]) for r in result[command]["targets"]
+        ] == [
+            ("gw1", 0),
+            ("gw2", 1),
+            ("gw3", 1),
+            ("gw4", 2),
+        ]
+        connection_mock.send_request.assert_any_call(
+            "/web_api/install-policy",
+            {"policy-package": "standard", "targets": ["gw1"]},
+        )
+
+    @pytest.mark.parametrize("failing_targets", [["gw2"]])
+    def test_install_stops_above_failure_ratio(self, mocker, connection_mock):
+        with pytest.raises(AnsibleFailJson) as ex:
+            self._run_module(dict(PAYLOAD))
+
+        assert (
+            "Install policy stopped after 1 of 3 targets failed"
+            == ex.value.args[0]["msg"]
+        )
+        statuses = [r["status"] for r in ex.value.args[0][command]["targets"]]
+        assert statuses == ["succeeded", "failed", "succeeded", "skipped"]
+
+    @pytest.mark.parametrize("failing_targets", [["gw2"]])
+    def test_failures_below_ratio_continue(self, mocker, connection_mock):
+        result = self._run_module(dict(PAYLOAD, max_failure_ratio=0.5))
+
+        assert result[command]["failed"] == 1
+        assert result[command]["succeeded"] == 3
+
+    @pytest.mark.parametrize("failing_targets", [["gw4"]])
+    def test_failure_in_last_wave_fails(self, mocker, connection_mock):
+        with pytest.raises(AnsibleFailJson) as ex:
+            self._run_module(dict(PAYLOAD, max_failure_ratio=0))
+
+        assert (
+            "Install policy failed on 1 of 4 targets"
+            == ex.value.args[0]["msg"]
+        )
+        statuses = [r["status"] for r in ex.value.args[0][command]["targets"]]
+        assert statuses == ["succeeded", "succeeded", "succeeded", "failed"]
+
+    def _run_module(self, module_args):
+        set_module_args(module_args)
+        with pytest.raises(AnsibleExitJson) as ex:
+            self.module.main()
+        return ex.value.args[0]
@@ -0,0 +1,215 @@
+# Ansible module to manage CheckPoint Firewall (c) 2019
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+
+import pytest
+from units.modules.utils import (
+    set_module_args,
+    exit_json,
+    fail_json,
+    AnsibleExitJson,
+    AnsibleFailJson,
+)
+
+from ansible.module_utils import basic
+from ansible_collections.check_point.mgmt.plugins.modules import (
+    cp_mgmt_objects_snapshot,
+)
+
+HOST = {"uid": "h1-uid", "name": "h1", "type": "host", "color": "black"}
+NETWORK = {"uid": "n1-uid", "name": "n1", "type": "network"}
+
+CHANGES = [
+    {
+        "operations": {
+            "added-objects": [NETWORK],
+            "modified-objects": [
+                {"old-object": HOST, "new-object": dict(HOST, color="red")}
+            ],
+            "deleted-objects": [],
+        }
+    }
+]
+
+command = "cp_mgmt_objects_snapshot"
+
+
+class TestCheckpointObjectsSnapshot(object):
+    module = cp_mgmt_objects_snapshot
+
+    @pytest.fixture(autouse=True)
+    def module_mock(self, mocker):
+        return mocker.patch.multiple(
+            basic.AnsibleModule, exit_json=exit_json, fail_json=fail_json
+        )
+
+    @pytest.fixture
+    def connection_mock(self, mocker):
+        connection_class_mock = mocker.patch(
+            "ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint.Connection"
+        )
+        connection_mock = connection_class_mock.return_value
+        connection_mock.get_paging_options.return_value = {
+            "max_concurrent_requests": 1
+        }
+        return connection_mock
+
+    def test_snapshot_is_created(self, mocker, connection_mock, tmp_path):
+        path = str(tmp_path / "snapshot.json")
+        connection_mock.send_request.side_effect = [
+            (200, {"uid": "session-1", "publish-time": {"posix": 1}}),
+            (200, {"objects": [HOST], "from": 1, "to": 1, "total": 1}),
+        ]
+        result = self._run_module({"path": path})
+
+        assert result["changed"]
+        assert result[command]["objects"] == 1
+        with open(path) as f:
+            snapshot = json.load(f)
+        assert snapshot["session-uid"] == "session-1"
+        assert snapshot["objects"] == {"h1-uid": HOST}
+
+    def test_snapshot_is_updated_by_changes(
+        self, mocker, connection_mock, tmp_path
+    ):
+        path = str(tmp_path / "snapshot.json")
+        with open(path, "w") as f:
+            json.dump(
+                {"session-uid": "session-1", "objects": {"h1-uid": HOST}}, f
+            )
+        connection_mock.send_request.side_effect = [
+            (200, {"uid": "session-2", "publish-time": {"posix": 2}}),
+            (200, {"task-id": "task"}),
+            (200, {"tasks": [{"task-id": "task", "status": "succeeded"}]}),
+            (
+                200,
+                {
+                    "tasks": [
+                        {
+                            "task-id": "task",
+                            "status": "succeeded",
+                            "task-details": [{"changes": CHANGES}],
+                        }
+                    ]
+                },
+            ),
+        ]
+        result = self._run_module({"path": path, "wait_for_task": False})
+
+        assert result["changed"]
+        assert result[command]["drift"] == {
+            "added": [{"uid": "n1-uid", "name": "n1", "type": "network"}],
+            "modified": [{"uid": "h1-uid", "name": "h1", "type": "host"}],
+            "deleted": [],
+        }
+        with open(path) as f:
+            snapshot = json.load(f)
+        assert snapshot["session-uid"] == "session-2"
+        assert snapshot["objects"]["h1-uid"]["color"] == "red"
+        connection_mock.send_request.assert_any_call(
+            "/web_api/show-changes",
+            {
+                "from-session": "session-1",
+                "to-session": "session-2",
+                "offset": 0,
+                "limit": 500,
+            },
+        )
+
+    def test_snapshot_is_up_to_date(self, mocker, connection_mock, tmp_path):
+        path = str(tmp_path / "snapshot.json")
+        with open(path, "w") as f:
+            json.dump(
+                {"session-uid": "session-1", "objects": {"h1-uid": HOST}}, f
+            )
+        connection_mock.send_request.return_value = (
+            200,
+            {"uid": "session-1"},
+        )
+        result = self._run_module({"path": path})
+
+        assert not result["changed"]
+        assert connection_mock.send_request.call_count == 1
+
+    @pytest.mark.parametrize(
+        "content", ['{"session-uid": "session-1", "obj', "[]", "{}"]
+    )
+    def test_corrupt_snapshot_fails(
+        self, mocker, connection_mock, tmp_path, content
+    ):
+        path = str(tmp_path / "snapshot.json")
+        with open(path, "w") as f:
+            f.write(content)
+        connection_mock.send_request.return_value = (
+            200,
+            {"uid": "session-2"},
+        )
+        set_module_args({"path": path})
+        with pytest.raises(AnsibleFailJson) as ex:
+            self.module.main()
+
+        result = ex.value.args[0]
+        assert result["failed"]
+        assert path in result["msg"]
+        with open(path) as f:
+            assert f.read() == content
+
+    def test_snapshot_write_failure_fails(
+        self, mocker, connection_mock, tmp_path
+    ):
+        path = str(tmp_path / "snapshot.json")
+        connection_mock.send_request.side_effect = [
+            (200, {"uid": "session-1"}),
+            (200, {"objects": [HOST], "from": 1, "to": 1, "total": 1}),
+        ]
+        mocker.patch("os.replace", side_effect=OSError("No space left"))
+        set_module_args({"path": path})
+        with pytest.raises(AnsibleFailJson) as ex:
+            self.module.main()
+
+        assert ex.value.args[0]["msg"] == (
+            "Failed to write the objects snapshot {0}: No space left".format(
+                path
+            )
+        )
+        assert [] == list(tmp_path.iterdir())
+
+    def test_snapshot_in_missing_directory_fails(
+        self, mocker, connection_mock, tmp_path
+    ):
+        path = str(tmp_path / "missing" / "snapshot.json")
+        connection_mock.send_request.side_effect = [
+            (200, {"uid": "session-1"}),
+            (200, {"objects": [HOST], "from": 1, "to": 1, "total": 1}),
+        ]
+        set_module_args({"path": path})
+        with pytest.raises(AnsibleFailJson) as ex:
+            self.module.main()
+
+        assert ex.value.args[0]["msg"].startswith(
+            "Failed to write the objects snapshot " + path
+        )
+
+    def _run_module(self, module_args):
+        set_module_args(module_args)
+        with pytest.raises(AnsibleExitJson) as ex:
+            self.module.main()
+        return ex.value.args[0]
@@ -0,0 +1,106 @@
+# Ansible module to manage CheckPoint Firewall (c) 2019
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import pytest
+from units.modules.utils import (
+    set_module_args,
+    exit_json,
+    fail_json,
+    AnsibleExitJson,
+)
+
+from ansible.module_utils import basic
+from ansible_collections.check_point.mgmt.plugins.modules import (
+    cp_mgmt_set_objects_batch,
+)
+
+OBJECT = {"name": "host1", "comments": "first host"}
+
+PAYLOAD = {
+    "objects": [{"type": "host", "list": [OBJECT]}],
+    "wait_for_task": False,
+}
+
+TASK_RESPONSE = {
+    "tasks": [
+        {
+            "task-id": "task",
+            "task-name": "set-objects-batch",
+            "status": "succeeded",
+        }
+    ]
+}
+
+command = "set-objects-batch"
+failure_msg = "{command failed}"
+
+
+class TestCheckpointSetObjectsBatch(object):
+    module = cp_mgmt_set_objects_batch
+
+    @pytest.fixture(autouse=True)
+    def module_mock(self, mocker):
+        return mocker.patch.multiple(
+            basic.AnsibleModule, exit_json=exit_json, fail_json=fail_json
+        )
+
+    @pytest.fixture
+    def connection_mock(self, mocker):
+        connection_class_mock = mocker.patch(
+            "ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint.Connection"
+        )
+        return connection_class_mock.return_value
+
+    def test_command(self, mocker, connection_mock):
+        connection_mock.send_request.side_effect = [
+            (200, {"task-id": "task"}),
+            (200, TASK_RESPONSE),
+            (200, TASK_RESPONSE),
+        ]
+        result = self._run_module(PAYLOAD)
+
+        assert result["changed"]
+        assert {"applied": 1, "failures": []} == result[command]
+        connection_mock.send_request.assert_any_call(
+            "/web_api/" + command,
+            {"objects": [{"type": "host", "list": [OBJECT]}]},
+        )
+
+    def test_command_fail(self, mocker, connection_mock):
+        connection_mock.send_request.return_value = (400, failure_msg)
+        try:
+            result = self._run_module(PAYLOAD)
+        except Exception as e:
+            result = e.args[0]
+
+        assert (
+            "1 of 1 objects failed. First failure: Checkpoint device returned error 400 with message "
+            + failure_msg
+            == result["msg"]
+        )
+        assert [OBJECT] == [
+            failure["object"] for failure in result[command]["failures"]
+        ]
+
+    def _run_module(self, module_args):
+        set_module_args(module_args)
+        with pytest.raises(AnsibleExitJson) as ex:
+            self.module.main()
+        return ex.value.args[0]
@@ -0,0 +1,74 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import pytest
+from units.compat import mock
+
+from ansible.playbook.task import Task
+from ansible.template import Templar
+from ansible_collections.check_point.mgmt.plugins.action.cp_mgmt_access_rules import (
+    ActionModule,
+)
+
+ACTION = (
+    "ansible_collections.check_point.mgmt.plugins.action.cp_mgmt_access_rules"
+)
+
+RETRIES = {"requests": 1, "retries": 2, "errors": {"err_object_locked": 2}}
+
+
+class TestCheckpointAccessRulesAction(object):
+    @pytest.fixture
+    def action(self):
+        task = mock.MagicMock(Task)
+        task.args = {"layer": "Network", "rules": [], "bulk": True}
+        task.check_mode = False
+        return ActionModule(
+            task=task,
+            connection=mock.MagicMock(socket_path="/tmp/socket"),
+            play_context=mock.MagicMock(),
+            loader=None,
+            templar=Templar(loader=None),
+            shared_loader_obj=None,
+        )
+
+    @pytest.fixture
+    def connection_mock(self, mocker):
+        connection_mock = mocker.patch(ACTION + ".Connection").return_value
+        connection_mock.pop_retry_counters.return_value = dict(RETRIES)
+        connection_mock.get_session_uid.return_value = "session-uid"
+        return connection_mock
+
+    def test_bulk_reports_the_retries_of_its_requests(
+        self, mocker, action, connection_mock
+    ):
+        mocker.patch(
+            ACTION + ".get_access_rules_changes",
+            return_value=[{"command": "add-access-rule", "name": "A"}],
+        )
+        apply_mock = mocker.patch(ACTION + ".apply_access_rules_changes")
+
+        result = action.run_bulk({}, [{"name": "A"}])
+
+        assert apply_mock.called
+        assert result["changed"]
+        assert result["rule: A"] == {"changed": True}
+        assert result["checkpoint_retries"] == RETRIES
+
+    def test_bulk_failure_reports_the_retries_of_its_requests(
+        self, mocker, action, connection_mock
+    ):
+        mocker.patch(
+            ACTION + ".get_access_rules_changes",
+            side_effect=Exception("rule A is locked"),
+        )
+        connection_mock.send_request.return_value = (200, {})
+
+        result = action.run_bulk({}, [{"name": "A"}])
+
+        assert result["failed"]
+        assert result["msg"] == "rule A is locked"
+        assert result["checkpoint_retries"] == RETRIES
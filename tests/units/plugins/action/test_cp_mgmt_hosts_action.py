@@ -0,0 +1,83 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from units.compat import mock
+
+from ansible.playbook.task import Task
+from ansible.template import Templar
+from ansible_collections.check_point.mgmt.plugins.action.cp_mgmt_hosts import (
+    ActionModule,
+)
+
+MODULE_UTILS = (
+    "ansible_collections.check_point.mgmt.plugins.module_utils.checkpoint"
+)
+
+HOST = {"name": "h1", "uid": "h1-uid", "ipv4-address": "192.0.2.1"}
+NOT_FOUND = {"code": "generic_err_object_not_found", "message": "not found"}
+
+
+class TestCheckpointHostsAction(object):
+    @staticmethod
+    def _run_action(args, responses):
+        task = mock.MagicMock(Task)
+        task.action = "check_point.mgmt.cp_mgmt_hosts"
+        task.args = args
+        task.async_val = False
+        play_context = mock.MagicMock()
+        play_context.check_mode = False
+        action = ActionModule(
+            task=task,
+            connection=mock.MagicMock(socket_path="/tmp/socket"),
+            play_context=play_context,
+            loader=None,
+            templar=Templar(loader=None),
+            shared_loader_obj=None,
+        )
+        with mock.patch(
+            "ansible_collections.check_point.mgmt.plugins.action.cp_mgmt_hosts.Connection"
+        ) as connection_class_mock:
+            connection_mock = connection_class_mock.return_value
+            connection_mock.get_session_uid.return_value = "session-uid"
+            connection_mock.defer_publish.return_value = False
+            connection_mock.send_request.side_effect = (
+                lambda path, payload: responses[path.rsplit("/", 1)[-1]]
+            )
+            with mock.patch(MODULE_UTILS + ".poll_task") as poll_task_mock:
+                result = action.run(task_vars={})
+        return result, connection_mock, poll_task_mock
+
+    def test_publish_is_waited_for_with_the_timeout_of_the_task(self):
+        args = {
+            "state": "merged",
+            "config": {
+                "name": "h1",
+                "ip_address": "192.0.2.1",
+                "auto_publish_session": True,
+            },
+            "wait_for_task": True,
+            "wait_for_task_timeout": 5,
+        }
+        responses = {
+            "show-host": (404, NOT_FOUND),
+            "equals": (404, NOT_FOUND),
+            "add-host": (200, HOST),
+            "publish": (200, {"task-id": "publish-task"}),
+        }
+
+        result, connection_mock, poll_task_mock = self._run_action(
+            args, responses
+        )
+
+        assert result["changed"]
+        poll_task_mock.assert_called_once_with(
+            connection_mock, "", "publish-task", timeout=5
+        )
+        for call in connection_mock.send_request.call_args_list:
+            payload = call[0][1] or {}
+            payload = payload.get("params", payload)
+            assert "wait_for_task" not in payload
+            assert "wait_for_task_timeout" not in payload
@@ -6,6 +6,11 @@ from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
 import json
+import os
+import shutil
+import tempfile
+import threading
+import zlib
 
 from ansible.module_utils.six.moves.urllib.error import HTTPError
 from units.compat import mock
@@ -16,6 +21,10 @@ from ansible.module_utils.connection import ConnectionError
 from ansible.module_utils.six import BytesIO, StringIO
 from ansible_collections.check_point.mgmt.plugins.httpapi.checkpoint import (
     HttpApi,
+    IncrementalJSONDecoder,
+    ServerRateLimiter,
+    dumps_json,
+    loads_json,
 )
 
 EXPECTED_BASE_HEADERS = {"Content-Type": "application/json"}
@@ -24,7 +33,29 @@ EXPECTED_BASE_HEADERS = {"Content-Type": "application/json"}
 class FakeCheckpointHttpApiPlugin(HttpApi):
     def __init__(self, conn):
         super(FakeCheckpointHttpApiPlugin, self).__init__(conn)
-        self.hostvars = {"domain": None}
+        self.hostvars = {
+            "domain": None,
+            "api_key": None,
+            "cloud_mgmt_id": None,
+            "target": None,
+            "session_cache": False,
+            "session_cache_path": None,
+            "session_keepalive_interval": 0,
+            "rulebase_index": False,
+            "max_concurrent_requests": 4,
+            "rulebase_page_limit": 0,
+            "object_cache": False,
+            "prefetch_object_types": [],
+            "deferred_publish": False,
+            "deferred_publish_threshold": 0,
+            "auto_publish_threshold": 0,
+            "response_compression": False,
+            "incremental_decoding": False,
+            "request_retry_timeout": 0,
+            "rate_limit": 0,
+            "rate_limit_max_concurrent": 0,
+            "rate_limit_path": None,
+        }
 
     def get_option(self, option):
         return self.hostvars[option]
@@ -90,6 +121,892 @@ class TestCheckpointHttpApi(unittest.TestCase):
         )
         self.checkpoint_plugin.hostvars["domain"] = temp_domain
 
+    def test_login_reuses_cached_session(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.checkpoint_plugin.hostvars["session_cache"] = True
+        self.checkpoint_plugin.hostvars["session_cache_path"] = cache_dir
+        self.connection_mock.send.return_value = self._connection_response(
+            {"sid": "SID", "uid": "UID", "session-timeout": 600}
+        )
+
+        self.checkpoint_plugin.login("USERNAME", "PASSWORD")
+        self.checkpoint_plugin.logout()
+
+        self.connection_mock.send.assert_called_once_with(
+            "/web_api/login", mock.ANY, headers=mock.ANY, method=mock.ANY
+        )
+        assert len(os.listdir(cache_dir)) == 1
+
+        self.connection_mock.reset_mock()
+        self.connection_mock._auth = None
+        self.connection_mock.send.return_value = self._connection_response(
+            {"message": "OK"}
+        )
+
+        self.checkpoint_plugin.login("USERNAME", "PASSWORD")
+
+        self.connection_mock.send.assert_called_once_with(
+            "/web_api/keepalive", mock.ANY, headers=mock.ANY, method=mock.ANY
+        )
+        assert self.connection_mock._auth == {"X-chkp-sid": "SID"}
+        assert os.listdir(cache_dir) == []
+
+    def test_keepalive_starts_again_after_a_new_login(self):
+        self.checkpoint_plugin.hostvars["session_keepalive_interval"] = 0.01
+        self.connection_mock._auth = None
+        keepalives = []
+        lock_held = []
+        sent_keepalive = threading.Event()
+
+        def send(path, data, headers=None, method=None):
+            if path == "/web_api/login":
+                return self._connection_response({"sid": "SID", "uid": "UID"})
+            if path == "/web_api/keepalive":
+                # the request lock is free for the other threads while the keepalive is sent
+                checker = threading.Thread(
+                    target=lambda: lock_held.append(
+                        not self._try_lock(
+                            self.checkpoint_plugin._request_lock
+                        )
+                    )
+                )
+                checker.start()
+                checker.join()
+                keepalives.append(path)
+                sent_keepalive.set()
+            return self._connection_response({})
+
+        self.connection_mock.send.side_effect = send
+        for attempt in range(2):
+            sent_keepalive.clear()
+            self.checkpoint_plugin.login("USERNAME", "PASSWORD")
+            assert sent_keepalive.wait(5)
+            self.checkpoint_plugin.logout()
+            self.checkpoint_plugin._keepalive_thread.join(5)
+            assert not self.checkpoint_plugin._keepalive_thread.is_alive()
+
+        assert len(keepalives) >= 2
+        assert not any(lock_held)
+
+    @staticmethod
+    def _try_lock(lock):
+        if not lock.acquire(False):
+            return False
+        lock.release()
+        return True
+
+    def test_login_when_cached_session_is_no_longer_valid(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.checkpoint_plugin.hostvars["session_cache"] = True
+        self.checkpoint_plugin.hostvars["session_cache_path"] = cache_dir
+        self.connection_mock._auth = {"X-chkp-sid": "OLD_SID"}
+        self.connection_mock._session_uid = "UID"
+        self.checkpoint_plugin._session_cache_key = (
+            self.checkpoint_plugin._get_session_cache_key(
+                {"user": "USERNAME", "password": "PASSWORD"}
+            )
+        )
+        self.checkpoint_plugin.logout()
+
+        self.connection_mock.send.side_effect = [
+            self._connection_response(
+                {"code": "generic_err_wrong_session_id"}, 401
+            ),
+            self._connection_response({"sid": "NEW_SID", "uid": "UID"}),
+        ]
+
+        self.checkpoint_plugin.login("USERNAME", "PASSWORD")
+
+        assert self.connection_mock.send.call_args_list[1] == mock.call(
+            "/web_api/login", mock.ANY, headers=mock.ANY, method=mock.ANY
+        )
+        assert self.connection_mock._auth == {"X-chkp-sid": "NEW_SID"}
+
+    def test_handle_httperror_logs_in_again_when_session_expired(self):
+        self.connection_mock._auth = {"X-chkp-sid": "EXPIRED_SID"}
+        self.connection_mock._session_uid = "EXPIRED_UID"
+        self.connection_mock.get_option.side_effect = {
+            "remote_user": "USERNAME",
+            "password": "PASSWORD",
+        }.get
+        self.connection_mock.send.side_effect = [
+            self._connection_response({"sid": "NEW_SID", "uid": "NEW_UID"}),
+            self._connection_response({"uid": "EXPIRED_UID"}),
+        ]
+
+        handled = self.checkpoint_plugin.handle_httperror(
+            self._session_expired_error()
+        )
+
+        assert handled is True
+        assert self.connection_mock._auth == {"X-chkp-sid": "NEW_SID"}
+        assert self.connection_mock._session_uid == "EXPIRED_UID"
+        assert self.connection_mock.send.call_args_list[1] == mock.call(
+            "/web_api/switch-session",
+            b'{"uid":"EXPIRED_UID"}',
+            headers=mock.ANY,
+            method=mock.ANY,
+        )
+        # the failed request is retried only once
+        assert (
+            self.checkpoint_plugin.handle_httperror(
+                self._session_expired_error()
+            )
+            is False
+        )
+
+    def test_handle_httperror_does_not_handle_other_errors(self):
+        self.connection_mock._auth = {"X-chkp-sid": "SID"}
+        error = HTTPError(
+            "http://testhost.com",
+            400,
+            "",
+            {},
+            StringIO('{"code": "generic_err_invalid_parameter"}'),
+        )
+
+        assert self.checkpoint_plugin.handle_httperror(error) is False
+        self.connection_mock.send.assert_not_called()
+
+    def test_rulebase_index_is_updated_by_rule_changes(self):
+        self.checkpoint_plugin.set_option("rulebase_index", True)
+        self.connection_mock.send.side_effect = [
+            self._connection_response({"total": 2}),
+            self._connection_response(self._rulebase_response()),
+            self._connection_response({"name": "C", "uid": "c"}),
+            self._connection_response({}),
+            self._connection_response({}),
+        ]
+
+        self.checkpoint_plugin.get_rulebase_index(
+            "", "show-access-rulebase", {"name": "Network"}
+        )
+        self.checkpoint_plugin.send_request(
+            "/web_api/add-access-rule",
+            {"layer": "Network", "name": "C", "position": {"below": "A"}},
+        )
+        self.checkpoint_plugin.send_request(
+            "/web_api/set-access-rule",
+            {
+                "layer": "Network",
+                "name": "A",
+                "new-position": {"bottom": "Section 2"},
+            },
+        )
+        self.checkpoint_plugin.send_request(
+            "/web_api/delete-access-rule", {"layer": "Network", "uid": "b"}
+        )
+        index = self.checkpoint_plugin.get_rulebase_index(
+            "", "show-access-rulebase", {"name": "Network"}
+        )
+
+        assert index == [
+            {"name": "Section 1", "rules": [["C", "c"]]},
+            {"name": "Section 2", "rules": [["A", "a"]]},
+        ]
+        assert self.connection_mock.send.call_count == 5
+
+    def test_rulebase_index_is_built_again_after_section_changes(self):
+        self.checkpoint_plugin.set_option("rulebase_index", True)
+        self.connection_mock.send.side_effect = [
+            self._connection_response({"total": 2}),
+            self._connection_response(self._rulebase_response()),
+            self._connection_response({}),
+            self._connection_response({"total": 2}),
+            self._connection_response(self._rulebase_response()),
+            self._connection_response({}),
+        ]
+
+        for dummy in range(2):
+            self.checkpoint_plugin.get_rulebase_index(
+                "", "show-access-rulebase", {"name": "Network"}
+            )
+            self.checkpoint_plugin.send_request(
+                "/web_api/add-access-section",
+                {"layer": "Network", "name": "Section 3", "position": "top"},
+            )
+
+        assert self.connection_mock.send.call_count == 6
+
+    def test_send_requests_returns_responses_in_order(self):
+        self.connection_mock.send.side_effect = (
+            lambda path, data, **kwargs: self._connection_response(
+                {"path": path}
+            )
+        )
+        requests = [["/web_api/show-host", {"name": str(i)}] for i in range(8)]
+
+        responses = self.checkpoint_plugin.send_requests(requests)
+
+        assert responses == [
+            (200, {"path": "/web_api/show-host"}) for dummy in range(8)
+        ]
+        assert self.connection_mock.send.call_count == 8
+
+    def test_object_cache_serves_repeated_lookups(self):
+        self.checkpoint_plugin.set_option("object_cache", True)
+        self.connection_mock.send.return_value = self._connection_response(
+            {"equals": True}
+        )
+        equals_payload = {"type": "host", "params": {"name": "h1"}}
+
+        for dummy in range(3):
+            code, response = self.checkpoint_plugin.send_request(
+                "/web_api/equals", equals_payload
+            )
+
+        assert (code, response) == (200, {"equals": True})
+        assert self.connection_mock.send.call_count == 1
+
+    def test_object_cache_does_not_cache_sessions(self):
+        self.checkpoint_plugin.set_option("object_cache", True)
+        self.connection_mock.send.side_effect = [
+            self._connection_response({"uid": "s1", "changes": 0}),
+            self._connection_response({"uid": "s1", "changes": 1}),
+        ]
+
+        for changes in range(2):
+            code, response = self.checkpoint_plugin.send_request(
+                "/web_api/show-session", {"uid": "s1"}
+            )
+
+            assert response["changes"] == changes
+
+    def test_object_cache_drops_changed_and_referring_objects(self):
+        self.checkpoint_plugin.set_option("object_cache", True)
+        self.connection_mock.send.side_effect = [
+            self._connection_response({"name": "h1", "uid": "h1-uid"}),
+            self._connection_response({"name": "n1", "uid": "n1-uid"}),
+            self._connection_response(
+                {
+                    "name": "g1",
+                    "uid": "g1-uid",
+                    "members": [{"name": "h1", "uid": "h1-uid"}],
+                }
+            ),
+            self._connection_response({"name": "h1", "uid": "h1-uid"}),
+            self._connection_response({"task-id": "1"}),
+            self._connection_response({"name": "n1", "uid": "n1-uid"}),
+        ]
+        requests = [
+            ("/web_api/show-host", {"name": "h1"}),
+            ("/web_api/show-network", {"name": "n1"}),
+        ]
+        for path, payload in requests:
+            self.checkpoint_plugin.send_request(path, payload)
+
+        self.checkpoint_plugin.send_request(
+            "/web_api/set-group", {"name": "g1", "members": ["h1"]}
+        )
+        for path, payload in requests:
+            self.checkpoint_plugin.send_request(path, payload)
+        self.checkpoint_plugin.send_request("/web_api/publish", None)
+        self.checkpoint_plugin.send_request(
+            "/web_api/show-network", {"name": "n1"}
+        )
+
+        sent_paths = [
+            c[0][0] for c in self.connection_mock.send.call_args_list
+        ]
+        assert sent_paths == [
+            "/web_api/show-host",
+            "/web_api/show-network",
+            "/web_api/set-group",
+            "/web_api/show-host",
+            "/web_api/publish",
+            "/web_api/show-network",
+        ]
+
+    def test_object_cache_drops_rules_of_changed_sections_and_layers(self):
+        self.checkpoint_plugin.set_option("object_cache", True)
+        responses = {
+            "/web_api/show-access-rule": {"name": "r1", "uid": "r1-uid"},
+            "/web_api/equals": {"equals": True},
+            "/web_api/show-host": {"name": "h1", "uid": "h1-uid"},
+        }
+        self.connection_mock.send.side_effect = lambda path, *args, **kw: (
+            self._connection_response(responses.get(path, {}))
+        )
+        show_rule = (
+            "/web_api/show-access-rule",
+            {"name": "r1", "layer": "Network"},
+        )
+        equals_rule = (
+            "/web_api/equals",
+            {"type": "access-rule", "params": {"name": "r1"}},
+        )
+        show_host = ("/web_api/show-host", {"name": "h1"})
+
+        for path, payload in [show_rule, equals_rule, show_host]:
+            self.checkpoint_plugin.send_request(path, payload)
+        self.checkpoint_plugin.send_request(
+            "/web_api/delete-access-section", {"name": "s1"}
+        )
+        for path, payload in [show_rule, equals_rule, show_host]:
+            self.checkpoint_plugin.send_request(path, payload)
+        self.checkpoint_plugin.send_request(
+            "/web_api/set-access-layer", {"name": "Network"}
+        )
+        self.checkpoint_plugin.send_request(*show_rule)
+
+        sent_paths = [
+            c[0][0] for c in self.connection_mock.send.call_args_list
+        ]
+        assert sent_paths == [
+            "/web_api/show-access-rule",
+            "/web_api/equals",
+            "/web_api/show-host",
+            "/web_api/delete-access-section",
+            "/web_api/show-access-rule",
+            "/web_api/equals",
+            "/web_api/set-access-layer",
+            "/web_api/show-access-rule",
+        ]
+
+    def test_equals_is_answered_from_prefetched_objects(self):
+        self.checkpoint_plugin.set_option("prefetch_object_types", ["host"])
+        host = {
+            "name": "h1",
+            "uid": "h1-uid",
+            "ipv4-address": "1.2.3.4",
+            "color": "black",
+        }
+        self.connection_mock.send.side_effect = [
+            self._connection_response(
+                {"objects": [host], "from": 1, "to": 1, "total": 1}
+            ),
+            self._connection_response({"name": "h1", "uid": "h1-uid"}),
+            self._connection_response({"equals": True}),
+        ]
+
+        def equals(params):
+            return self.checkpoint_plugin.send_request(
+                "/web_api/equals", {"type": "host", "params": params}
+            )
+
+        assert equals({"name": "h1", "ip-address": "1.2.3.4"}) == (
+            200,
+            {"equals": True},
+        )
+        assert equals({"name": "h1", "color": "red"}) == (
+            200,
+            {"equals": False},
+        )
+        assert equals({"name": "h2"})[0] == 404
+        self.checkpoint_plugin.send_request(
+            "/web_api/set-host", {"name": "h1", "color": "red"}
+        )
+        assert equals({"name": "h1", "color": "red"}) == (
+            200,
+            {"equals": True},
+        )
+
+        sent_paths = [
+            c[0][0] for c in self.connection_mock.send.call_args_list
+        ]
+        assert sent_paths == [
+            "/web_api/show-hosts",
+            "/web_api/set-host",
+            "/web_api/equals",
+        ]
+
+    def test_prefetch_is_prefixed_once_with_cloud_mgmt_id(self):
+        self.checkpoint_plugin.set_option("prefetch_object_types", ["host"])
+        self.checkpoint_plugin.set_option("cloud_mgmt_id", "cloud-id")
+        self.connection_mock.send.return_value = self._connection_response(
+            {
+                "objects": [{"name": "h1", "uid": "h1-uid", "color": "black"}],
+                "from": 1,
+                "to": 1,
+                "total": 1,
+            }
+        )
+
+        resp = self.checkpoint_plugin.send_request(
+            "/web_api/equals",
+            {"type": "host", "params": {"name": "h1", "color": "black"}},
+        )
+
+        assert resp == (200, {"equals": True})
+        self.connection_mock.send.assert_called_once_with(
+            "/cloud-id/web_api/show-hosts",
+            mock.ANY,
+            headers=mock.ANY,
+            method=mock.ANY,
+        )
+
+    def test_publish_is_deferred_until_the_threshold(self):
+        assert not self.checkpoint_plugin.defer_publish()
+
+        self.checkpoint_plugin.set_option("deferred_publish", True)
+        self.checkpoint_plugin.set_option("deferred_publish_threshold", 3)
+        assert self.checkpoint_plugin.defer_publish()
+        assert self.checkpoint_plugin.defer_publish()
+        assert not self.checkpoint_plugin.defer_publish()
+        assert self.checkpoint_plugin.get_deferred_publishes() == 3
+
+        self.connection_mock.send.return_value = self._connection_response(
+            {"task-id": "task"}
+        )
+        self.checkpoint_plugin.send_request("/web_api/publish", None)
+        assert self.checkpoint_plugin.get_deferred_publishes() == 0
+        assert self.checkpoint_plugin.defer_publish()
+
+    def test_session_is_published_after_the_threshold_of_changes(self):
+        self.checkpoint_plugin.set_option("auto_publish_threshold", 3)
+        task = {"tasks": [{"task-id": "task", "status": "succeeded"}]}
+        self.connection_mock.send.side_effect = [
+            self._connection_response({"uid": "h1-uid"}),
+            self._connection_response({"name": "h1"}),
+            self._connection_response({"task-id": "batch"}),
+            self._connection_response(
+                {"tasks": [{"task-id": "batch", "status": "in progress"}]}
+            ),
+            self._connection_response(
+                {"tasks": [{"task-id": "batch", "status": "succeeded"}]}
+            ),
+            self._connection_response({"task-id": "task"}),
+            self._connection_response(task),
+            self._connection_response(task),
+        ]
+
+        self.checkpoint_plugin.send_request(
+            "/web_api/add-host", {"name": "h1"}
+        )
+        self.checkpoint_plugin.send_request(
+            "/web_api/show-host", {"name": "h1"}
+        )
+        assert self.checkpoint_plugin.get_session_changes() == 1
+        self.checkpoint_plugin.send_request(
+            "/web_api/add-objects-batch",
+            {
+                "objects": [
+                    {"type": "host", "list": [{"name": "h2"}, {"name": "h3"}]}
+                ]
+            },
+        )
+        # the batch task may still fail, its objects are counted once it succeeded
+        for _ in range(2):
+            assert self.checkpoint_plugin.get_session_changes() == 1
+            self.checkpoint_plugin.send_request(
+                "/web_api/show-task", {"task-id": ["batch"]}
+            )
+        assert self.checkpoint_plugin.get_session_changes() == 0
+
+        sent_paths = [
+            c[0][0] for c in self.connection_mock.send.call_args_list
+        ]
+        assert sent_paths == [
+            "/web_api/add-host",
+            "/web_api/show-host",
+            "/web_api/add-objects-batch",
+            "/web_api/show-task",
+            "/web_api/show-task",
+            "/web_api/publish",
+            "/web_api/show-task",
+            "/web_api/show-task",
+        ]
+
+    def test_failed_tasks_and_session_commands_are_not_changes(self):
+        self.checkpoint_plugin.set_option("auto_publish_threshold", 1)
+        task = {"tasks": [{"task-id": "task", "status": "succeeded"}]}
+        self.connection_mock.send.side_effect = [
+            self._connection_response({"task-id": "batch"}),
+            self._connection_response({"uid": "session-uid"}),
+            self._connection_response({"api-key": "key"}),
+            self._connection_response({"uid": "h1-uid"}),
+            self._connection_response(
+                {"tasks": [{"task-id": "batch", "status": "failed"}]}
+            ),
+            self._connection_response({"task-id": "task"}),
+            self._connection_response(task),
+            self._connection_response(task),
+        ]
+
+        self.checkpoint_plugin.send_request(
+            "/web_api/add-objects-batch",
+            {"objects": [{"type": "host", "list": [{"name": "h2"}] * 5}]},
+        )
+        self.checkpoint_plugin.send_request(
+            "/web_api/set-session", {"description": "run"}
+        )
+        self.checkpoint_plugin.send_request(
+            "/web_api/add-api-key", {"admin-name": "admin"}
+        )
+        self.checkpoint_plugin.send_request(
+            "/web_api/add-host", {"name": "h1"}
+        )
+        # not published while the batch task runs
+        assert self.checkpoint_plugin.get_session_changes() == 1
+        assert self.connection_mock.send.call_count == 4
+        self.checkpoint_plugin.send_request(
+            "/web_api/show-task", {"task-id": "batch"}
+        )
+
+        sent_paths = [
+            c[0][0] for c in self.connection_mock.send.call_args_list
+        ]
+        assert sent_paths[4:] == [
+            "/web_api/show-task",
+            "/web_api/publish",
+            "/web_api/show-task",
+            "/web_api/show-task",
+        ]
+        assert self.checkpoint_plugin.get_session_changes() == 0
+
+    def test_objects_batch_runs_in_parallel_sessions(self):
+        self.connection_mock._url = "https://mgmt"
+        self.connection_mock.get_option.side_effect = {
+            "remote_user": "admin",
+            "password": "secret",
+        }.get
+        task = {"tasks": [{"task-id": "task", "status": "succeeded"}]}
+        sent = []
+
+        def open_url(url, data=None, method=None, headers=None, **kwargs):
+            command = url.rsplit("/", 1)[-1]
+            sent.append((headers.get("X-chkp-sid"), command))
+            response = {"login": {"sid": "sid-" + str(len(sent))}}.get(
+                command, {"task-id": "task"}
+            )
+            if command == "show-task":
+                response = task
+            response_mock = mock.Mock()
+            response_mock.getcode.return_value = 200
+            response_mock.read.return_value = json.dumps(response).encode()
+            return response_mock
+
+        chunks_by_session = [
+            [[{"type": "host", "list": [{"name": "h1"}, {"name": "h2"}]}]],
+            [[{"type": "host", "list": [{"name": "h3"}]}]],
+        ]
+        with mock.patch(
+            "ansible_collections.check_point.mgmt.plugins.httpapi.checkpoint.open_url",
+            side_effect=open_url,
+        ):
+            result = self.checkpoint_plugin.run_objects_batch_in_sessions(
+                "", "add-objects-batch", chunks_by_session, [1, 0, 0]
+            )
+
+        assert result == (3, [])
+        self.connection_mock.send.assert_not_called()
+        sids = set(sid for sid, command in sent if command == "login")
+        assert sids == set([None])
+        by_session = {}
+        for sid, command in sent:
+            if sid:
+                by_session.setdefault(sid, []).append(command)
+        assert len(by_session) == 2
+        for commands in by_session.values():
+            assert commands == [
+                "add-objects-batch",
+                "show-task",
+                "show-task",
+                "publish",
+                "show-task",
+                "show-task",
+                "logout",
+            ]
+
+    def test_compressed_responses_are_decompressed(self):
+        self.checkpoint_plugin.hostvars["response_compression"] = True
+        body = json.dumps({"objects": [{"name": "h1"}]}).encode()
+        gzip = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+        raw_deflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        responses = [
+            ("gzip", gzip.compress(body) + gzip.flush()),
+            ("deflate", zlib.compress(body)),
+            # deflate data without the zlib header
+            ("deflate", raw_deflate.compress(body) + raw_deflate.flush()),
+            # already decompressed by open_url
+            ("gzip", body),
+        ]
+        for encoding, compressed in responses:
+            response_mock = mock.Mock()
+            response_mock.getcode.return_value = 200
+            response_mock.headers = {"Content-Encoding": encoding}
+            self.connection_mock.send.return_value = (
+                response_mock,
+                BytesIO(compressed),
+            )
+
+            resp = self.checkpoint_plugin.send_request("/show-hosts", None)
+
+            assert resp == (200, {"objects": [{"name": "h1"}]})
+        headers = self.connection_mock.send.call_args[1]["headers"]
+        assert headers["Accept-Encoding"] == "gzip, deflate"
+
+    def test_responses_are_not_compressed_by_default(self):
+        self.connection_mock.send.return_value = self._connection_response(
+            {"uid": "1"}
+        )
+
+        self.checkpoint_plugin.send_request("/show-host", None)
+
+        headers = self.connection_mock.send.call_args[1]["headers"]
+        assert "Accept-Encoding" not in headers
+
+    def test_incremental_decoding_of_large_lists(self):
+        self.checkpoint_plugin.hostvars["incremental_decoding"] = True
+        response = {
+            "objects": [
+                {"name": "h%d" % i, "comments": "\u00e9" * i, "id": i}
+                for i in range(20)
+            ],
+            "from": 1,
+            "to": 20,
+            "total": 20,
+        }
+        self.connection_mock.send.return_value = self._connection_response(
+            response
+        )
+
+        resp = self.checkpoint_plugin.send_request("/show-hosts", None)
+
+        assert resp == (200, response)
+        body = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        for chunk_size in [1, 3, 64]:
+            decoder = IncrementalJSONDecoder(body, chunk_size)
+            assert decoder.decode(["objects"]) == response
+
+    def test_incremental_decoding_of_numbers_cut_by_chunks(self):
+        body = (
+            b'{"objects": [1.5, 3.25e10, 1e5, -12, 2E-3, 100], "total": 6, '
+            b'"to": 1.5}'
+        )
+        # every chunk size puts the first chunk boundary at every position
+        for chunk_size in range(1, len(body) + 1):
+            decoder = IncrementalJSONDecoder(body, chunk_size)
+            assert decoder.decode(["objects"]) == json.loads(body)
+
+    def test_incremental_decoding_of_invalid_response(self):
+        self.checkpoint_plugin.hostvars["incremental_decoding"] = True
+        self.connection_mock.send.return_value = self._connection_response(
+            '{"objects": [{"name": "h1"},'
+        )
+
+        with self.assertRaises(ConnectionError) as res:
+            self.checkpoint_plugin.send_request("/show-hosts", None)
+
+        assert "Invalid JSON response" in str(res.exception)
+
+    def test_json_backends(self):
+        plugin = (
+            "ansible_collections.check_point.mgmt.plugins.httpapi.checkpoint"
+        )
+        with mock.patch(plugin + ".HAS_ORJSON", False):
+            assert dumps_json({"name": "h1", "tags": ["a"]}) == (
+                b'{"name":"h1","tags":["a"]}'
+            )
+            assert loads_json(b'{"name": "h1"}') == {"name": "h1"}
+        orjson_mock = mock.Mock()
+        orjson_mock.dumps.return_value = b'{"name":"h1"}'
+        orjson_mock.loads.return_value = {"name": "h1"}
+        with mock.patch(plugin + ".HAS_ORJSON", True):
+            with mock.patch(plugin + ".orjson", orjson_mock, create=True):
+                assert dumps_json({"name": "h1"}) == b'{"name":"h1"}'
+                assert loads_json(b'{"name":"h1"}') == {"name": "h1"}
+        orjson_mock.dumps.assert_called_once_with({"name": "h1"})
+
+    def test_transient_errors_are_retried(self):
+        self.checkpoint_plugin.hostvars["request_retry_timeout"] = 60
+        self.connection_mock.send.side_effect = [
+            HTTPError(
+                "http://testhost.com",
+                429,
+                "",
+                {},
+                StringIO('{"code": "generic_err_too_many_requests"}'),
+            ),
+            HTTPError(
+                "http://testhost.com",
+                400,
+                "",
+                {},
+                StringIO('{"code": "generic_err_object_locked"}'),
+            ),
+            self._connection_response({"uid": "1"}),
+        ]
+
+        with mock.patch("time.sleep") as sleep_mock:
+            resp = self.checkpoint_plugin.send_request("/set-host", {})
+
+        assert resp == (200, {"uid": "1"})
+        delays = [c[0][0] for c in sleep_mock.call_args_list]
+        assert 0.5 <= delays[0] <= 1 and 1 <= delays[1] <= 2
+        assert self.checkpoint_plugin.pop_retry_counters() == {
+            "requests": 1,
+            "retries": 2,
+            "errors": {"HTTP 429": 1, "generic_err_object_locked": 1},
+        }
+        assert self.checkpoint_plugin.pop_retry_counters() == {}
+
+    def test_connection_failures_are_retried_only_when_nothing_changes(
+        self,
+    ):
+        self.checkpoint_plugin.hostvars["request_retry_timeout"] = 60
+        self.connection_mock.send.side_effect = AnsibleConnectionFailure(
+            "Could not connect"
+        )
+
+        with mock.patch("time.sleep"):
+            resp = self.checkpoint_plugin.send_request("/add-host", {})
+
+        assert resp == (404, "Could not connect")
+        assert self.connection_mock.send.call_count == 1
+
+        self.connection_mock.send.side_effect = [
+            AnsibleConnectionFailure("Could not connect"),
+            self._connection_response({"uid": "1"}),
+        ]
+
+        with mock.patch("time.sleep"):
+            resp = self.checkpoint_plugin.send_request("/show-host", {})
+
+        assert resp == (200, {"uid": "1"})
+
+    def test_gateway_errors_are_retried_only_when_nothing_changes(self):
+        self.checkpoint_plugin.hostvars["request_retry_timeout"] = 60
+        self.connection_mock.send.side_effect = lambda *args, **kwargs: (
+            self._raise(
+                HTTPError("http://testhost.com", 502, "", {}, StringIO("{}"))
+            )
+        )
+
+        with mock.patch("time.sleep"):
+            resp = self.checkpoint_plugin.send_request("/add-host", {})
+
+        assert resp == (502, {})
+        assert self.connection_mock.send.call_count == 1
+
+        self.connection_mock.send.side_effect = [
+            HTTPError("http://testhost.com", 504, "", {}, StringIO("{}")),
+            self._connection_response({"uid": "1"}),
+        ]
+
+        with mock.patch("time.sleep"):
+            resp = self.checkpoint_plugin.send_request("/show-host", {})
+
+        assert resp == (200, {"uid": "1"})
+
+    def test_retries_stop_after_the_timeout(self):
+        self.checkpoint_plugin.hostvars["request_retry_timeout"] = 3
+        self.connection_mock.send.side_effect = lambda *args, **kwargs: (
+            self._raise(
+                HTTPError("http://testhost.com", 503, "", {}, StringIO("{}"))
+            )
+        )
+
+        with mock.patch("time.sleep"):
+            with mock.patch("time.time", side_effect=[0, 0, 1.5, 3.5]):
+                resp = self.checkpoint_plugin.send_request("/show-host", {})
+
+        assert resp == (503, {})
+        assert self.connection_mock.send.call_count == 2
+
+    def test_requests_are_rate_limited(self):
+        rate_limit_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, rate_limit_dir)
+        self.checkpoint_plugin.hostvars["rate_limit"] = 2
+        self.checkpoint_plugin.hostvars["rate_limit_path"] = rate_limit_dir
+        self.connection_mock.send.side_effect = lambda *args, **kwargs: (
+            self._connection_response({"uid": "1"})
+        )
+
+        with mock.patch("time.time", return_value=100):
+            with mock.patch("time.sleep") as sleep_mock:
+                for dummy in range(4):
+                    self.checkpoint_plugin.send_request("/show-host", {})
+
+        # a burst of a second of requests, then a request every half a second
+        assert [c[0][0] for c in sleep_mock.call_args_list] == [0.5, 1]
+        assert len(os.listdir(rate_limit_dir)) == 1
+
+    def test_concurrent_requests_are_limited_across_connections(self):
+        rate_limit_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, rate_limit_dir)
+        rate_limiter = ServerRateLimiter(rate_limit_dir, "server", 0, 1)
+        other_rate_limiter = ServerRateLimiter(rate_limit_dir, "server", 0, 1)
+
+        slot = rate_limiter._acquire_slot()
+        # the other connection gets the slot once the first one released it
+        with mock.patch(
+            "time.sleep", side_effect=lambda seconds: os.close(slot)
+        ) as sleep_mock:
+            other_slot = other_rate_limiter._acquire_slot()
+        os.close(other_slot)
+
+        assert sleep_mock.call_count == 1
+        assert os.listdir(rate_limit_dir) == ["server-0.slot"]
+
+    @staticmethod
+    def _raise(exc):
+        raise exc
+
+    def test_parallel_session_is_discarded_on_failure(self):
+        self.connection_mock._url = "https://mgmt"
+        self.connection_mock.get_option.side_effect = {
+            "remote_user": "admin",
+            "password": "secret",
+        }.get
+        sent = []
+
+        def open_url(url, data=None, method=None, headers=None, **kwargs):
+            command = url.rsplit("/", 1)[-1]
+            sent.append((headers.get("X-chkp-sid"), command))
+            # an unexpected show-task response fails the session
+            response = {
+                "login": {"sid": "sid-1"},
+                "add-objects-batch": {"task-id": "task"},
+            }.get(command, {})
+            response_mock = mock.Mock()
+            response_mock.getcode.return_value = 200
+            response_mock.read.return_value = json.dumps(response).encode()
+            return response_mock
+
+        with mock.patch(
+            "ansible_collections.check_point.mgmt.plugins.httpapi.checkpoint.open_url",
+            side_effect=open_url,
+        ):
+            with self.assertRaises(KeyError):
+                self.checkpoint_plugin.run_objects_batch_in_sessions(
+                    "",
+                    "add-objects-batch",
+                    [[[{"type": "host", "list": [{"name": "h1"}]}]]],
+                    [1, 0, 0],
+                )
+
+        assert sent[-2:] == [("sid-1", "discard"), ("sid-1", "logout")]
+
+    @staticmethod
+    def _rulebase_response():
+        return {
+            "rulebase": [
+                {
+                    "name": "Section 1",
+                    "rulebase": [{"name": "A", "uid": "a"}],
+                },
+                {
+                    "name": "Section 2",
+                    "rulebase": [{"name": "B", "uid": "b"}],
+                },
+            ],
+            "to": 2,
+            "total": 2,
+        }
+
+    @staticmethod
+    def _session_expired_error():
+        return HTTPError(
+            "http://testhost.com",
+            400,
+            "",
+            {},
+            StringIO('{"code": "generic_err_wrong_session_id"}'),
+        )
+
     @staticmethod
     def _connection_response(response, status=200):
         response_mock = mock.Mock()